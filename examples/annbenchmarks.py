@@ -0,0 +1,377 @@
+"""
+Runs approximate nearest neighbor (ANN) benchmarks with synthetic or local vector datasets.
+
+Measures index build time, queries per second (QPS) and latency at multiple batch sizes, recall versus exact
+search and peak memory usage for each ANN backend. Each backend runs in a separate process to isolate memory usage.
+No network access is required.
+
+Install txtai and the following dependencies to run:
+    pip install txtai[ann] psutil pyyaml
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+from multiprocessing import get_context
+
+import numpy as np
+import psutil
+import yaml
+
+# Conditional import
+try:
+    from scipy.sparse import load_npz, random as sparse, save_npz
+    from scipy.sparse.linalg import norm
+
+    SCIPY = True
+except ImportError:
+    SCIPY = False
+
+from txtai.ann import ANNFactory, SparseANNFactory
+
+# Default backends
+DENSE = ["numpy", "torch", "faiss", "hnsw", "annoy", "sqlite", "ivfpq"]
+SPARSE = ["ivfsparse"]
+
+
+def generate(args):
+    """
+    Generates a synthetic dataset. Dense vectors are sampled from a mixture of gaussian clusters to simulate the structure
+    of text embeddings. Sparse vectors are uniformly sampled with the configured density.
+
+    Args:
+        args: command line arguments
+
+    Returns:
+        (data, queries)
+    """
+
+    rng = np.random.default_rng(args.seed)
+    total = args.count + args.queries
+
+    if args.sparse:
+        if not SCIPY:
+            raise ImportError("Sparse benchmarks require scipy")
+
+        # Sparse vectors with L2 normalized rows
+        vectors = sparse(total, args.dimensions, density=args.density, format="csr", dtype=np.float32, random_state=args.seed)
+        vectors = vectors.multiply(1 / np.maximum(norm(vectors, axis=1), 1e-12).reshape(-1, 1)).tocsr().astype(np.float32)
+    else:
+        # Dense vectors clustered around random centroids with L2 normalized rows
+        centroids = rng.standard_normal((args.clusters, args.dimensions)).astype(np.float32)
+        vectors = centroids[rng.integers(0, args.clusters, total)]
+        vectors += rng.standard_normal(vectors.shape, dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    return vectors[: args.count], vectors[args.count :]
+
+
+def load(path, queries, args):
+    """
+    Loads a local dataset. Dense vectors are loaded from .npy files and sparse vectors are loaded from .npz files.
+    Queries are sampled from the dataset when a queries file isn't provided.
+
+    Args:
+        path: path to vectors file
+        queries: path to queries file, optional
+        args: command line arguments
+
+    Returns:
+        (data, queries)
+    """
+
+    data = loadarray(path)
+    if queries:
+        return data, loadarray(queries)
+
+    # Hold out a random sample of rows as queries
+    rng = np.random.default_rng(args.seed)
+    indices = rng.permutation(data.shape[0])
+    return data[np.sort(indices[args.queries :])], data[np.sort(indices[: args.queries])]
+
+
+def loadarray(path):
+    """
+    Loads a dense or sparse array.
+
+    Args:
+        path: path to array file
+
+    Returns:
+        array
+    """
+
+    if path.endswith(".npz"):
+        if not SCIPY:
+            raise ImportError("Sparse benchmarks require scipy")
+
+        return load_npz(path).tocsr().astype(np.float32)
+
+    return np.load(path, allow_pickle=False).astype(np.float32)
+
+
+def savearray(path, data):
+    """
+    Saves a dense or sparse array.
+
+    Args:
+        path: output path without extension
+        data: array to save
+
+    Returns:
+        path to saved array file
+    """
+
+    if isinstance(data, np.ndarray):
+        np.save(f"{path}.npy", data, allow_pickle=False)
+        return f"{path}.npy"
+
+    save_npz(f"{path}.npz", data)
+    return f"{path}.npz"
+
+
+def groundtruth(data, queries, topk, batch=8192):
+    """
+    Runs an exact search with dot products. Data is scored in blocks to limit memory usage.
+
+    Args:
+        data: data array
+        queries: queries array
+        topk: number of results per query
+        batch: number of data rows to score at a time
+
+    Returns:
+        list of exact result ids per query
+    """
+
+    ids, scores = None, None
+    for x in range(0, data.shape[0], batch):
+        # Score block and merge with top n results so far
+        block = data[x : x + batch].dot(queries.T).T
+        block = block.toarray() if not isinstance(block, np.ndarray) else block
+
+        bids = np.broadcast_to(np.arange(x, x + block.shape[1]), block.shape)
+        ids = bids if ids is None else np.concatenate((ids, bids), axis=1)
+        scores = block if scores is None else np.concatenate((scores, block), axis=1)
+
+        # Keep top n per query
+        if scores.shape[1] > topk:
+            indices = np.argpartition(-scores, topk - 1, axis=1)[:, :topk]
+            ids, scores = np.take_along_axis(ids, indices, axis=1), np.take_along_axis(scores, indices, axis=1)
+
+    return [set(row.tolist()) for row in ids]
+
+
+def benchmark(backend, params, paths, truth, args):
+    """
+    Benchmarks a single backend configuration. This method runs in a separate process.
+
+    Args:
+        backend: backend name
+        params: backend parameters
+        paths: (data path, queries path)
+        truth: exact result ids per query
+        args: command line arguments
+
+    Returns:
+        dict of benchmark statistics
+    """
+
+    data, queries = loadarray(paths[0]), loadarray(paths[1])
+
+    # Track memory in use while the index is built and searched
+    memory = Memory()
+
+    # Create and build index
+    config = {"backend": backend, "dimensions": data.shape[1], backend: params}
+    model = SparseANNFactory.create(config) if args.sparse else ANNFactory.create(config)
+
+    start = time.perf_counter()
+    model.index(data)
+    build = time.perf_counter() - start
+
+    # Free data arrays to only measure the index
+    del data
+
+    stats = {"build": round(build, 4), "count": model.count(), "batches": {}}
+    for size in [int(x) for x in args.batches.split(",")]:
+        latencies, results = [], []
+        for x in range(0, queries.shape[0], size):
+            start = time.perf_counter()
+            results.extend(model.search(queries[x : x + size], args.topk))
+            latencies.append(time.perf_counter() - start)
+
+        latencies = np.array(latencies)
+        stats["batches"][size] = {
+            "qps": round(queries.shape[0] / latencies.sum(), 2),
+            "p50": round(float(np.percentile(latencies, 50)) * 1000, 4),
+            "p99": round(float(np.percentile(latencies, 99)) * 1000, 4),
+            "recall": round(float(np.mean([len(exact & {uid for uid, _ in result}) / len(exact) for result, exact in zip(results, truth)])), 4),
+        }
+
+    # Peak memory of process and increase from building and searching the index
+    stats["memory"], stats["index"] = memory.stop()
+
+    # Free resources
+    model.close()
+
+    return stats
+
+
+class Memory:
+    """
+    Tracks the peak resident set size (RSS) of the current process with a background sampling thread.
+    """
+
+    def __init__(self, interval=0.01):
+        """
+        Starts tracking memory usage.
+
+        Args:
+            interval: sampling interval in seconds
+        """
+
+        self.process = psutil.Process()
+        self.interval = interval
+
+        # Memory in use when tracking starts and peak memory
+        self.baseline = self.process.memory_info().rss
+        self.peak = self.baseline
+
+        # Start sampling thread
+        self.running = threading.Event()
+        self.running.set()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+
+    def sample(self):
+        """
+        Samples memory usage until tracking stops.
+        """
+
+        while self.running.is_set():
+            self.peak = max(self.peak, self.process.memory_info().rss)
+            time.sleep(self.interval)
+
+    def stop(self):
+        """
+        Stops tracking memory usage.
+
+        Returns:
+            (peak RSS, peak RSS - RSS when tracking started) in MB
+        """
+
+        self.running.clear()
+        self.thread.join()
+
+        # Final sample
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+        return round(self.peak / 1024**2, 2), round((self.peak - self.baseline) / 1024**2, 2)
+
+
+def configurations(backends, path):
+    """
+    Gets the list of configurations to benchmark. The configuration file maps a backend name to a dict of backend
+    parameters or a list of dicts to benchmark multiple parameter sets.
+
+    Args:
+        backends: list of backend names
+        path: path to YAML/JSON configuration file, optional
+
+    Returns:
+        list of (backend, parameters)
+    """
+
+    config = {}
+    if path:
+        with open(path, encoding="utf-8") as f:
+            config = yaml.safe_load(f)
+
+    results = []
+    for backend in backends:
+        params = config.get(backend, {})
+        for p in params if isinstance(params, list) else [params]:
+            results.append((backend, p if p else {}))
+
+    return results
+
+
+def benchmarks(args):
+    """
+    Main benchmark execution method.
+
+    Args:
+        args: command line arguments
+    """
+
+    # Load or generate dataset
+    data, queries = load(args.data, args.queries_path, args) if args.data else generate(args)
+    args.sparse = not isinstance(data, np.ndarray)
+
+    # Exact results
+    truth = groundtruth(data, queries, args.topk)
+
+    # Default backends
+    backends = args.backends.split(",") if args.backends else (SPARSE if args.sparse else DENSE)
+
+    # Dataset metadata
+    dataset = {
+        "data": args.data if args.data else "synthetic",
+        "rows": data.shape[0],
+        "dimensions": data.shape[1],
+        "queries": queries.shape[0],
+        "sparse": args.sparse,
+        "topk": args.topk,
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Save dataset to share it with each benchmark process
+        paths = (savearray(os.path.join(directory, "data"), data), savearray(os.path.join(directory, "queries"), queries))
+        del data, queries
+
+        with open(args.output, "a" if args.append else "w", encoding="utf-8") as f:
+            for backend, params in configurations(backends, args.config):
+                # Run each benchmark in a new process to isolate memory usage
+                stats = {"name": args.name if args.name else backend, "backend": backend, "params": params, **dataset}
+                with get_context("spawn").Pool(1) as pool:
+                    try:
+                        stats.update(pool.apply(benchmark, (backend, params, paths, truth, args)))
+                    # Record backends that fail (i.e. missing dependencies) and continue
+                    except Exception as e:  # pylint: disable=W0718
+                        stats["error"] = f"{type(e).__name__}: {e}"
+
+                # Save as JSON lines output
+                json.dump(stats, f)
+                f.write("\n")
+                f.flush()
+
+                print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    # Command line parser
+    parser = argparse.ArgumentParser(description="ANN Benchmarks")
+    parser.add_argument("-a", "--append", help="appends to output file if set, otherwise output is overwritten", action="store_true")
+    parser.add_argument("-b", "--backends", help="comma separated list of backends", metavar="BACKENDS")
+    parser.add_argument("-c", "--config", help="path to YAML/JSON file with backend parameters", metavar="CONFIG")
+    parser.add_argument("-d", "--data", help="path to local vectors file (.npy dense, .npz sparse)", metavar="DATA")
+    parser.add_argument("-n", "--name", help="name to assign to this run, defaults to backend name", metavar="NAME")
+    parser.add_argument("-o", "--output", help="path to output report", metavar="OUTPUT", default="annbenchmarks.json")
+    parser.add_argument("-q", "--queries-path", help="path to local queries file, defaults to a sample of data", metavar="QUERIES")
+    parser.add_argument("-t", "--topk", help="number of results per query", metavar="TOPK", type=int, default=10)
+    parser.add_argument("--batches", help="comma separated list of query batch sizes", metavar="BATCHES", default="1,32,256")
+    parser.add_argument("--clusters", help="number of clusters in synthetic dense data", metavar="CLUSTERS", type=int, default=100)
+    parser.add_argument("--count", help="number of synthetic rows", metavar="COUNT", type=int, default=100000)
+    parser.add_argument("--density", help="density of synthetic sparse data", metavar="DENSITY", type=float, default=0.01)
+    parser.add_argument("--dimensions", help="number of synthetic dimensions", metavar="DIMENSIONS", type=int, default=384)
+    parser.add_argument("--queries", help="number of queries", metavar="QUERIES", type=int, default=1000)
+    parser.add_argument("--seed", help="random seed", metavar="SEED", type=int, default=0)
+    parser.add_argument("--sparse", help="generates synthetic sparse data if set", action="store_true")
+
+    # Calculate benchmarks
+    benchmarks(parser.parse_args())
@@ -3,8 +3,11 @@ ANN (Approximate Nearest Neighbor) module
 """
 
 import datetime
+import math
 import platform
 
+import numpy as np
+
 from ..version import __version__
 
 
@@ -82,6 +85,33 @@ class ANN:
 
         raise NotImplementedError
 
+    # pylint: disable=W0613
+    def filter(self, queries, limit, ids):
+        """
+        Searches ANN index for query, restricted to a list of ids. Returns topn results. This method is only
+        supported when isfilter() is True.
+
+        Args:
+            queries: queries array
+            limit: maximum results
+            ids: list of ids to search
+
+        Returns:
+            query results, None if filtered searches aren't supported
+        """
+
+        return None
+
+    def isfilter(self):
+        """
+        Checks if this ANN supports filtered searches.
+
+        Returns:
+            True if filtered searches are supported, False otherwise
+        """
+
+        return False
+
     def count(self):
         """
         Number of elements in the ANN index.
@@ -151,3 +181,38 @@ class ANN:
 
         # Set last update date
         self.config["update"] = create
+
+    def sample(self, embeddings):
+        """
+        Selects the rows used to train an index with the sample setting. All rows are used when sample isn't set.
+
+        Args:
+            embeddings: embeddings array
+
+        Returns:
+            training rows
+        """
+
+        train, sample = embeddings, self.setting("sample")
+        if sample:
+            # Get sample for training
+            rng = np.random.default_rng(0)
+            indices = sorted(rng.choice(train.shape[0], int(sample * train.shape[0]), replace=False, shuffle=False))
+            train = train[indices]
+
+        return train
+
+    def cells(self, count):
+        """
+        Calculates the number of IVF cells for an IVF index.
+
+        Args:
+            count: number of embeddings rows
+
+        Returns:
+            number of IVF cells
+        """
+
+        # Calculate number of IVF cells where x = min(4 * sqrt(embeddings count), embeddings count / 39)
+        # Faiss requires at least 39 points per cluster
+        return max(min(round(4 * math.sqrt(count)), int(count / 39)), 1)
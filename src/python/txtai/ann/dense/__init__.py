@@ -6,6 +6,7 @@ from .annoy import Annoy
 from .factory import ANNFactory
 from .faiss import Faiss
 from .hnsw import HNSW
+from .ivfpq import IVFPQ
 from .numpy import NumPy
 from .pgvector import PGVector
 from .torch import Torch
@@ -7,6 +7,7 @@ from ...util import Resolver
 from .annoy import Annoy
 from .faiss import Faiss
 from .hnsw import HNSW
+from .ivfpq import IVFPQ
 from .numpy import NumPy
 from .pgvector import PGVector
 from .sqlite import SQLite
@@ -41,6 +42,8 @@ class ANNFactory:
             ann = Faiss(config)
         elif backend == "hnsw":
             ann = HNSW(config)
+        elif backend == "ivfpq":
+            ann = IVFPQ(config)
         elif backend == "numpy":
             ann = NumPy(config)
         elif backend == "pgvector":
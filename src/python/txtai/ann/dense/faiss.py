@@ -10,6 +10,7 @@ import numpy as np
 from faiss import omp_set_num_threads
 from faiss import index_factory, IO_FLAG_MMAP, METRIC_INNER_PRODUCT, read_index, write_index
 from faiss import index_binary_factory, read_index_binary, write_index_binary, IndexBinaryIDMap
+from faiss import extract_index_ivf, IDSelectorBatch, SearchParameters, SearchParametersIVF
 
 from ..base import ANN
 
@@ -39,12 +40,7 @@ class Faiss(ANN):
 
     def index(self, embeddings):
         # Compute model training size
-        train, sample = embeddings, self.setting("sample")
-        if sample:
-            # Get sample for training
-            rng = np.random.default_rng(0)
-            indices = sorted(rng.choice(train.shape[0], int(sample * train.shape[0]), replace=False, shuffle=False))
-            train = train[indices]
+        train = self.sample(embeddings)
 
         # Configure embeddings index. Inner product is equal to cosine similarity on normalized vectors.
         params = self.configure(embeddings.shape[0], train.shape[0])
@@ -92,6 +88,32 @@ class Faiss(ANN):
 
         return results
 
+    # pylint: disable=E1120,E1123
+    def filter(self, queries, limit, ids):
+        # Restrict search to ids
+        selector = IDSelectorBatch(np.array(ids, dtype=np.int64))
+
+        # Scale nprobe by filter selectivity given that fewer ids are in each IVF cell, limited to the total number of cells
+        try:
+            nprobe = min(math.ceil(self.nprobe() * self.count() / max(len(ids), 1)), extract_index_ivf(self.backend).nlist)
+            params = SearchParametersIVF(sel=selector, nprobe=nprobe)
+        except RuntimeError:
+            params = SearchParameters(sel=selector)
+
+        # Run the query
+        scores, ids = self.backend.search(queries, limit, params=params)
+
+        # Map results to [(id, score)], skip empty results
+        results = []
+        for x, score in enumerate(scores):
+            results.append([(uid, score) for uid, score in zip(ids[x].tolist(), self.scores(score)) if uid >= 0])
+
+        return results
+
+    def isfilter(self):
+        # Binary indexes don't support search parameters
+        return not self.qbits
+
     def count(self):
         return self.backend.ntotal
 
@@ -162,21 +184,6 @@ class Faiss(ANN):
         # Create standard float index
         return index_factory(embeddings.shape[1], params, METRIC_INNER_PRODUCT)
 
-    def cells(self, count):
-        """
-        Calculates the number of IVF cells for an IVF index.
-
-        Args:
-            count: number of embeddings rows
-
-        Returns:
-            number of IVF cells
-        """
-
-        # Calculate number of IVF cells where x = min(4 * sqrt(embeddings count), embeddings count / 39)
-        # Faiss requires at least 39 points per cluster
-        return max(min(round(4 * math.sqrt(count)), int(count / 39)), 1)
-
     def components(self, components, train):
         """
         Formats a components string. This method automatically calculates the optimal number of IVF cells, if omitted.
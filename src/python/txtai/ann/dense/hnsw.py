@@ -27,10 +27,14 @@ class HNSW(ANN):
         if not HNSWLIB:
             raise ImportError('HNSW is not available - install "ann" extra to enable')
 
+        # Deleted labels, loaded on first filtered search
+        self.deleted = None
+
     def load(self, path):
         # Load index
         self.backend = Index(dim=self.config["dimensions"], space=self.config["metric"])
         self.backend.load_index(path)
+        self.deleted = None
 
     def index(self, embeddings):
         # Inner product is equal to cosine similarity on normalized vectors
@@ -51,6 +55,7 @@ class HNSW(ANN):
         # Add id offset, delete counter and index build metadata
         self.config["offset"] = embeddings.shape[0]
         self.config["deletes"] = 0
+        self.deleted = None
         self.metadata({"efconstruction": efconstruction, "m": m, "seed": seed})
 
     def append(self, embeddings):
@@ -72,6 +77,9 @@ class HNSW(ANN):
             try:
                 self.backend.mark_deleted(uid)
                 self.config["deletes"] += 1
+
+                if self.deleted is not None:
+                    self.deleted.add(uid)
             except RuntimeError:
                 # Ignore label not found error
                 continue
@@ -96,6 +104,76 @@ class HNSW(ANN):
 
         return results
 
+    def filter(self, queries, limit, ids):
+        # Set ef query param
+        ef = self.setting("efsearch")
+        if ef:
+            self.backend.set_ef(ef)
+
+        # Ids to search, excluding deleted and unknown ids. Labels are positions in embeddings.
+        deleted = self.deletes()
+        ids = {uid for uid in ids if 0 <= uid < self.config["offset"] and uid not in deleted}
+
+        results = []
+        for query in queries:
+            labels, distances, k = [], [], min(limit, len(ids))
+
+            if k:
+                try:
+                    # Run the query with a filter function
+                    labels, distances = self.backend.knn_query(query, k=k, filter=lambda label: label in ids)
+                    labels, distances = labels[0].tolist(), distances[0].tolist()
+                except RuntimeError:
+                    # Graph search can find less than k ids for sparse filters, score all ids in that case
+                    labels, distances = self.exact(query, k, ids)
+
+            # Convert distances to similarity scores and map results to [(id, score)]
+            results.append(list(zip(labels, [1 - d for d in distances])))
+
+        return results
+
+    def isfilter(self):
+        return True
+
+    def deletes(self):
+        """
+        Gets the set of deleted labels. The backend doesn't expose deleted labels, they are found once by looking up each
+        label and kept up to date with deletes.
+
+        Returns:
+            set of deleted labels
+        """
+
+        if self.deleted is None:
+            self.deleted = set()
+            if self.config.get("deletes"):
+                for label in self.backend.get_ids_list():
+                    try:
+                        self.backend.get_items([label])
+                    except RuntimeError:
+                        self.deleted.add(label)
+
+        return self.deleted
+
+    def exact(self, query, limit, ids):
+        """
+        Runs an exact search against a set of ids.
+
+        Args:
+            query: query vector
+            limit: maximum results
+            ids: ids to search
+
+        Returns:
+            (labels, distances)
+        """
+
+        labels = np.array(sorted(ids), dtype=np.int64)
+        distances = 1 - np.array(self.backend.get_items(labels), dtype=np.float32) @ query
+
+        indices = np.argsort(distances, kind="stable")[:limit]
+        return labels[indices].tolist(), distances[indices].tolist()
+
     def count(self):
         return self.backend.get_current_count() - self.config["deletes"]
 
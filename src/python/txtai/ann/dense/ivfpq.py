@@ -0,0 +1,343 @@
+"""
+IVFPQ module
+"""
+
+import numpy as np
+
+from ..base import ANN
+
+
+class IVFPQ(ANN):
+    """
+    Inverted file (IVF) index with product quantization (PQ) vector storage. Implemented with NumPy only.
+
+    Vectors are assigned to the closest coarse k-means centroid. The residual vector (vector - centroid) is split into
+    subvectors and each subvector is stored as the id of the closest centroid in a per-subspace codebook. This stores
+    each vector as a small number of bytes.
+
+    This index is modeled after Faiss and supports many of the same parameters.
+
+    See this link for more: https://github.com/facebookresearch/faiss/wiki/Faiss-indexes
+    """
+
+    def __init__(self, config):
+        super().__init__(config)
+
+        # Vectors are stored with product quantization, scalar and binary quantization aren't supported
+        if self.config.get("quantize") or self.setting("quantize"):
+            raise ValueError("IVFPQ stores product quantized vectors, quantize isn't supported with this backend")
+
+        # Coarse cluster centroids
+        self.centroids = None
+
+        # Product quantization codebooks - (subquantizers, codebook size, subvector dimensions)
+        self.codebooks = None
+
+        # Cluster ids and codes. Each cluster stores a list of arrays, appended arrays are concatenated on first access.
+        self.ids, self.codes = None, None
+
+        # Deleted ids bitmap and number of deleted ids. The bitmap grows with extra capacity for appends.
+        self.deletes, self.deleted = None, 0
+
+    def load(self, path):
+        with open(path, "rb") as handle:
+            # Read centroids and codebooks
+            self.centroids = np.load(handle, allow_pickle=False)
+            self.codebooks = np.load(handle, allow_pickle=False)
+
+            # Read cluster ids and codes
+            self.ids, self.codes = [], []
+            for _ in range(self.centroids.shape[0]):
+                self.ids.append([np.load(handle, allow_pickle=False)])
+                self.codes.append([np.load(handle, allow_pickle=False)])
+
+            # Read deleted ids bitmap
+            self.deletes = np.unpackbits(np.load(handle, allow_pickle=False), count=self.config["offset"]).astype(bool)
+            self.deleted = int(self.deletes.sum())
+
+    def index(self, embeddings):
+        # Compute model training size
+        train = self.sample(embeddings)
+
+        # Number of subquantizers, each dimension is split into equal sized subvectors
+        m = self.subquantizers(embeddings.shape[1])
+
+        # Train coarse centroids
+        self.centroids = self.kmeans(train, self.nlist(embeddings.shape[0], train.shape[0]))
+
+        # Train product quantization codebooks on residuals
+        residuals = train - self.centroids[self.assign(train, self.centroids)]
+        subvectors = residuals.reshape(residuals.shape[0], m, -1)
+        self.codebooks = np.stack([self.kmeans(subvectors[:, x], min(256, train.shape[0])) for x in range(m)])
+
+        # Initialize lists and add embeddings - position in embeddings is used as the id
+        self.ids = [[np.zeros(0, dtype=np.int64)] for _ in range(self.centroids.shape[0])]
+        self.codes = [[np.zeros((0, m), dtype=np.uint8)] for _ in range(self.centroids.shape[0])]
+        self.deletes, self.deleted = np.zeros(0, dtype=bool), 0
+
+        self.add(embeddings, 0)
+
+        # Add id offset and index build metadata
+        self.config["offset"] = embeddings.shape[0]
+        self.metadata({"nlist": self.centroids.shape[0], "m": m, "ksub": self.codebooks.shape[1]})
+
+    def append(self, embeddings):
+        # Append new ids - position in embeddings + existing offset is used as the id
+        self.add(embeddings, self.config["offset"])
+
+        # Update id offset and index metadata
+        self.config["offset"] += embeddings.shape[0]
+        self.metadata()
+
+    def delete(self, ids):
+        # Filter any id not in this index
+        ids = np.unique(np.array([x for x in ids if 0 <= x < self.config["offset"]], dtype=np.int64))
+        ids = ids[~self.deletes[ids]]
+
+        # Mark ids as deleted
+        self.deletes[ids] = True
+        self.deleted += ids.shape[0]
+
+    def search(self, queries, limit):
+        # Number of clusters to search
+        nprobe = min(self.nprobe(), self.centroids.shape[0])
+
+        # Coarse centroid scores and closest clusters for each query
+        coarse = np.dot(queries, self.centroids.T)
+        clusters = np.argpartition(-coarse, nprobe - 1, axis=1)[:, :nprobe]
+
+        # Lookup tables with the inner product of each query subvector and each codebook entry
+        m, dsub = self.codebooks.shape[0], self.codebooks.shape[2]
+        tables = np.einsum("qmd,mkd->qmk", queries.reshape(queries.shape[0], m, dsub), self.codebooks)
+
+        results = []
+        for x, query in enumerate(clusters):
+            # Get ids and codes for selected clusters
+            ids, codes = zip(*[self.cluster(c) for c in query])
+
+            # Score is the coarse centroid score + the sum of residual subvector scores
+            offsets = np.concatenate([np.full(uids.shape[0], coarse[x, c], dtype=np.float32) for c, uids in zip(query, ids)])
+            ids, codes = np.concatenate(ids), np.concatenate(codes)
+            scores = offsets + tables[x][np.arange(m), codes].sum(axis=1)
+
+            # Remove deleted ids
+            if self.deleted:
+                keep = ~self.deletes[ids]
+                ids, scores = ids[keep], scores[keep]
+
+            # Get top n results
+            indices = np.argpartition(-scores, min(limit, scores.shape[0]) - 1)[:limit] if scores.shape[0] else np.zeros(0, dtype=np.int64)
+            indices = indices[np.argsort(-scores[indices])]
+
+            # Map results to [(id, score)]
+            results.append(list(zip(ids[indices].tolist(), scores[indices].tolist())))
+
+        return results
+
+    def count(self):
+        return self.config["offset"] - self.deleted
+
+    def save(self, path):
+        # IVFPQ storage format:
+        #    - centroids array
+        #    - codebooks array
+        #    - cluster ids and codes arrays for each cluster
+        #    - deleted ids bitmap array
+
+        with open(path, "wb") as handle:
+            # Write centroids and codebooks
+            np.save(handle, self.centroids, allow_pickle=False)
+            np.save(handle, self.codebooks, allow_pickle=False)
+
+            # Write cluster ids and codes
+            for cluster in range(self.centroids.shape[0]):
+                ids, codes = self.cluster(cluster)
+                np.save(handle, ids, allow_pickle=False)
+                np.save(handle, codes, allow_pickle=False)
+
+            # Write deleted ids bitmap
+            np.save(handle, np.packbits(self.deletes[: self.config["offset"]]), allow_pickle=False)
+
+    def add(self, embeddings, offset):
+        """
+        Encodes and adds embeddings to the index.
+
+        Args:
+            embeddings: embeddings array
+            offset: id of the first embeddings row
+        """
+
+        # Encode embeddings
+        clusters, codes = self.encode(embeddings)
+        ids = np.arange(offset, offset + embeddings.shape[0], dtype=np.int64)
+
+        # Group rows by cluster
+        order = np.argsort(clusters, kind="stable")
+        counts = np.bincount(clusters, minlength=self.centroids.shape[0])
+
+        # Add ids and codes to clusters
+        for cluster, rows in enumerate(np.split(order, np.cumsum(counts)[:-1])):
+            if rows.shape[0]:
+                self.ids[cluster].append(ids[rows])
+                self.codes[cluster].append(codes[rows])
+
+        # Grow deleted ids bitmap, capacity at least doubles to amortize copies
+        size = offset + embeddings.shape[0]
+        if size > self.deletes.shape[0]:
+            deletes = np.zeros(max(size, 2 * self.deletes.shape[0]), dtype=bool)
+            deletes[: self.deletes.shape[0]] = self.deletes
+            self.deletes = deletes
+
+    def cluster(self, cluster):
+        """
+        Gets the ids and codes for a cluster. Arrays appended since the last access are concatenated.
+
+        Args:
+            cluster: cluster id
+
+        Returns:
+            (ids, codes)
+        """
+
+        if len(self.ids[cluster]) > 1:
+            self.ids[cluster] = [np.concatenate(self.ids[cluster])]
+            self.codes[cluster] = [np.concatenate(self.codes[cluster])]
+
+        return self.ids[cluster][0], self.codes[cluster][0]
+
+    def encode(self, embeddings):
+        """
+        Encodes embeddings as a coarse cluster id and product quantization codes.
+
+        Args:
+            embeddings: embeddings array
+
+        Returns:
+            (clusters, codes)
+        """
+
+        m = self.codebooks.shape[0]
+        clusters = np.zeros(embeddings.shape[0], dtype=np.int64)
+        codes = np.zeros((embeddings.shape[0], m), dtype=np.uint8)
+
+        # Encode in batches to limit memory usage
+        batch = 65536
+        for x in range(0, embeddings.shape[0], batch):
+            data = np.asarray(embeddings[x : x + batch], dtype=np.float32)
+
+            # Assign closest centroids and compute residuals
+            clusters[x : x + batch] = self.assign(data, self.centroids)
+            subvectors = (data - self.centroids[clusters[x : x + batch]]).reshape(data.shape[0], m, -1)
+
+            # Assign closest codebook entry for each subvector
+            for y in range(m):
+                codes[x : x + batch, y] = self.assign(subvectors[:, y], self.codebooks[y])
+
+        return clusters, codes
+
+    def kmeans(self, data, k):
+        """
+        Runs k-means clustering on data.
+
+        Args:
+            data: training data
+            k: number of clusters
+
+        Returns:
+            cluster centroids
+        """
+
+        data = np.ascontiguousarray(data, dtype=np.float32)
+
+        # Initialize centroids with a random sample of data
+        rng = np.random.default_rng(0)
+        centroids = data[rng.choice(data.shape[0], k, replace=False)].copy()
+
+        for _ in range(self.setting("iterations", 10)):
+            # Assign data to closest centroids
+            assign = self.assign(data, centroids)
+
+            # Recompute centroids as the mean of assigned data, empty clusters keep the current centroid
+            counts = np.bincount(assign, minlength=k)
+            nonempty = counts > 0
+
+            # Sum data by cluster using contiguous runs of data sorted by cluster
+            order = np.argsort(assign, kind="stable")
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            centroids[nonempty] = np.add.reduceat(data[order], starts[nonempty], axis=0) / counts[nonempty, None]
+
+        return centroids
+
+    def assign(self, data, centroids):
+        """
+        Assigns each data row to the closest centroid by L2 distance.
+
+        Args:
+            data: data array
+            centroids: centroids array
+
+        Returns:
+            closest centroid index per row
+        """
+
+        # Closest L2 distance = argmin(|x|^2 - 2x.c + |c|^2) = argmax(x.c - |c|^2 / 2)
+        norms = (centroids**2).sum(axis=1) / 2
+
+        # Calculate in batches to limit memory usage
+        assign = np.zeros(data.shape[0], dtype=np.int64)
+        batch = 8192
+        for x in range(0, data.shape[0], batch):
+            scores = np.dot(data[x : x + batch], centroids.T)
+            scores -= norms
+            assign[x : x + batch] = scores.argmax(axis=1)
+
+        return assign
+
+    def subquantizers(self, dimensions):
+        """
+        Gets or derives the number of subquantizers. The default is the largest number of subquantizers with at
+        least 4 dimensions per subvector. Each vector is stored with 1 byte per subquantizer.
+
+        Args:
+            dimensions: number of vector dimensions
+
+        Returns:
+            number of subquantizers
+        """
+
+        m = self.setting("m")
+        if m:
+            if dimensions % m:
+                raise ValueError(f"Number of dimensions ({dimensions}) must be a multiple of m ({m})")
+
+            return m
+
+        return next(x for x in range(max(dimensions // 4, 1), 0, -1) if dimensions % x == 0)
+
+    def nlist(self, count, train):
+        """
+        Gets or derives the number of clusters.
+
+        Args:
+            count: initial dataset size
+            train: number of rows used to train
+
+        Returns:
+            number of clusters
+        """
+
+        default = 1 if count <= 5000 else self.cells(train)
+        return min(self.setting("nlist", default), train)
+
+    def nprobe(self):
+        """
+        Gets or derives the nprobe search parameter.
+
+        Returns:
+            nprobe setting
+        """
+
+        count = self.count()
+
+        default = 6 if count <= 5000 else round(self.cells(count) / 16)
+        return max(self.setting("nprobe", default), 1)
@@ -2,13 +2,20 @@
 NumPy module
 """
 
+import os
+import tempfile
+
 import numpy as np
 
 from ...serialize import SerializeFactory
 
 from ..base import ANN
 
+# Maximum number of bytes compared at once when calculating hamming scores without a block size set
+HAMMINGBLOCK = 2**26
+
 
+# pylint: disable=R0904
 class NumPy(ANN):
     """
     Builds an ANN index backed by a NumPy array.
@@ -20,69 +27,288 @@ class NumPy(ANN):
         # Array function definitions
         self.all, self.cat, self.dot, self.zeros = np.all, np.concatenate, np.dot, np.zeros
         self.argsort, self.xor, self.clip = np.argsort, np.bitwise_xor, np.clip
+        self.take = np.take_along_axis
+
+        # Unsigned integer words used to pack quantized vectors, widest first
+        self.words = [(8, np.uint64), (4, np.uint32), (2, np.uint16)]
+
+        # Vectorized popcount, fallback to a SWAR popcount for NumPy < 2.0
+        self.popcount = np.bitwise_count if hasattr(np, "bitwise_count") else self.swar
 
         # Scalar quantization
         quantize = self.config.get("quantize")
         self.qbits = quantize if quantize and isinstance(quantize, int) and not isinstance(quantize, bool) else None
 
+        # Deleted rows bitmap, number of deleted rows and row ids (only set when rows are remapped)
+        self.deletes, self.deleted, self.ids = None, 0, None
+
+        # Number of rows in use. The backend array may have additional capacity for appends.
+        self.size = 0
+
     def load(self, path):
-        # Load array from file
-        try:
-            self.backend = self.tensor(np.load(path, allow_pickle=False))
-        except ValueError:
-            # Backwards compatible support for previously pickled data
-            self.backend = self.tensor(SerializeFactory.create("pickle").load(path))
+        with open(path, "rb") as handle:
+            try:
+                if self.setting("mmap"):
+                    # Memory mapped arrays are opened copy-on-write, changes aren't written back to the file
+                    backend = np.load(path, mmap_mode="c", allow_pickle=False)
+                    handle.seek(backend.offset + backend.nbytes)
+                else:
+                    backend = np.load(handle, allow_pickle=False)
+
+                # Load deleted rows bitmap and row ids stored after the array
+                self.deletes, self.ids = self.loadrows(handle, backend)
+            except ValueError:
+                # Backwards compatible support for previously pickled data
+                backend = SerializeFactory.create("pickle").load(path)
+                self.deletes, self.ids = np.all(backend == 0, axis=1), None
+
+        # Number of deleted rows
+        self.deleted = int(self.deletes.sum())
+
+        self.backend, self.size = self.tensor(backend), backend.shape[0]
 
     def index(self, embeddings):
         # Create index
-        self.backend = self.tensor(embeddings)
+        self.backend, self.size = self.tensor(embeddings), embeddings.shape[0]
+
+        # Initialize deleted rows bitmap and row ids
+        self.deletes, self.deleted, self.ids = np.zeros(embeddings.shape[0], dtype=bool), 0, None
 
         # Add id offset and index build metadata
         self.config["offset"] = embeddings.shape[0]
         self.metadata(self.settings())
 
     def append(self, embeddings):
-        # Append new data to array
-        self.backend = self.cat((self.backend, self.tensor(embeddings)), axis=0)
+        new = embeddings.shape[0]
+
+        # Grow array capacity, if necessary
+        if self.size + new > self.backend.shape[0]:
+            self.resize(max(2 * self.backend.shape[0], self.size + new))
+
+        # Copy new data into array
+        self.backend[self.size : self.size + new] = self.tensor(embeddings)
+
+        # Set new ids, if rows have been remapped
+        if self.ids is not None:
+            self.ids[self.size : self.size + new] = np.arange(self.config["offset"], self.config["offset"] + new, dtype=np.int64)
+
+        self.size += new
 
         # Update id offset and index metadata
-        self.config["offset"] += embeddings.shape[0]
+        self.config["offset"] += new
         self.metadata()
 
     def delete(self, ids):
-        # Filter any index greater than size of array
-        ids = [x for x in ids if x < self.backend.shape[0]]
+        # Get rows for ids, ignore ids not found and rows already deleted
+        rows = np.unique(self.rows(ids))
+        rows = rows[~self.deletes[rows]]
 
-        # Clear specified ids
-        self.backend[ids] = self.tensor(self.zeros((len(ids), self.backend.shape[1])))
+        # Mark rows as deleted and clear data
+        self.deletes[rows] = True
+        self.deleted += rows.shape[0]
+        self.backend[rows] = 0
 
     def search(self, queries, limit):
-        if self.qbits:
-            # Calculate hamming score for integer vectors
-            scores = self.hammingscore(queries)
-        else:
-            # Dot product on normalized vectors is equal to cosine similarity
-            scores = self.dot(self.tensor(queries), self.backend.T)
+        # Convert queries to backend array
+        queries = self.tensor(queries)
 
-        # Get topn ids
-        ids = self.argsort(-scores)[:, :limit]
+        # Number of rows to score at a time, defaults to all rows. Hamming scores default to a bounded block size.
+        blocksize = self.size if not self.qbits else HAMMINGBLOCK // max(queries.shape[0] * self.backend.shape[1], 1)
+        blocksize = max(self.setting("blocksize", blocksize), 1)
 
-        # Map results to [(id, score)]
+        # Running topn scores and ids per query
+        scores, ids = None, None
+
+        # Score backend in blocks to bound memory usage
+        for start in range(0, self.size, blocksize):
+            end = min(start + blocksize, self.size)
+
+            # Score block and exclude deleted rows
+            bscores = self.score(queries, self.backend[start:end])
+            if self.deleted:
+                bscores[:, self.tensor(self.deletes[start:end])] = -np.inf
+
+            # Get topn ids for current block
+            bscores, bids = self.topk(bscores, limit)
+            bids = bids + start
+
+            # Merge block results with running topn
+            if scores is not None:
+                bscores, bids = self.cat((scores, bscores), axis=1), self.cat((ids, bids), axis=1)
+                bscores, indices = self.topk(bscores, limit)
+                bids = self.take(bids, indices, 1)
+
+            scores, ids = bscores, bids
+
+        # Empty index
+        if scores is None:
+            return [[] for _ in range(queries.shape[0])]
+
+        # Map rows to ids, if rows have been remapped
+        ids = self.numpy(ids)
+        ids = self.ids[ids] if self.ids is not None else ids
+
+        # Map results to [(id, score)], skip deleted rows
         results = []
-        for x, score in enumerate(scores):
-            # Add results
-            results.append(list(zip(ids[x].tolist(), score[ids[x]].tolist())))
+        for x in range(queries.shape[0]):
+            results.append([(uid, score) for uid, score in zip(ids[x].tolist(), scores[x].tolist()) if score > -np.inf])
 
         return results
 
+    def filter(self, queries, limit, ids):
+        # Convert queries to backend array
+        queries = self.tensor(queries)
+
+        # Get rows for ids, skip deleted rows
+        rows = np.unique(self.rows(ids))
+        rows = rows[~self.deletes[rows]]
+
+        # No matching rows
+        if not rows.shape[0]:
+            return [[] for _ in range(queries.shape[0])]
+
+        # Score selected rows and get topn rows
+        scores, indices = self.topk(self.score(queries, self.backend[self.tensor(rows)]), limit)
+        rows = rows[self.numpy(indices)]
+
+        # Map rows to ids, if rows have been remapped
+        ids = self.ids[rows] if self.ids is not None else rows
+
+        # Map results to [(id, score)]
+        return [list(zip(ids[x].tolist(), scores[x].tolist())) for x in range(queries.shape[0])]
+
+    def isfilter(self):
+        return True
+
     def count(self):
-        # Get count of non-zero rows (ignores deleted rows)
-        return self.backend[~self.all(self.backend == 0, axis=1)].shape[0]
+        # Number of rows minus deleted rows
+        return self.size - self.deleted
 
     def save(self, path):
-        # Save array to file. Use stream to prevent ".npy" suffix being added.
-        with open(path, "wb") as handle:
-            np.save(handle, self.numpy(self.backend), allow_pickle=False)
+        # Save array to a temporary file and move into place, the current array may be memory mapped from path.
+        # Use stream to prevent ".npy" suffix being added.
+        with open(f"{path}.tmp", "wb") as handle:
+            np.save(handle, self.numpy(self.backend[: self.size]), allow_pickle=False)
+
+            # Save deleted rows bitmap and row ids (if rows have been remapped) after the array
+            np.save(handle, np.packbits(self.deletes[: self.size]), allow_pickle=False)
+            if self.ids is not None:
+                np.save(handle, self.ids[: self.size], allow_pickle=False)
+
+        os.replace(f"{path}.tmp", path)
+
+    def compact(self):
+        """
+        Compacts this index by removing deleted rows from the array. Rows are remapped to their original ids,
+        ids are preserved.
+
+        Returns:
+            number of rows removed
+        """
+
+        removed = self.deleted
+        if removed:
+            # Rows to keep
+            keep = ~self.deletes[: self.size]
+
+            # Remap rows to ids
+            self.ids = (self.ids[: self.size] if self.ids is not None else np.arange(self.size, dtype=np.int64))[keep]
+
+            # Rewrite array without deleted rows
+            self.backend = self.backend[: self.size][self.tensor(keep)]
+            self.deletes, self.deleted, self.size = np.zeros(self.backend.shape[0], dtype=bool), 0, self.backend.shape[0]
+
+        return removed
+
+    def loadrows(self, handle, backend):
+        """
+        Loads the deleted rows bitmap and row ids stored after the array. Indexes saved with earlier versions
+        don't have this data, in that case deleted rows are detected as rows with all zeros.
+
+        Args:
+            handle: file handle positioned at the end of the array
+            backend: loaded array
+
+        Returns:
+            (deleted rows bitmap, row ids or None if rows haven't been remapped)
+        """
+
+        size = os.fstat(handle.fileno()).st_size
+
+        # Legacy format
+        if handle.tell() >= size:
+            return np.all(backend == 0, axis=1), None
+
+        # Unpack deleted rows bitmap
+        deletes = np.unpackbits(np.load(handle, allow_pickle=False), count=backend.shape[0]).astype(bool)
+
+        # Load row ids, if available
+        return deletes, np.load(handle, allow_pickle=False) if handle.tell() < size else None
+
+    def rows(self, ids):
+        """
+        Gets the array rows for a list of ids. Ids not found are ignored.
+
+        Args:
+            ids: list of ids
+
+        Returns:
+            array of rows
+        """
+
+        ids = np.array(ids, dtype=np.int64)
+
+        # Rows have not been remapped, ids are rows
+        if self.ids is None:
+            return ids[(ids >= 0) & (ids < self.size)]
+
+        # Row ids are sorted, lookup rows with a binary search
+        rows = np.clip(np.searchsorted(self.ids[: self.size], ids), 0, max(self.size - 1, 0))
+        return rows[self.ids[rows] == ids] if self.size else rows[:0]
+
+    def resize(self, capacity):
+        """
+        Resizes the array to capacity rows. Capacity is grown geometrically on append, which amortizes
+        the cost of copying existing rows.
+
+        Args:
+            capacity: number of rows
+        """
+
+        # Copy rows in use to new array
+        backend = self.empty((capacity, self.backend.shape[1]))
+        backend[: self.size] = self.backend[: self.size]
+        self.backend = backend
+
+        # Resize deleted rows bitmap and row ids
+        deletes = np.zeros(capacity, dtype=bool)
+        deletes[: self.size] = self.deletes[: self.size]
+        self.deletes = deletes
+
+        if self.ids is not None:
+            ids = np.zeros(capacity, dtype=np.int64)
+            ids[: self.size] = self.ids[: self.size]
+            self.ids = ids
+
+    def empty(self, shape):
+        """
+        Creates a new uninitialized array with the same type as the backend array. When mmap is enabled,
+        the array is stored in a temporary file.
+
+        Args:
+            shape: array shape
+
+        Returns:
+            array
+        """
+
+        dtype = self.numpy(self.backend[:0]).dtype
+
+        # Preallocate a memory mapped temporary file
+        if self.setting("mmap"):
+            return self.tensor(np.memmap(tempfile.TemporaryFile(), dtype=dtype, mode="w+", shape=shape))
+
+        return self.tensor(np.empty(shape, dtype=dtype))
 
     def tensor(self, array):
         """
@@ -134,7 +360,48 @@ class NumPy(ANN):
 
         return {"numpy": np.__version__}
 
-    def hammingscore(self, queries):
+    def score(self, queries, backend):
+        """
+        Scores queries against a block of backend rows.
+
+        Args:
+            queries: queries array
+            backend: block of backend rows
+
+        Returns:
+            scores
+        """
+
+        # Calculate hamming score for integer vectors
+        if self.qbits:
+            return self.hammingscore(queries, backend)
+
+        # Dot product on normalized vectors is equal to cosine similarity
+        return self.dot(queries, backend.T)
+
+    def topk(self, scores, limit):
+        """
+        Gets the top limit scores per row. Uses a partial sort that only fully sorts the top limit scores.
+
+        Args:
+            scores: scores array
+            limit: maximum results
+
+        Returns:
+            (scores, indices) sorted by score descending
+        """
+
+        # Partition top limit scores to the front of each row
+        limit = min(limit, scores.shape[1])
+        indices = np.argpartition(-scores, limit - 1, axis=1)[:, :limit]
+
+        # Sort top limit scores
+        scores = self.take(scores, indices, 1)
+        order = self.argsort(-scores, axis=1)
+
+        return self.take(scores, order, 1), self.take(indices, order, 1)
+
+    def hammingscore(self, queries, backend):
         """
         Calculates a hamming distance score.
 
@@ -144,21 +411,58 @@ class NumPy(ANN):
 
         Args:
             queries: queries array
+            backend: block of backend rows
 
         Returns:
             scores
         """
 
-        # Build table of number of bits for each distinct uint8 value
-        table = 1 << np.arange(8)
-        table = self.tensor(np.array([np.count_nonzero(x & table) for x in np.arange(256)]))
+        # Pack bytes into words
+        queries, backend = self.pack(queries), self.pack(backend)
 
         # Number of different bits
-        delta = self.xor(self.tensor(queries[:, None]), self.backend)
-
-        # Cast to long array
-        delta = self.totype(delta, np.int64)
+        delta = self.popcount(self.xor(queries[:, None], backend)).sum(axis=2)
 
         # Calculate score as 1.0 - percentage of different bits
         # Bound score from 0 to 1
-        return self.clip(1.0 - (table[delta].sum(axis=2) / (self.config["dimensions"] * 8)), 0.0, 1.0)
+        return self.clip(1.0 - (delta / (self.config["dimensions"] * 8)), 0.0, 1.0)
+
+    def pack(self, array):
+        """
+        Views a uint8 array as the widest integer words that evenly divide each row. This is a zero-copy operation.
+
+        Args:
+            array: uint8 array
+
+        Returns:
+            array of integer words
+        """
+
+        for size, dtype in self.words:
+            if array.shape[1] % size == 0:
+                return array.view(dtype)
+
+        return array
+
+    def swar(self, array):
+        """
+        Counts the number of set bits in each element of an integer array using a SIMD within a register (SWAR) popcount.
+
+        Args:
+            array: integer array
+
+        Returns:
+            number of set bits per element
+        """
+
+        # Build bit masks for the element width
+        size = array.itemsize
+        m1, m2, m4, h1 = (int(x * size, 16) for x in ["55", "33", "0f", "01"])
+
+        # Count bits in 2-bit, 4-bit and 8-bit groups
+        array = array - ((array >> 1) & m1)
+        array = (array & m2) + ((array >> 2) & m2)
+        array = (array + (array >> 4)) & m4
+
+        # Sum bytes into the most significant byte
+        return (array * h1) >> ((size - 1) * 8) if size > 1 else array
@@ -3,8 +3,12 @@ SQLite module
 """
 
 import os
+import re
 import sqlite3
 
+from multiprocessing.pool import ThreadPool
+from queue import Empty, Queue
+
 # Conditional import
 try:
     import sqlite_vec
@@ -16,7 +20,7 @@ except ImportError:
 from ..base import ANN
 
 
-class SQLite(ANN):
+class SQLite(ANN):  # pylint: disable=R0904
     """
     Builds an ANN index backed by a SQLite database.
     """
@@ -30,6 +34,9 @@ class SQLite(ANN):
         # Database parameters
         self.connection, self.cursor, self.path = None, None, ""
 
+        # Thread pool, thread pool size and read-only connection pool for batch search
+        self.threads, self.workers, self.pool = None, None, None
+
         # Quantization setting
         self.quantize = self.setting("quantize")
         self.quantize = 8 if isinstance(self.quantize, bool) else int(self.quantize) if self.quantize else None
@@ -49,7 +56,7 @@ class SQLite(ANN):
         self.metadata(self.settings())
 
     def append(self, embeddings):
-        self.database().executemany(self.insertsql(), [(x + self.config["offset"], row) for x, row in enumerate(embeddings)])
+        self.database().executemany(self.insertsql(), ((x + self.config["offset"], row) for x, row in enumerate(embeddings)))
 
         self.config["offset"] += embeddings.shape[0]
         self.metadata()
@@ -58,6 +65,20 @@ class SQLite(ANN):
         self.database().executemany(self.deletesql(), [(x,) for x in ids])
 
     def search(self, queries, limit):
+        # Number of threads for batch search
+        threads = self.setting("threads", 1)
+
+        # Run batch search with a pool of read-only connections. Read-only connections only see committed changes,
+        # this requires a saved database with no pending changes.
+        if min(threads, len(queries)) > 1 and self.path and not self.database().connection.in_transaction:
+            # Create connection pool once, connections are reused across searches
+            if not self.pool:
+                self.pool = Queue()
+
+            # Run one task per query, batches with fewer queries than threads only use one thread per query
+            return self.threadpool(threads).starmap(self.query, [(query, limit) for query in queries], chunksize=1)
+
+        # Run sequential search with the current connection
         results = []
         for query in queries:
             # Execute query
@@ -73,6 +94,9 @@ class SQLite(ANN):
         return self.cursor.fetchone()[0]
 
     def save(self, path):
+        # Close read-only connections
+        self.closepool()
+
         # Temporary database
         if not self.path:
             # Save temporary database
@@ -101,6 +125,12 @@ class SQLite(ANN):
         # Parent logic
         super().close()
 
+        # Close read-only connections
+        self.closepool()
+
+        # Stop batch search threads
+        self.closethreads()
+
         # Close database connection
         if self.connection:
             self.connection.close()
@@ -148,28 +178,120 @@ class SQLite(ANN):
 
         return self.cursor
 
-    def connect(self, path):
+    def connect(self, path, readonly=False):
         """
         Creates a new database connection.
 
         Args:
             path: path to database file
+            readonly: opens a read-only connection if True
 
         Returns:
             database connection
         """
 
         # Create connection
-        connection = sqlite3.connect(path, check_same_thread=False)
+        connection = sqlite3.connect(f"file:{path}?mode=ro" if readonly else path, uri=readonly, check_same_thread=False)
 
         # Load sqlite-vec extension
         connection.enable_load_extension(True)
         sqlite_vec.load(connection)
         connection.enable_load_extension(False)
 
+        # Apply pragmas, names and values are validated given that pragmas don't support bind parameters
+        for name, value in self.pragmas().items():
+            connection.execute(f"PRAGMA {name}={value}")
+
         # Return connection and cursor
         return connection
 
+    def pragmas(self):
+        """
+        Gets database pragmas applied to each connection. The defaults increase the page cache and keep
+        temporary data in memory, which speeds up bulk inserts.
+
+        Returns:
+            {name: value}
+        """
+
+        pragmas = {**{"cache_size": -65536, "temp_store": "MEMORY"}, **self.setting("pragmas", {})}
+
+        # Require names to be words and values to be numbers or words
+        for name, value in pragmas.items():
+            if not re.fullmatch(r"\w+", str(name)) or not re.fullmatch(r"-?\w+", str(value)):
+                raise ValueError(f"Invalid pragma {name}={value}")
+
+        return pragmas
+
+    def query(self, query, limit):
+        """
+        Runs a search query with a connection from the read-only connection pool.
+
+        Args:
+            query: query vector
+            limit: maximum results
+
+        Returns:
+            list of (id, score)
+        """
+
+        # Get an available connection or create a new one
+        try:
+            connection = self.pool.get_nowait()
+        except Empty:
+            connection = self.connect(self.path, readonly=True)
+
+        try:
+            return connection.execute(self.searchsql(), [query, limit]).fetchall()
+        finally:
+            # Return connection to the pool
+            self.pool.put(connection)
+
+    def threadpool(self, size):
+        """
+        Gets the thread pool for batch search. The thread pool is created on first use and recreated when the number
+        of threads changes.
+
+        Args:
+            size: number of threads
+
+        Returns:
+            thread pool
+        """
+
+        if self.threads and self.workers != size:
+            self.closethreads()
+
+        if not self.threads:
+            self.threads, self.workers = ThreadPool(size), size
+
+        return self.threads
+
+    def closethreads(self):
+        """
+        Stops batch search threads.
+        """
+
+        if self.threads:
+            self.threads.close()
+            self.threads.join()
+
+        self.threads, self.workers = None, None
+
+    def closepool(self):
+        """
+        Closes all read-only connections.
+        """
+
+        if self.pool:
+            while True:
+                try:
+                    self.pool.get_nowait().close()
+                except Empty:
+                    break
+
+        self.pool = None
+
     def copy(self, path):
         """
         Copies content from the current database into target.
@@ -19,6 +19,11 @@ class Torch(NumPy):
         # Define array functions
         self.all, self.cat, self.dot, self.zeros = torch.all, torch.cat, torch.mm, torch.zeros
         self.argsort, self.xor, self.clip = torch.argsort, torch.bitwise_xor, torch.clip
+        self.take = torch.take_along_dim
+
+        # Integer words used to pack quantized vectors
+        self.words = [(8, torch.int64), (4, torch.int32), (2, torch.int16)]
+        self.popcount = self.swar
 
     def tensor(self, array):
         # Convert array to Tensor
@@ -34,5 +39,8 @@ class Torch(NumPy):
     def totype(self, array, dtype):
         return array.long() if dtype == np.int64 else array
 
+    def topk(self, scores, limit):
+        return torch.topk(scores, min(limit, scores.shape[1]), dim=1)
+
     def settings(self):
         return {"torch": torch.__version__}
@@ -57,12 +57,7 @@ class IVFSparse(ANN):
 
     def index(self, embeddings):
         # Compute model training size
-        train, sample = embeddings, self.setting("sample")
-        if sample:
-            # Get sample for training
-            rng = np.random.default_rng(0)
-            indices = sorted(rng.choice(train.shape[0], int(sample * train.shape[0]), replace=False, shuffle=False))
-            train = train[indices]
+        train = self.sample(embeddings)
 
         # Get number of clusters. Note that final number of clusters could be lower due to filtering duplicate centroids
         # and pruning of small clusters
@@ -84,8 +79,8 @@ class IVFSparse(ANN):
         # Sort clusters by id
         self.ids = dict(sorted(ids.items(), key=lambda x: x[0]))
 
-        # Create cluster data blocks
-        self.blocks = {k: embeddings[v] for k, v in self.ids.items()}
+        # Create cluster data blocks. A single cluster uses the input array as is.
+        self.blocks = {k: self.block([embeddings[v]]) if self.centroids is not None else embeddings for k, v in self.ids.items()}
 
         # Calculate block max summary vectors and use as centroids
         self.centroids = vstack([csr_matrix(x.max(axis=0)) for x in self.blocks.values()]) if self.centroids is not None else None
@@ -107,7 +102,7 @@ class IVFSparse(ANN):
             self.ids[cluster].extend([x + offset for x in ids])
 
             # Add new data
-            self.blocks[cluster] = vstack([self.blocks[cluster], embeddings[ids]])
+            self.blocks[cluster] = self.block([self.blocks[cluster], embeddings[ids]])
 
         # Update id offset and index metadata
         self.config["offset"] += embeddings.shape[0]
@@ -143,6 +138,9 @@ class IVFSparse(ANN):
         # only msgpack data is consumed
         serializer = SerializeFactory.create("msgpack", streaming=True, read_size=1)
 
+        # Memory map cluster data blocks, if enabled
+        mmap = self.setting("mmap")
+
         with open(path, "rb") as f:
             # Read header
             unpacker = serializer.loadstream(f)
@@ -157,7 +155,7 @@ class IVFSparse(ANN):
             # Read cluster data blocks
             self.blocks = {}
             for key in self.ids:
-                self.blocks[key] = SparseArray().load(f)
+                self.blocks[key] = SparseArray().load(f, mmap)
 
             # Read deletes
             self.deletes = next(unpacker)
@@ -173,7 +171,8 @@ class IVFSparse(ANN):
         # Create message pack serializer
         serializer = SerializeFactory.create("msgpack")
 
-        with open(path, "wb") as f:
+        # Save to a temporary file and move into place, the current blocks may be memory mapped from path
+        with open(f"{path}.tmp", "wb") as f:
             # Write header
             serializer.savestream({"centroids": self.centroids is not None, "count": self.count(), "blocks": len(self.blocks)}, f)
 
@@ -191,6 +190,8 @@ class IVFSparse(ANN):
             # Write deletes
             serializer.savestream(self.deletes, f)
 
+        os.replace(f"{path}.tmp", path)
+
     def build(self, train, clusters):
         """
         Builds a k-means cluster to calculate centroid points for aggregating data blocks.
@@ -307,6 +308,23 @@ class IVFSparse(ANN):
         # Map data ids and return
         return list(zip(ids[indices].tolist(), scores.tolist()))
 
+    def block(self, arrays):
+        """
+        Stacks a list of sparse arrays into a cluster data block. Blocks are spooled to disk and memory mapped when
+        mmap is enabled.
+
+        Args:
+            arrays: list of sparse arrays
+
+        Returns:
+            cluster data block
+        """
+
+        if self.setting("mmap"):
+            return SparseArray().stack(arrays)
+
+        return vstack(arrays) if len(arrays) > 1 else arrays[0]
+
     def nlist(self, count, train):
         """
         Calculates the number of clusters for this IVFSparse index. Note that the final number of clusters
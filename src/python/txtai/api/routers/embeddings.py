@@ -2,13 +2,17 @@
 Defines API paths for embeddings endpoints.
 """
 
+import struct
+
 from io import BytesIO
 from typing import List, Optional
 
+import numpy as np
 import PIL
 
 from fastapi import APIRouter, Body, File, Form, HTTPException, Request, UploadFile
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 
 from .. import application
 from ..responses import ResponseFactory
@@ -264,17 +268,49 @@ def transform(text: str, category: Optional[str] = None, index: Optional[str] =
 
 
 @router.post("/batchtransform")
-def batchtransform(texts: List[str] = Body(...), category: Optional[str] = None, index: Optional[str] = None):
+def batchtransform(
+    texts: List[str] = Body(...),
+    category: Optional[str] = None,
+    index: Optional[str] = None,
+    stream: Optional[bool] = False,
+    batch: Optional[int] = None,
+):
     """
     Transforms list of text into embeddings arrays.
 
+    Streaming responses are a sequence of binary frames, one per block of embeddings arrays. Each frame has a header
+    with the number of rows and dimensions as little-endian unsigned 32-bit integers. The header is followed by the
+    embeddings arrays as little-endian float32 values in row-major order.
+
     Args:
         texts: list of text
         category: category for instruction-based embeddings
         index: index name, if applicable
+        stream: streams embeddings arrays as binary frames if True
+        batch: number of embeddings arrays per streamed frame
 
     Returns:
         embeddings arrays
     """
 
+    if stream:
+        result = application.get().streamtransform(texts, category, index, batch)
+        return StreamingResponse(frames(result), media_type="application/octet-stream") if result is not None else None
+
     return application.get().batchtransform(texts, category, index)
+
+
+def frames(blocks):
+    """
+    Encodes blocks of embeddings arrays as binary frames.
+
+    Args:
+        blocks: generator of embeddings arrays blocks
+
+    Returns:
+        generator of binary frames
+    """
+
+    for block in blocks:
+        block = np.asarray(block, dtype="<f4")
+        yield struct.pack("<II", *block.shape) + block.tobytes()
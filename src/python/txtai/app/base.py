@@ -702,6 +702,25 @@ class Application:
 
         return None
 
+    def streamtransform(self, texts, category=None, index=None, batch=None):
+        """
+        Transforms an iterable of text into embeddings arrays. Embeddings are generated in blocks as they are computed.
+
+        Args:
+            texts: iterable of text
+            category: category for instruction-based embeddings
+            index: index name, if applicable
+            batch: number of embeddings arrays per block
+
+        Returns:
+            generator of embeddings arrays blocks
+        """
+
+        if self.embeddings:
+            return self.embeddings.streamtransform(texts, category, index, batch)
+
+        return None
+
     def extract(self, queue, texts=None):
         """
         Extracts answers to input questions.
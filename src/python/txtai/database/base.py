@@ -3,6 +3,7 @@ Database module
 """
 
 import logging
+import re
 import types
 
 from .encoder import EncoderFactory
@@ -163,6 +164,44 @@ class Database:
         # Run query
         return self.query(query, limit, parameters, indexids)
 
+    def filter(self, query, parameters=None, count=False):
+        """
+        Runs the filtering clauses of a similarity query without the similar() clauses. This resolves the indexids
+        that can match a query before running an index search.
+
+        Only queries with similar() clauses combined with other clauses using AND are supported. Other queries,
+        such as queries with OR / NOT operators or score filters, can't be resolved without similarity results.
+
+        Args:
+            query: parsed query
+            parameters: dict of named parameters to bind to placeholders
+            count: returns the number of matching rows if True, otherwise returns the matching indexids
+
+        Returns:
+            number of matching rows or list of matching indexids, None if query doesn't support filtering
+        """
+
+        where = query.get("where")
+        if not where or "select" not in query:
+            return None
+
+        # Tokenize clause, skipping quoted literals
+        tokens = [token.lower() for token in self.sql.tokenize(where)[0] if not Token.isquoted(token)]
+
+        # Require at least one similar clause and one filtering clause, joined with AND
+        similar = [token for token in tokens if token.startswith(Token.SIMILAR_TOKEN.lower())]
+        keywords = {name for token in tokens for name in token.split(".")}
+        if not similar or keywords & {"or", "not", "score"} or not set(tokens) - set(similar) - {"and", "(", ")"}:
+            return None
+
+        # Replace similar clauses with a true expression
+        where = re.sub(rf"{Token.SIMILAR_TOKEN}\d+", "1=1", where)
+
+        if count:
+            return self.query({"select": "count(*) AS total", "where": where}, None, parameters, False)[0]["total"]
+
+        return [indexid for indexid, _ in self.query({"where": where}, None, parameters, True)]
+
     def parse(self, query):
         """
         Parses a query into query components.
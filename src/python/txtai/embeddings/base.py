@@ -14,7 +14,7 @@ from ..graph import GraphFactory
 from ..scoring import ScoringFactory
 from ..vectors import VectorsFactory
 
-from .index import Action, Configuration, Functions, Indexes, IndexIds, Reducer, Stream, Transform
+from .index import Action, Configuration, Functions, Indexes, IndexIds, Reducer, Rescore, Stream, Transform
 from .search import Explain, Ids, Query, Search, Terms
 
 
@@ -49,6 +49,9 @@ class Embeddings:
         # Approximate nearest neighbor index
         self.ann = None
 
+        # Full precision vectors store used to rescore index search results
+        self.rescore = None
+
         # Index ids when content is disabled
         self.ids = None
 
@@ -126,6 +129,12 @@ class Embeddings:
                     self.reducer = Reducer(embeddings, self.config["pca"])
                     self.reducer(embeddings)
 
+                # Store full precision vectors, index searches run with reduced vectors
+                self.rescore = self.createrescore()
+                if self.rescore:
+                    embeddings = self.rescore.index(embeddings)
+                    dimensions = embeddings.shape[1]
+
                 # Save index dimensions
                 self.config["dimensions"] = dimensions
 
@@ -180,6 +189,10 @@ class Embeddings:
                 if self.reducer:
                     self.reducer(embeddings)
 
+                # Append full precision vectors, index searches run with reduced vectors
+                if self.rescore:
+                    embeddings = self.rescore.append(embeddings)
+
                 # Append embeddings to the index
                 self.ann.append(embeddings)
 
@@ -333,6 +346,39 @@ class Embeddings:
 
         return embeddings
 
+    def streamtransform(self, documents, category=None, index=None, batch=None):
+        """
+        Transforms documents into embeddings vectors. This method consumes an iterable of documents and yields blocks
+        of embeddings vectors as they are computed. Memory usage is bounded by the block size.
+
+        Args:
+            documents: iterable of (id, data, tags), (id, data) or data
+            category: category for instruction-based embeddings
+            index: index name, if applicable
+            batch: number of embeddings vectors per block, defaults to the index batch size
+
+        Returns:
+            generator of embeddings vectors blocks
+        """
+
+        # Initialize default parameters, if necessary
+        self.defaults()
+
+        # Block size
+        batch = batch if batch else self.config.get("batch", 1024)
+
+        block = []
+        for document in documents:
+            block.append(document)
+
+            if len(block) == batch:
+                yield self.batchtransform(block, category, index)
+                block = []
+
+        # Final block
+        if block:
+            yield self.batchtransform(block, category, index)
+
     def count(self):
         """
         Total number of elements in this embeddings index.
@@ -597,6 +643,11 @@ class Embeddings:
         # Dense vectors - transforms data to embeddings vectors
         self.model = self.loadvectors()
 
+        # Full precision vectors store
+        self.rescore = self.createrescore()
+        if self.rescore:
+            self.rescore.load(f"{path}/vectors")
+
         # Query model
         self.query = self.loadquery()
 
@@ -627,6 +678,10 @@ class Embeddings:
             if self.ann:
                 self.ann.save(f"{path}/embeddings")
 
+            # Save full precision vectors store
+            if self.rescore:
+                self.rescore.save(f"{path}/vectors")
+
             # Save dimensionality reduction model (word vectors only)
             if self.reducer:
                 self.reducer.save(f"{path}/lsa")
@@ -674,6 +729,11 @@ class Embeddings:
             self.ann.close()
             self.ann = None
 
+        # Close full precision vectors store
+        if self.rescore:
+            self.rescore.close()
+            self.rescore = None
+
         # Close database
         if self.database:
             self.database.close()
@@ -810,6 +870,12 @@ class Embeddings:
         # Initialize ANN, will be created after index transformations complete
         self.ann = None
 
+        # Close existing full precision vectors store, will be created after index transformations complete
+        if self.rescore:
+            self.rescore.close()
+
+        self.rescore = None
+
         # Create scoring only if the scoring config is for a sparse index
         if self.hassparse():
             self.scoring = self.createscoring()
@@ -969,6 +1035,20 @@ class Embeddings:
 
         return ANNFactory.create(self.config) if self.config.get("path") or self.defaultallowed() else None
 
+    def createrescore(self):
+        """
+        Creates a full precision vectors store from config.
+
+        Returns:
+            new rescore instance, if enabled in config
+        """
+
+        # Free existing resources
+        if self.rescore:
+            self.rescore.close()
+
+        return Rescore(self.config["rescore"], self.model) if self.config.get("rescore") and self.model else None
+
     def createdatabase(self):
         """
         Creates a database from config. This method will also close any existing database connection.
@@ -10,5 +10,6 @@ from .functions import Functions
 from .indexes import Indexes
 from .indexids import IndexIds
 from .reducer import Reducer
+from .rescore import Rescore
 from .stream import Stream
 from .transform import Transform
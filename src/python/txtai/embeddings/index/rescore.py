@@ -0,0 +1,290 @@
+"""
+Rescore module
+"""
+
+import io
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+
+class Rescore:
+    """
+    Full precision vectors store. Vectors are stored in a memory-mapped file next to the index. Approximate nearest neighbor
+    searches run with reduced vectors and the top candidates are rescored with full precision vectors.
+
+    Vectors are reduced with scalar quantization and/or by truncating vectors to a prefix of dimensions. Truncation is only
+    useful for models trained to store more important information in earlier dimensions such as Matryoshka Representation
+    Learning (MRL).
+    """
+
+    def __init__(self, config, model):
+        """
+        Creates a new rescore instance.
+
+        Args:
+            config: rescore configuration
+            model: vectors model
+        """
+
+        config = config if isinstance(config, dict) else {}
+
+        # Storage data type - float32 or float16
+        self.dtype = np.dtype(config.get("dtype", "float32"))
+
+        # Number of index candidates to rescore per result
+        self.oversample = config.get("oversample", 4)
+
+        # Number of leading dimensions stored in the index, all dimensions are used when not set
+        self.dimensions = config.get("dimensions")
+
+        # Vectors model, used to reduce vectors
+        self.model = model
+
+        # Memory-mapped vectors, path to vectors file and if the file is temporary
+        self.data, self.path, self.temporary = None, None, False
+
+    def __call__(self, queries, results, limit):
+        """
+        Rescores index search results with full precision vectors.
+
+        Args:
+            queries: full precision queries array
+            results: list of (id, score) per query
+            limit: maximum results
+
+        Returns:
+            list of (id, score) per query
+        """
+
+        rescored = []
+        for query, result in zip(queries, results):
+            # Sort ids to read vectors in storage order
+            ids = np.sort(np.array([uid for uid, _ in result], dtype=np.int64))
+
+            # Dot product on normalized vectors is equal to cosine similarity
+            scores = np.dot(self.data[ids].astype(np.float32), query.astype(np.float32))
+
+            # Get top n results
+            indices = np.argsort(-scores, kind="stable")[:limit]
+            rescored.append(list(zip(ids[indices].tolist(), scores[indices].tolist())))
+
+        return rescored
+
+    def candidates(self, limit):
+        """
+        Gets the number of index candidates to retrieve for limit results.
+
+        Args:
+            limit: maximum results
+
+        Returns:
+            number of candidates
+        """
+
+        return limit * self.oversample
+
+    def reduce(self, embeddings):
+        """
+        Reduces full precision vectors to the vectors stored in the index.
+
+        Args:
+            embeddings: full precision embeddings
+
+        Returns:
+            reduced embeddings
+        """
+
+        # Truncate to leading dimensions and normalize. Copies data to keep full precision vectors unchanged.
+        if self.dimensions and self.dimensions < embeddings.shape[1]:
+            embeddings = self.model.normalize(np.array(embeddings[:, : self.dimensions], dtype=np.float32))
+
+        return self.model.quantize(embeddings) if self.model.qbits else embeddings
+
+    def isreduced(self):
+        """
+        Checks if vectors stored in the index are reduced.
+
+        Returns:
+            True if vectors are quantized and/or truncated, False otherwise
+        """
+
+        return bool(self.model.qbits or self.dimensions)
+
+    def index(self, embeddings):
+        """
+        Stores full precision embeddings. This method overwrites existing vectors.
+
+        Args:
+            embeddings: full precision embeddings
+
+        Returns:
+            reduced embeddings
+        """
+
+        return self.write(None, embeddings)
+
+    def append(self, embeddings):
+        """
+        Appends full precision embeddings. Temporary vectors files grow in place. Saved vectors files are first copied to a
+        temporary file, given that changes are only persisted on save.
+
+        Args:
+            embeddings: full precision embeddings
+
+        Returns:
+            reduced embeddings
+        """
+
+        return self.extend(embeddings) if self.temporary else self.write(self.data, embeddings)
+
+    def load(self, path):
+        """
+        Loads a vectors file as a read-only memory-mapped array.
+
+        Args:
+            path: path to vectors file
+        """
+
+        self.close()
+        self.data, self.path, self.temporary = np.load(path, mmap_mode="r", allow_pickle=False), path, False
+
+    def save(self, path):
+        """
+        Saves vectors to path.
+
+        Args:
+            path: output path
+        """
+
+        # Copy vectors file, skip if vectors are already stored at path
+        if self.path and os.path.abspath(self.path) != os.path.abspath(path):
+            shutil.copyfile(self.path, path)
+
+    def close(self):
+        """
+        Closes this instance and removes temporary files.
+        """
+
+        # Remove temporary vectors file
+        if self.temporary and self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+        self.data, self.path, self.temporary = None, None, False
+
+    def write(self, data, embeddings, batch=8192):
+        """
+        Writes existing and new vectors to a new temporary vectors file. New vectors are reduced in batches.
+
+        Args:
+            data: existing vectors
+            embeddings: new full precision embeddings
+            batch: number of rows to process at a time
+
+        Returns:
+            reduced embeddings
+        """
+
+        # Create temporary vectors file
+        with tempfile.NamedTemporaryFile(suffix=".npy", delete=False) as output:
+            path = output.name
+
+        rows = data.shape[0] if data is not None else 0
+        output = np.lib.format.open_memmap(path, mode="w+", dtype=self.dtype, shape=(rows + embeddings.shape[0], embeddings.shape[1]))
+
+        # Copy existing vectors
+        for x in range(0, rows, batch):
+            output[x : min(x + batch, rows)] = data[x : x + batch]
+
+        # Copy new vectors and reduce
+        reduced = self.fill(output, rows, embeddings, batch)
+
+        output.flush()
+        del output
+
+        # Close existing vectors and load new vectors
+        self.close()
+        self.data, self.path, self.temporary = np.load(path, mmap_mode="r", allow_pickle=False), path, True
+
+        return reduced
+
+    def extend(self, embeddings, batch=8192):
+        """
+        Appends new vectors to the end of the current vectors file and updates the file header with the new shape.
+
+        Args:
+            embeddings: new full precision embeddings
+            batch: number of rows to process at a time
+
+        Returns:
+            reduced embeddings
+        """
+
+        rows, columns = self.data.shape
+        shape = (rows + embeddings.shape[0], columns)
+
+        with open(self.path, "r+b") as f:
+            # Read current header, data starts after the header
+            version = np.lib.format.read_magic(f)
+            reader = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+            _, fortran, dtype = reader(f)
+            offset = f.tell()
+
+            # Build header with the new shape. NumPy pads headers to allow the first axis to grow without changing the
+            # header size.
+            header = io.BytesIO()
+            writer = np.lib.format.write_array_header_1_0 if version == (1, 0) else np.lib.format.write_array_header_2_0
+            writer(header, {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": fortran, "shape": shape})
+
+            # Close current memory map, write new header and grow file
+            inplace = not fortran and header.tell() == offset
+            if inplace:
+                self.data = None
+                f.seek(0)
+                f.write(header.getvalue())
+                f.truncate(offset + shape[0] * shape[1] * dtype.itemsize)
+
+        # Rewrite the full file if the header size changes
+        if not inplace:
+            return self.write(self.data, embeddings, batch)
+
+        # Copy new vectors and reduce
+        output = np.load(self.path, mmap_mode="r+", allow_pickle=False)
+        reduced = self.fill(output, rows, embeddings, batch)
+
+        output.flush()
+        del output
+
+        self.data = np.load(self.path, mmap_mode="r", allow_pickle=False)
+
+        return reduced
+
+    def fill(self, output, rows, embeddings, batch):
+        """
+        Copies new full precision embeddings into output starting at rows. New vectors are reduced in batches.
+
+        Args:
+            output: output vectors array
+            rows: starting row
+            embeddings: new full precision embeddings
+            batch: number of rows to process at a time
+
+        Returns:
+            reduced embeddings
+        """
+
+        reduced = None if self.isreduced() else embeddings
+        for x in range(0, embeddings.shape[0], batch):
+            vectors = np.asarray(embeddings[x : x + batch], dtype=np.float32)
+            output[rows + x : rows + x + vectors.shape[0]] = vectors
+
+            if self.isreduced():
+                vectors = self.reduce(vectors)
+                if reduced is None:
+                    reduced = np.empty((embeddings.shape[0], vectors.shape[1]), dtype=vectors.dtype)
+
+                reduced[x : x + vectors.shape[0]] = vectors
+
+        return reduced
@@ -39,9 +39,9 @@ class Transform:
         self.offset = embeddings.config.get("offset", 0) if action == Action.UPSERT else 0
         self.batch = embeddings.config.get("batch", 1024)
 
-        # Scalar quantization
+        # Scalar quantization, vectors are quantized after they're stored when rescoring is enabled
         quantize = embeddings.config.get("quantize")
-        self.qbits = quantize if isinstance(quantize, int) and not isinstance(quantize, bool) else None
+        self.qbits = quantize if isinstance(quantize, int) and not isinstance(quantize, bool) and not embeddings.config.get("rescore") else None
 
         # Transform columns
         columns = embeddings.config.get("columns", {})
@@ -5,6 +5,7 @@ Search imports
 from .base import Search
 from .errors import *
 from .explain import Explain
+from .filter import Filter
 from .ids import Ids
 from .query import Query
 from .scan import Scan
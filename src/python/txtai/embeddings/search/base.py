@@ -3,8 +3,10 @@ Search module
 """
 
 import logging
+import re
 
 from .errors import IndexNotFoundError
+from .filter import Filter
 from .scan import Scan
 
 # Logging configuration
@@ -39,6 +41,17 @@ class Search:
         self.graph = embeddings.graph
         self.query = embeddings.query
         self.scoring = embeddings.scoring if embeddings.issparse() else None
+        self.rescore = embeddings.rescore
+
+        # Filtered search and candidate expansion configuration
+        self.filters = embeddings.config.get("filter") if embeddings.config else None
+        self.expansion = embeddings.config.get("expand") if embeddings.config else None
+
+        # Candidate expansion settings, the multiplier must grow the number of candidates
+        expansion = self.expansion if isinstance(self.expansion, dict) else {}
+        self.factor, self.maximum = expansion.get("factor", 4), expansion.get("candidates", 10000)
+        if self.factor <= 1:
+            raise ValueError(f"Expansion factor ({self.factor}) must be greater than 1")
 
     def __call__(self, queries, limit=None, weights=None, index=None, parameters=None):
         """
@@ -81,7 +94,7 @@ class Search:
         # Default vector index query (sparse, dense or hybrid)
         return self.search(queries, limit, weights, index)
 
-    def search(self, queries, limit, weights, index):
+    def search(self, queries, limit, weights, index, ids=None):
         """
         Executes an index search. When only a sparse index is enabled, this is a a keyword search. When only
         a dense index is enabled, this is an ann search. When both are enabled, this is a hybrid search.
@@ -93,6 +106,7 @@ class Search:
             limit: maximum results
             weights: hybrid score weights
             index: index name
+            ids: list of indexids to search, only supported with a dense index
 
         Returns:
             list of (id, score) per query
@@ -104,7 +118,7 @@ class Search:
 
         # Run against base indexes
         hybrid = self.ann and self.scoring
-        dense = self.dense(queries, limit * 10 if hybrid else limit) if self.ann else None
+        dense = self.dense(queries, limit * 10 if hybrid else limit, ids) if self.ann else None
         sparse = self.sparse(queries, limit * 10 if hybrid else limit) if self.scoring else None
 
         # Combine scores together
@@ -164,13 +178,14 @@ class Search:
         results = self.indexes[index].batchsearch(queries, limit, weights)
         return self.resolve(results)
 
-    def dense(self, queries, limit):
+    def dense(self, queries, limit, ids=None):
         """
         Executes an dense vector search with an approximate nearest neighbor index.
 
         Args:
             queries: list of queries
             limit: maximum results
+            ids: list of indexids to search, searches all indexids when None
 
         Returns:
             list of (id, score) per query
@@ -179,8 +194,16 @@ class Search:
         # Convert queries to embedding vectors
         embeddings = self.batchtransform((None, query, None) for query in queries)
 
+        # Reduce queries and oversample candidates when rescoring is enabled
+        queries = self.rescore.reduce(embeddings) if self.rescore else embeddings
+        candidates = self.rescore.candidates(limit) if self.rescore else limit
+
         # Search approximate nearest neighbor index
-        results = self.ann.search(embeddings, limit)
+        results = self.ann.search(queries, candidates) if ids is None else self.ann.filter(queries, candidates, ids)
+
+        # Rescore candidates with full precision vectors
+        if self.rescore:
+            results = self.rescore(embeddings, results, limit)
 
         # Require scores to be greater than 0
         results = [[(i, score) for i, score in r if score > 0] for r in results]
@@ -245,10 +268,41 @@ class Search:
         # Override limit with query limit, if applicable
         limit = max(limit, self.limit(queries))
 
+        # Query filters, pre-filtering requires a dense only index that supports filtered searches
+        filters = None
+        if self.filters:
+            prefilter = self.ann and not self.scoring and self.ann.isfilter()
+            filters = Filter(self.database, prefilter, self.filters)
+
         # Bulk index scan
-        scan = Scan(self.search, limit, weights, index)(queries, parameters)
+        scan = Scan(self.search, limit, weights, index, filters)
+
+        # Copy queries, database searches modify queries
+        copies = [query.copy() for query in queries] if self.expansion else None
 
         # Combine index search results with database search results
+        results = self.dbquery(queries, scan(queries, parameters), limit, parameters)
+
+        # Expand index candidates for queries with missing results
+        if self.expansion:
+            self.expand(scan, copies, limit, parameters, results)
+
+        return results
+
+    def dbquery(self, queries, scan, limit, parameters):
+        """
+        Runs database queries with index search results.
+
+        Args:
+            queries: list of parsed queries
+            scan: index search results as (query id, results)
+            limit: maximum results
+            parameters: list of dicts of named parameters to bind to placeholders
+
+        Returns:
+            list of dict per query
+        """
+
         results = []
         for x, query in enumerate(queries):
             # Run the database query, get matching bulk searches for current query
@@ -259,6 +313,66 @@ class Search:
 
         return results
 
+    def expand(self, scan, queries, limit, parameters, results):
+        """
+        Iteratively expands the number of index candidates for queries with less than limit results. This happens when
+        the database filters out index search results. Each iteration multiplies the number of candidates and only runs
+        queries that are still missing results. Iterations stop when the maximum number of candidates is reached or the
+        number of candidates doesn't grow.
+
+        Args:
+            scan: index scan instance
+            queries: list of parsed queries
+            limit: maximum results
+            parameters: list of dicts of named parameters to bind to placeholders
+            results: list of dict per query, expanded results are updated in place
+        """
+
+        scale, counts = 1, scan.counts
+        while True:
+            # Get queries missing results with truncated index searches
+            expand = [x for x, query in enumerate(queries) if x in scan.truncated and self.missing(query, results[x], limit)]
+            if not expand:
+                break
+
+            # Rerun index scan with a larger number of candidates for selected queries
+            scale *= self.factor
+            subset, params = [queries[x] for x in expand], [parameters[x] for x in expand] if parameters else None
+            indexresults = scan(subset, params, scale, self.maximum)
+
+            # Rerun database queries with query copies and map results back to original query positions
+            for x, result in zip(expand, self.dbquery([query.copy() for query in subset], indexresults, limit, params)):
+                results[x] = result
+
+            # Map query ids back to original query positions, stop expanding queries when the number of candidates doesn't grow
+            current = {expand[x]: count for x, count in scan.counts.items()}
+            scan.truncated = {expand[x] for x in scan.truncated if current[expand[x]] > counts.get(expand[x], 0)}
+            counts = current
+
+    def missing(self, query, result, limit):
+        """
+        Checks if a query has less than limit results. Aggregate queries are skipped since the number of results doesn't
+        depend on the number of index candidates.
+
+        Args:
+            query: parsed query
+            result: query result
+            limit: maximum results
+
+        Returns:
+            True if query has missing results
+        """
+
+        # Skip aggregate queries
+        if query.get("groupby") or re.search(r"\b(count|sum|avg|min|max|group_concat)\s*\(", query.get("select", "").lower()):
+            return False
+
+        # Get query limit
+        qlimit = query.get("limit")
+        qlimit = int(qlimit) if qlimit and qlimit.isdigit() else limit
+
+        return len(result) < qlimit
+
     def parse(self, queries):
         """
         Parses a list of database queries.
@@ -0,0 +1,72 @@
+"""
+Filter module
+"""
+
+import math
+
+
+class Filter:
+    """
+    Resolves database filters for similarity queries. Queries that combine a similar() clause with other filtering clauses
+    run the filtering clauses first to estimate selectivity.
+
+    Selective filters resolve the matching indexids and only search those ids in the index (pre-filtering). Otherwise, a
+    standard index search runs and the database filters the results (post-filtering). In that case, the number of
+    index candidates is scaled by the estimated selectivity.
+    """
+
+    def __init__(self, database, prefilter, config):
+        """
+        Creates a new filter instance.
+
+        Args:
+            database: database instance
+            prefilter: True if the index supports filtered searches
+            config: filter configuration
+        """
+
+        self.database = database
+        self.prefilter = prefilter
+
+        # Maximum selectivity (matching rows / total rows) to pre-filter index searches
+        config = config if isinstance(config, dict) else {}
+        self.threshold = config.get("threshold", 0.1)
+
+    def __call__(self, queries, parameters, limit):
+        """
+        Resolves filters for a list of queries.
+
+        Args:
+            queries: list of parsed queries
+            parameters: list of dicts of named parameters to bind to placeholders
+            limit: maximum results
+
+        Returns:
+            {query id: (candidates, indexids)}, indexids is None when the query is post-filtered
+        """
+
+        results, total = {}, None
+        for x, query in enumerate(queries):
+            # Count rows matching query filter
+            params = parameters[x] if parameters and parameters[x] else None
+            count = self.database.filter(query, params, count=True)
+
+            # Skip queries that don't support filtering
+            if count is None:
+                continue
+
+            # Total number of rows
+            total = self.database.count() if total is None else total
+
+            if not count:
+                # No matching rows, skip index search
+                results[x] = (limit, [])
+            elif self.prefilter and count / total <= self.threshold:
+                # Selective filter, search only matching indexids
+                results[x] = (limit, self.database.filter(query, params))
+            else:
+                # Broad filter, scale number of candidates by selectivity with a safety factor. Never search fewer candidates
+                # than the default for filtered queries (10x the limit).
+                results[x] = (min(max(limit * 10, math.ceil(2 * limit * total / count)), total), None)
+
+        return results
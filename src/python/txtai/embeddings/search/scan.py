@@ -8,7 +8,7 @@ class Scan:
     Scans indexes for query matches.
     """
 
-    def __init__(self, search, limit, weights, index):
+    def __init__(self, search, limit, weights, index, filters=None):
         """
         Creates a new scan instance.
 
@@ -17,6 +17,7 @@ class Scan:
             limit: maximum results
             weights: default hybrid score weights
             index: default index name
+            filters: query filter resolver, optional
         """
 
         # Index search function
@@ -34,13 +35,24 @@ class Scan:
         # Default index
         self.index = index
 
-    def __call__(self, queries, parameters):
+        # Query filter resolver
+        self.filters = filters
+
+        # Query ids with index searches that returned the full number of candidates in the last scan
+        self.truncated = set()
+
+        # Largest number of candidates per query id in the last scan
+        self.counts = {}
+
+    def __call__(self, queries, parameters, scale=1, maximum=None):
         """
         Executes a scan for a list of queries.
 
         Args:
             queries: list of queries to run
             parameters: list of dicts of named parameters to bind to placeholders
+            scale: candidates multiplier
+            maximum: maximum number of candidates
 
         Returns:
             list of (id, score) per query
@@ -49,18 +61,17 @@ class Scan:
         # Query results group by unique query clause id
         results = {}
 
+        # Reset truncated query ids and candidate counts
+        self.truncated, self.counts = set(), {}
+
         # Default number of candidates
         default = None
 
+        # Resolve query filters
+        filters = self.filters(queries, parameters, self.limit) if self.filters else {}
+
         # Group by index and run
         for index, iqueries in self.parse(queries, parameters).items():
-            # Query limit to pass to batch search
-            candidates = [query.candidates for query in iqueries if query.candidates]
-            if not candidates and not default:
-                default = self.default(queries)
-
-            candidates = max(candidates) if candidates else default
-
             # Query weights to pass to batch search
             weights = [query.weights for query in iqueries if query.weights is not None]
             weights = max(weights) if weights else self.weights
@@ -68,14 +79,97 @@ class Scan:
             # Index to run query against
             index = index if index else self.index
 
+            # Run pre-filtered index searches, only supported with the default index
+            if not index and filters:
+                iqueries = self.prefilter(iqueries, filters, weights, results, (scale, maximum))
+
+                # Skip index search if all queries are pre-filtered
+                if not iqueries:
+                    continue
+
+            # Query limit to pass to batch search
+            candidates = [query.candidates for query in iqueries if query.candidates]
+            if not candidates:
+                # Filtered queries scale the number of candidates by selectivity
+                if not default and any(query.qid not in filters for query in iqueries):
+                    default = self.default(queries)
+
+                candidates = [filters[query.qid][0] if query.qid in filters else default for query in iqueries]
+
+            candidates = self.size(max(candidates) if candidates else default, scale, maximum)
+
             # Run index searches
             for x, result in enumerate(self.search([query.text for query in iqueries], candidates, weights, index)):
-                # Save query id and results to later join to original query
-                results[iqueries[x].uid] = (iqueries[x].qid, result)
+                self.add(results, iqueries[x], result, candidates, maximum)
 
         # Sort by query uid and return results
         return [result for _, result in sorted(results.items())]
 
+    def prefilter(self, queries, filters, weights, results, scale):
+        """
+        Runs index searches restricted to the indexids matching each query filter. Each query runs as a separate
+        search given that each query has a different list of indexids.
+
+        Args:
+            queries: list of query clauses
+            filters: query filters
+            weights: query weights
+            results: query results, pre-filtered results are added to this dict
+            scale: (candidates multiplier, maximum number of candidates)
+
+        Returns:
+            list of query clauses that still need to be run
+        """
+
+        remaining = []
+        for query in queries:
+            _, ids = filters.get(query.qid, (None, None))
+            if ids is None:
+                remaining.append(query)
+            else:
+                # Run index search when there are matching indexids
+                candidates = self.size(query.candidates if query.candidates else self.limit, *scale)
+                self.add(results, query, self.search([query.text], candidates, weights, None, ids)[0] if ids else [], candidates, scale[1])
+
+        return remaining
+
+    def size(self, candidates, scale, maximum):
+        """
+        Applies a candidates multiplier and maximum to a number of candidates.
+
+        Args:
+            candidates: number of candidates
+            scale: candidates multiplier
+            maximum: maximum number of candidates
+
+        Returns:
+            number of candidates
+        """
+
+        candidates *= scale
+        return min(candidates, maximum) if maximum else candidates
+
+    def add(self, results, query, result, candidates, maximum):
+        """
+        Adds an index search result. Queries with results that have the full number of candidates are tracked as truncated,
+        given that more candidates are available.
+
+        Args:
+            results: query results
+            query: query clause
+            result: index search result
+            candidates: number of candidates
+            maximum: maximum number of candidates
+        """
+
+        # Save query id and results to later join to original query
+        results[query.uid] = (query.qid, result)
+
+        # Track the number of candidates and truncated queries
+        self.counts[query.qid] = max(self.counts.get(query.qid, 0), candidates)
+        if len(result) >= candidates and (not maximum or candidates < maximum):
+            self.truncated.add(query.qid)
+
     def parse(self, queries, parameters):
         """
         Parse index query clauses from a list of parsed queries.
@@ -24,6 +24,34 @@ class Models:
     Utility methods for working with machine learning models
     """
 
+    @staticmethod
+    def buckets(lengths, tokens):
+        """
+        Groups inputs into batches using a token budget. Inputs are sorted by length from longest to shortest. Inputs are
+        added to a batch while the padded batch size (number of inputs * longest input length) fits in the budget.
+
+        Args:
+            lengths: list of input lengths
+            tokens: maximum number of padded tokens per batch
+
+        Returns:
+            list of batches, each batch is a list of input indices
+        """
+
+        batches, batch = [], []
+        for x in sorted(range(len(lengths)), key=lambda x: -lengths[x]):
+            # First input in a batch is the longest input
+            if batch and (len(batch) + 1) * lengths[batch[0]] > tokens:
+                batches.append(batch)
+                batch = []
+
+            batch.append(x)
+
+        if batch:
+            batches.append(batch)
+
+        return batches
+
     @staticmethod
     def checklength(config, tokenizer):
         """
@@ -188,6 +216,7 @@ class Models:
             path: path to model
             config: path to model configuration
             task: task name used to lookup model type
+            modelargs: additional model arguments, these are session options for ONNX models
 
         Returns:
             machine learning model
@@ -195,7 +224,7 @@ class Models:
 
         # Detect ONNX models
         if isinstance(path, bytes) or (isinstance(path, str) and os.path.isfile(path)):
-            return OnnxModel(path, config)
+            return OnnxModel(path, config, modelargs)
 
         # Return path, if path isn't a string
         if not isinstance(path, str):
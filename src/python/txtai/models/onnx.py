@@ -28,13 +28,14 @@ class OnnxModel(PreTrainedModel):
     and outputs with minimal to no copying of data.
     """
 
-    def __init__(self, model, config=None):
+    def __init__(self, model, config=None, options=None):
         """
         Creates a new OnnxModel.
 
         Args:
             model: path to model or InferenceSession
             config: path to model configuration
+            options: optional dict of ONNX runtime session options (i.e. intra_op_num_threads)
         """
 
         if not ONNX_RUNTIME:
@@ -43,7 +44,7 @@ class OnnxModel(PreTrainedModel):
         super().__init__(AutoConfig.from_pretrained(config) if config else OnnxConfig())
 
         # Create ONNX session
-        self.model = ort.InferenceSession(model, ort.SessionOptions(), self.providers())
+        self.model = ort.InferenceSession(model, self.sessionoptions(options), self.providers())
 
         # Add references for this class to supported AutoModel classes
         Registry.register(self)
@@ -59,6 +60,24 @@ class OnnxModel(PreTrainedModel):
 
         return -1
 
+    def sessionoptions(self, options):
+        """
+        Creates ONNX runtime session options.
+
+        Args:
+            options: dict of session options, unknown options are ignored
+
+        Returns:
+            SessionOptions
+        """
+
+        sessionoptions = ort.SessionOptions()
+        for key, value in (options if options else {}).items():
+            if value is not None and hasattr(sessionoptions, key):
+                setattr(sessionoptions, key, value)
+
+        return sessionoptions
+
     def providers(self):
         """
         Returns a list of available and usable providers.
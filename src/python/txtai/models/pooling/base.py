@@ -42,7 +42,7 @@ class Pooling(nn.Module):
         # Move to device
         self.to(self.device)
 
-    def encode(self, documents, batch=32, category=None):
+    def encode(self, documents, batch=32, category=None, tokens=None):
         """
         Builds an array of pooled embeddings for documents.
 
@@ -50,6 +50,7 @@ class Pooling(nn.Module):
             documents: list of documents used to build embeddings
             batch: model batch size
             category: embeddings category (query or data)
+            tokens: maximum number of padded tokens per batch, overrides batch when set
 
         Returns:
             pooled embeddings
@@ -61,15 +62,27 @@ class Pooling(nn.Module):
         # Apply pre encoding transformation logic
         documents = self.preencode(documents, category)
 
-        # Sort document indices from largest to smallest to enable efficient batching
-        # This performance tweak matches logic in sentence-transformers
-        lengths = np.argsort([-len(x) if x else 0 for x in documents])
-        documents = [documents[x] for x in lengths]
+        if tokens:
+            # Group documents into batches by tokenized length using a token budget
+            tokenized = self.tokenizer(documents, truncation="longest_first", max_length=self.maxlength)
+            buckets = Models.buckets([len(x) for x in tokenized["input_ids"]], tokens)
+
+            # Document order and padded inputs for each batch
+            lengths = np.array([x for bucket in buckets for x in bucket], dtype=np.int64)
+            chunks = (self.tokenizer.pad({k: [v[x] for x in bucket] for k, v in tokenized.items()}, return_tensors="pt") for bucket in buckets)
+        else:
+            # Sort document indices from largest to smallest to enable efficient batching
+            # This performance tweak matches logic in sentence-transformers
+            lengths = np.argsort([-len(x) if x else 0 for x in documents])
+            documents = [documents[x] for x in lengths]
 
-        for chunk in self.chunk(documents, batch):
             # Tokenize input
-            inputs = self.tokenizer(chunk, padding=True, truncation="longest_first", return_tensors="pt", max_length=self.maxlength)
+            chunks = (
+                self.tokenizer(chunk, padding=True, truncation="longest_first", return_tensors="pt", max_length=self.maxlength)
+                for chunk in self.chunk(documents, batch)
+            )
 
+        for inputs in chunks:
             # Move inputs to device
             inputs = inputs.to(self.device)
 
@@ -161,19 +161,21 @@ class PoolingOnnx(nn.Module):
     Extends Pooling methods to name inputs to model, which is required to export to ONNX.
     """
 
-    def __init__(self, path, device):
+    def __init__(self, path, device, method=None, modelargs=None):
         """
         Creates a new PoolingOnnx instance.
 
         Args:
             path: path to model, accepts Hugging Face model hub id or local path
             device: tensor device id
+            method: optional pooling method, derived from model if not set
+            modelargs: additional model arguments
         """
 
         super().__init__()
 
         # Create pooling method based on configuration
-        self.model = PoolingFactory.create({"path": path, "device": device})
+        self.model = PoolingFactory.create({"method": method, "path": path, "device": device, "modelargs": modelargs})
 
     # pylint: disable=W0221
     def forward(self, input_ids=None, attention_mask=None, token_type_ids=None):
@@ -6,6 +6,7 @@ from .base import Scoring
 from .bm25 import BM25
 from .factory import ScoringFactory
 from .pgtext import PGText
+from .postings import Postings
 from .sif import SIF
 from .sparse import Sparse
 from .terms import Terms
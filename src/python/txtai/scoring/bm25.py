@@ -23,6 +23,10 @@ class BM25(TFIDF):
         # Calculate BM25 IDF score
         return np.log(1 + (self.total - freq + 0.5) / (freq + 0.5))
 
+    def isbounded(self):
+        # BM25 scores are bounded, subclasses that override the score method must opt in
+        return type(self).score is BM25.score
+
     def score(self, freq, idf, length):
         # Calculate BM25 score
         k = self.k1 * ((1 - self.b) + self.b * length / self.avgdl)
@@ -0,0 +1,104 @@
+"""
+Postings module
+"""
+
+import numpy as np
+
+
+class Postings:
+    """
+    Compressed storage format for term frequency sparse arrays. Index ids are sorted and delta encoded. Index id deltas
+    and term frequencies are stored as variable length integers (LEB128). Small values, which are the most common, take a
+    single byte. Encoding and decoding are vectorized with NumPy.
+    """
+
+    def encode(self, uids, freqs):
+        """
+        Encodes a term frequency sparse array.
+
+        Args:
+            uids: sorted index ids
+            freqs: term frequencies
+
+        Returns:
+            (encoded index ids, encoded term frequencies)
+        """
+
+        uids = np.asarray(uids, dtype=np.int64)
+        return self.pack(np.diff(uids, prepend=0)), self.pack(freqs)
+
+    def decode(self, uids, freqs):
+        """
+        Decodes a term frequency sparse array. Term frequencies are decoded as 32-bit integers when values fit. Index ids
+        are always 64-bit integers, NumPy indexing is faster with native size integers.
+
+        Args:
+            uids: encoded index ids
+            freqs: encoded term frequencies
+
+        Returns:
+            (index ids, term frequencies)
+        """
+
+        uids, freqs = np.cumsum(self.unpack(uids)), self.unpack(freqs)
+        freqs = freqs.astype(np.int32) if len(freqs) and freqs.max() <= np.iinfo(np.int32).max else freqs
+
+        return uids, freqs
+
+    def pack(self, values):
+        """
+        Packs an array of non-negative integers as variable length integers.
+
+        Args:
+            values: array of integers
+
+        Returns:
+            bytes
+        """
+
+        values = np.asarray(values, dtype=np.uint64)
+
+        # Number of 7-bit groups per value
+        sizes = np.ones(len(values), dtype=np.int64)
+        for x in range(1, 10):
+            sizes += values >= np.uint64(1 << (7 * x))
+
+        # Fast path when all values fit in a single byte
+        if len(values) == 0 or sizes.max() == 1:
+            return values.astype(np.uint8).tobytes()
+
+        # Write each 7-bit group, the high bit is set when more groups follow
+        output, offsets = np.zeros(sizes.sum(), dtype=np.uint8), np.cumsum(sizes) - sizes
+        for x in range(sizes.max()):
+            mask = sizes > x
+            group = (values[mask] >> np.uint64(7 * x)) & np.uint64(0x7F)
+            output[offsets[mask] + x] = group | np.where(sizes[mask] > x + 1, np.uint64(0x80), np.uint64(0))
+
+        return output.tobytes()
+
+    def unpack(self, data):
+        """
+        Unpacks variable length integers.
+
+        Args:
+            data: bytes
+
+        Returns:
+            int64 array
+        """
+
+        data = np.frombuffer(data, dtype=np.uint8)
+
+        # Fast path when all values are a single byte
+        ends = data < 0x80
+        if ends.all():
+            return data.astype(np.int64)
+
+        # Start offset of each value and position of each byte within its value
+        starts = np.flatnonzero(ends) + 1
+        starts = np.concatenate([[0], starts[:-1]])
+        positions = np.arange(len(data)) - np.repeat(starts, np.diff(np.append(starts, len(data))))
+
+        # Combine 7-bit groups
+        groups = (data & 0x7F).astype(np.uint64) << (7 * positions).astype(np.uint64)
+        return np.add.reduceat(groups, starts).astype(np.int64)
@@ -18,6 +18,10 @@ class SIF(TFIDF):
         # SIF configurable parameters
         self.a = self.config.get("a", 1e-3)
 
+    def isbounded(self):
+        # SIF scores use word frequencies across the entire index
+        return False
+
     def computefreq(self, tokens):
         # Default method computes frequency for a single entry
         # SIF uses word frequencies across entire index
@@ -5,7 +5,6 @@ Terms module
 import functools
 import os
 import sqlite3
-import sys
 
 from array import array
 from collections import Counter
@@ -13,7 +12,10 @@ from threading import RLock
 
 import numpy as np
 
+from .postings import Postings
 
+
+# pylint: disable=R0904
 class Terms:
     """
     Builds, searches and stores memory efficient term frequency sparse arrays for a scoring instance.
@@ -30,6 +32,35 @@ class Terms:
 
     INSERT_TERM = "INSERT OR REPLACE INTO terms VALUES (?, ?, ?)"
     SELECT_TERMS = "SELECT ids, freqs FROM terms WHERE term = ?"
+    SELECT_ALL_TERMS = "SELECT rowid, term, ids, freqs FROM terms WHERE rowid > ? ORDER BY rowid LIMIT ?"
+    UPDATE_TERM = "UPDATE terms SET ids = ?, freqs = ? WHERE term = ?"
+    DELETE_TERM = "DELETE FROM terms WHERE term = ?"
+
+    # Term block statistics. Index ids are grouped into fixed size blocks. Each block stores the max term frequency
+    # and min document length, which bound the term score for all documents in the block.
+    CREATE_BLOCKS = """
+        CREATE TABLE IF NOT EXISTS blocks (
+            term TEXT PRIMARY KEY,
+            blocks BLOB,
+            freqs BLOB,
+            lengths BLOB
+        )
+    """
+
+    INSERT_BLOCK = "INSERT OR REPLACE INTO blocks VALUES (?, ?, ?, ?)"
+    SELECT_BLOCKS = "SELECT blocks, freqs, lengths FROM blocks WHERE term = ?"
+    DELETE_BLOCK = "DELETE FROM blocks WHERE term = ?"
+    SELECT_BLOCKS_TABLE = "SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = 'blocks'"
+
+    # Term frequency sparse array storage format. Version 0 stores raw little endian int64 arrays. Version 1 stores
+    # delta encoded index ids and term frequencies as variable length integers.
+    FORMAT = 1
+
+    # Number of index ids per block
+    BLOCKSIZE = 256
+
+    # Number of index ids scored at a time during document-at-a-time searches
+    GROUPSIZE = 65536
 
     # Documents table
     CREATE_DOCUMENTS = """
@@ -45,7 +76,7 @@ class Terms:
     INSERT_DOCUMENT = "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)"
     SELECT_DOCUMENTS = "SELECT indexid, id, deleted, length FROM documents ORDER BY indexid"
 
-    def __init__(self, config, score, idf):
+    def __init__(self, config, score, idf, bounded=False):
         """
         Creates a new terms index.
 
@@ -53,6 +84,7 @@ class Terms:
             config: configuration
             score: score function
             idf: idf weights
+            bounded: True if scores are non-decreasing with term frequency and non-increasing with document length
         """
 
         # Terms index configuration
@@ -63,14 +95,23 @@ class Terms:
         # Scoring function
         self.score, self.idf = score, idf
 
+        # Document-at-a-time search with dynamic pruning requires block max scores, which are derived from block statistics
+        self.pruning = bounded and self.config.get("pruning", True)
+
         # Document attributes
-        self.ids, self.deletes, self.lengths = [], [], array("q")
+        self.ids, self.lengths = [], array("q")
+
+        # Id to index id mapping, deleted documents bitmap and number of deleted documents
+        self.indexids, self.deletes, self.deleted = {}, bytearray(), 0
 
         # Terms cache
         self.terms, self.cachesize = {}, 0
 
-        # Terms database
-        self.connection, self.cursor, self.path = None, None, None
+        # Terms database and flag if block statistics are stored
+        self.connection, self.cursor, self.path, self.hasblocks = None, None, None, False
+
+        # Term frequency sparse array storage format and codec
+        self.format, self.codec = Terms.FORMAT, Postings()
 
         # Database thread lock
         self.lock = RLock()
@@ -101,51 +142,64 @@ class Terms:
             # Each term and freq is a 8-bit signed long long
             self.cachesize += 16
 
-        # Flush cached terms to the database
-        if self.cachesize >= self.cachelimit:
-            self.index()
-
         # Save id and length
         self.ids.append(uid)
         self.lengths.append(length)
 
+        # Map id to index id and clear deleted flag
+        self.indexids[uid] = indexid
+        self.deletes.append(0)
+
+        # Flush cached terms to the database
+        if self.cachesize >= self.cachelimit:
+            self.index()
+
     def delete(self, ids):
         """
         Mark ids as deleted. This prevents deleted results from showing up in search results.
-        The data is not removed from the underlying term frequency sparse arrays.
+        The data is not removed from the underlying term frequency sparse arrays until the index is compacted.
 
         Args:
             ids: ids to delete
         """
 
-        # Set index ids as deleted
-        self.deletes.extend([self.ids.index(i) for i in ids])
+        # Set index ids as deleted, ignore ids not found
+        for uid in ids:
+            indexid = self.indexids.pop(uid, None)
+            if indexid is not None:
+                self.deletes[indexid] = 1
+                self.deleted += 1
 
     def index(self):
         """
         Saves any remaining cached terms to the database.
         """
 
+        # Create block statistics table, if necessary
+        if self.terms:
+            self.createblocks()
+
+        lengths = np.frombuffer(self.lengths, dtype=np.int64)
         for term, (nuids, nfreqs) in self.terms.items():
+            nuids, nfreqs = np.frombuffer(nuids, dtype=np.int64), np.frombuffer(nfreqs, dtype=np.int64)
+
             # Retrieve existing uids/freqs
             uids, freqs = self.lookup(term)
 
-            if uids:
-                uids.extend(nuids)
-                freqs.extend(nfreqs)
+            if uids is not None:
+                uids, freqs = np.concatenate([uids, nuids]), np.concatenate([freqs, nfreqs])
             else:
                 uids, freqs = nuids, nfreqs
 
-            # Always save as little endian
-            if sys.byteorder == "big":
-                uids.byteswap()
-                freqs.byteswap()
+            # Insert or replace block statistics
+            self.saveblocks(term, uids, freqs, lengths)
 
             # Insert or replace term
-            self.cursor.execute(Terms.INSERT_TERM, [term, uids.tobytes(), freqs.tobytes()])
+            self.cursor.execute(Terms.INSERT_TERM, [term, *self.encode(uids, freqs)])
 
         # Clear cached weights
         self.weights.cache_clear()
+        self.postings.cache_clear()
 
         # Reset term cache size
         self.terms, self.cachesize = {}, 0
@@ -162,6 +216,8 @@ class Terms:
 
         This is similar to the common terms query in Apache Lucene.
 
+        When pruning is enabled, this method runs an exact document-at-a-time search. See the maxscore method.
+
         Args:
             terms: query terms
             limit: maximum results
@@ -170,6 +226,10 @@ class Terms:
             list of (id, score)
         """
 
+        # Document-at-a-time search with dynamic pruning
+        if self.pruning:
+            return self.maxscore(terms, limit)
+
         # Initialize scores array
         scores = np.zeros(len(self.ids), dtype=np.float32)
 
@@ -200,7 +260,7 @@ class Terms:
             count
         """
 
-        return len(self.ids) - len(self.deletes)
+        return len(self.ids) - self.deleted
 
     def load(self, path):
         """
@@ -216,16 +276,15 @@ class Terms:
         self.path = path
 
         # Load document attributes
-        self.ids, self.deletes, self.lengths = [], [], array("q")
+        self.ids, self.deletes, self.lengths = [], bytearray(), array("q")
 
         self.cursor.execute(Terms.SELECT_DOCUMENTS)
-        for indexid, uid, deleted, length in self.cursor:
+        for _, uid, deleted, length in self.cursor:
             # Index id - id
             self.ids.append(uid)
 
             # Deleted flag
-            if deleted:
-                self.deletes.append(indexid)
+            self.deletes.append(1 if deleted else 0)
 
             # Index id - length
             self.lengths.append(length)
@@ -234,8 +293,19 @@ class Terms:
         if all(uid.isdigit() for uid in self.ids):
             self.ids = [int(uid) for uid in self.ids]
 
+        # Map ids to index ids for documents that aren't deleted
+        self.indexids = {uid: indexid for indexid, uid in enumerate(self.ids) if not self.deletes[indexid]}
+        self.deleted = len(self.ids) - len(self.indexids)
+
+        # Indexes created by earlier versions store raw term frequency sparse arrays
+        self.format = self.cursor.execute("PRAGMA user_version").fetchone()[0]
+
+        # Block statistics aren't stored with indexes created by earlier versions
+        self.hasblocks = self.cursor.execute(Terms.SELECT_BLOCKS_TABLE).fetchone()[0] > 0
+
         # Clear cache
         self.weights.cache_clear()
+        self.postings.cache_clear()
 
     def save(self, path):
         """
@@ -249,8 +319,7 @@ class Terms:
         self.cursor.execute(Terms.DELETE_DOCUMENTS)
 
         # Save document attributes
-        for i, uid in enumerate(self.ids):
-            self.cursor.execute(Terms.INSERT_DOCUMENT, [i, uid, 1 if i in self.deletes else 0, self.lengths[i]])
+        self.cursor.executemany(Terms.INSERT_DOCUMENT, ((i, uid, self.deletes[i], self.lengths[i]) for i, uid in enumerate(self.ids)))
 
         # Temporary database
         if not self.path:
@@ -276,6 +345,67 @@ class Terms:
         else:
             self.copy(path).close()
 
+    def compact(self, batch=1000):
+        """
+        Compacts this index by removing deleted documents from the term frequency sparse arrays. Index ids are
+        renumbered, ids are preserved. Changes are persisted with the next save.
+
+        Args:
+            batch: number of terms to rewrite at a time
+
+        Returns:
+            number of documents removed
+        """
+
+        removed = self.deleted
+        if not removed or not self.connection:
+            return 0
+
+        with self.lock:
+            # Save any remaining cached terms
+            self.index()
+
+            # Map current index ids to new index ids, deleted documents map to -1
+            keep = np.frombuffer(self.deletes, dtype=np.uint8) == 0
+            indexids = np.where(keep, np.cumsum(keep) - 1, -1)
+
+            # Index ids before the first deleted document are unchanged
+            first = np.argmin(keep)
+
+            # Document lengths after compaction
+            lengths = np.frombuffer(self.lengths, dtype=np.int64)[keep]
+            self.createblocks()
+
+            # Rewrite term frequency sparse arrays a batch of terms at a time
+            rowid, rows = 0, True
+            while rows:
+                rows = self.cursor.execute(Terms.SELECT_ALL_TERMS, [rowid, batch]).fetchall()
+                for rowid, term, uids, freqs in rows:
+                    uids, freqs = self.decode(uids, freqs)
+
+                    # Filter deleted documents and renumber index ids. Postings are sorted by index id.
+                    if uids[-1] >= first:
+                        rewrite = keep[uids]
+                        uids, freqs = indexids[uids[rewrite]], freqs[rewrite]
+                        if len(uids):
+                            self.connection.execute(Terms.UPDATE_TERM, [*self.encode(uids, freqs), term])
+                            self.saveblocks(term, uids, freqs, lengths)
+                        else:
+                            self.connection.execute(Terms.DELETE_TERM, [term])
+                            self.connection.execute(Terms.DELETE_BLOCK, [term])
+
+            # Rebuild document attributes
+            self.ids = [uid for x, uid in enumerate(self.ids) if keep[x]]
+            self.lengths = array("q", lengths.tobytes())
+            self.indexids = {uid: indexid for indexid, uid in enumerate(self.ids)}
+            self.deletes, self.deleted = bytearray(len(self.ids)), 0
+
+            # Clear cached weights
+            self.weights.cache_clear()
+            self.postings.cache_clear()
+
+        return removed
+
     def close(self):
         """
         Close and free resources used by this instance.
@@ -298,6 +428,19 @@ class Terms:
             # Create initial schema
             self.cursor.execute(Terms.CREATE_TERMS)
             self.cursor.execute(Terms.CREATE_DOCUMENTS)
+            self.createblocks()
+
+            # Set storage format
+            self.cursor.execute(f"PRAGMA user_version = {self.format}")
+
+    def createblocks(self):
+        """
+        Creates the block statistics table, if necessary.
+        """
+
+        if not self.hasblocks:
+            self.cursor.execute(Terms.CREATE_BLOCKS)
+            self.hasblocks = True
 
     def connect(self, path=""):
         """
@@ -345,6 +488,9 @@ class Terms:
             # Database is up to date, can do a more efficient copy with SQLite C API
             self.connection.backup(connection)
 
+        # Storage format is stored in the database header, which iterdump doesn't copy
+        connection.execute(f"PRAGMA user_version = {self.format}")
+
         return connection
 
     def add(self, indexid, term, freq):
@@ -377,20 +523,118 @@ class Terms:
             term frequency sparse array
         """
 
-        uids, freqs = None, None
-
         result = self.cursor.execute(Terms.SELECT_TERMS, [term]).fetchone()
-        if result:
-            uids, freqs = (array("q"), array("q"))
-            uids.frombytes(result[0])
-            freqs.frombytes(result[1])
+        return self.decode(*result) if result else (None, None)
+
+    def encode(self, uids, freqs):
+        """
+        Encodes a term frequency sparse array using the database storage format.
+
+        Args:
+            uids: index ids
+            freqs: term frequencies
 
-            # Storage format is always little endian
-            if sys.byteorder == "big":
-                uids.byteswap()
-                freqs.byteswap()
+        Returns:
+            (encoded index ids, encoded term frequencies)
+        """
+
+        if self.format:
+            return self.codec.encode(uids, freqs)
 
-        return uids, freqs
+        # Raw format is always little endian
+        return uids.astype("<i8").tobytes(), freqs.astype("<i8").tobytes()
+
+    def decode(self, uids, freqs):
+        """
+        Decodes a term frequency sparse array using the database storage format.
+
+        Args:
+            uids: encoded index ids
+            freqs: encoded term frequencies
+
+        Returns:
+            (index ids, term frequencies)
+        """
+
+        if self.format:
+            return self.codec.decode(uids, freqs)
+
+        # Raw format is always little endian. Arrays are copied, scoring functions can modify term frequencies in place.
+        return np.frombuffer(uids, dtype="<i8").astype(np.int64), np.frombuffer(freqs, dtype="<i8").astype(np.int64)
+
+    def saveblocks(self, term, uids, freqs, lengths):
+        """
+        Calculates and saves block statistics for a term frequency sparse array.
+
+        Args:
+            term: term
+            uids: index ids
+            freqs: term frequencies
+            lengths: document lengths for all index ids
+        """
+
+        blocks, freqs, lengths = self.blocks(uids, freqs, lengths)
+
+        # Block ids are sorted and stored the same way as index ids. Raw format is always little endian.
+        if self.format:
+            blocks = [*self.codec.encode(blocks, freqs), self.codec.pack(lengths)]
+        else:
+            blocks = [x.astype("<i8").tobytes() for x in (blocks, freqs, lengths)]
+
+        self.connection.execute(Terms.INSERT_BLOCK, [term] + blocks)
+
+    def blocks(self, uids, freqs, lengths):
+        """
+        Calculates block statistics for a term frequency sparse array.
+
+        Args:
+            uids: index ids
+            freqs: term frequencies
+            lengths: document lengths for all index ids
+
+        Returns:
+            (block ids, max term frequency per block, min document length per block)
+        """
+
+        # Index ids are sorted, find the first entry for each block
+        blocks, starts = np.unique(uids // Terms.BLOCKSIZE, return_index=True)
+
+        return blocks, np.maximum.reduceat(freqs, starts), np.minimum.reduceat(lengths[uids], starts)
+
+    @functools.lru_cache(maxsize=500)
+    def postings(self, term):
+        """
+        Retrieves a term frequency sparse array along with block statistics. This method is wrapped with a least
+        recently used cache.
+
+        Args:
+            term: term
+
+        Returns:
+            (uids, freqs, blocks, block max freqs, block min lengths, block offsets)
+        """
+
+        lengths = np.frombuffer(self.lengths, dtype=np.int64)
+
+        with self.lock:
+            uids, freqs = self.lookup(term)
+            blocks = self.cursor.execute(Terms.SELECT_BLOCKS, [term]).fetchone() if uids is not None and self.hasblocks else None
+
+        if uids is None:
+            return None
+
+        # Calculate block statistics when they aren't stored
+        if not blocks:
+            blocks = self.blocks(uids, freqs, lengths)
+        elif self.format:
+            blocks = [*self.codec.decode(blocks[0], blocks[1]), self.codec.unpack(blocks[2])]
+        else:
+            blocks = [np.frombuffer(x, dtype="<i8") for x in blocks]
+
+        # Offsets of the first entry for each block
+        offsets = np.append(np.searchsorted(uids, blocks[0] * Terms.BLOCKSIZE), len(uids))
+
+        return (uids, freqs, *blocks, offsets)
 
     @functools.lru_cache(maxsize=500)
     def weights(self, term):
@@ -411,12 +655,148 @@ class Terms:
             uids, freqs = self.lookup(term)
             weights = None
 
-        if uids:
-            uids = np.frombuffer(uids, dtype=np.int64)
-            weights = self.score(np.frombuffer(freqs, dtype=np.int64), self.idf[term], lengths[uids]).astype(np.float32)
+        if uids is not None:
+            weights = self.score(freqs, self.idf[term], lengths[uids]).astype(np.float32)
 
         return uids, weights
 
+    def maxscore(self, terms, limit):
+        """
+        Searches term index a document-at-a-time with block-max MaxScore dynamic pruning. Results are exact.
+
+        Index ids are grouped into blocks. Each term has a max score per block, derived from stored block statistics.
+        Blocks are visited in descending order of the sum of the block max scores. Remaining blocks are skipped once this
+        upper bound can't beat the current topn. Within a block, terms are split into essential and non-essential terms.
+        Documents that only match non-essential terms can't enter the topn, so non-essential terms are only scored for
+        documents matching essential terms.
+
+        Blocks are scored in groups to limit per block overhead. Term scores are only computed for visited blocks and
+        score arrays are sized to a group of blocks.
+
+        Args:
+            terms: query terms
+            limit: maximum results
+
+        Returns:
+            list of (id, score)
+        """
+
+        # Get term postings and block max scores
+        terms, postings = Counter(terms), []
+        bounds = np.zeros((len(terms), (len(self.ids) + Terms.BLOCKSIZE - 1) // Terms.BLOCKSIZE))
+        for term, freq in terms.items():
+            result = self.postings(term)
+            if result:
+                uids, freqs, blocks, maxfreqs, minlengths, offsets = result
+                bounds[len(postings), blocks] = freq * np.maximum(self.score(maxfreqs, self.idf[term], minlengths), 0)
+                postings.append((freq, self.idf[term], uids, freqs, blocks, offsets))
+
+        # Block upper bounds, visited in descending order
+        bounds = bounds[: len(postings)]
+        upper = bounds.sum(axis=0)
+        order = np.argsort(-upper, kind="stable")
+        order = order[upper[order] > 0]
+
+        # Running topn index ids and scores
+        ids, scores = np.empty(0, dtype=np.int64), np.empty(0)
+
+        size = max(Terms.GROUPSIZE // Terms.BLOCKSIZE, 1)
+        for x in range(0, len(order), size):
+            # Scores must be greater than the lowest topn score, require score > 0
+            threshold = scores.min() if len(scores) == limit else 0
+
+            # Skip blocks that can't beat the threshold. Allow for floating point rounding in the bounds.
+            cutoff = threshold * (1 - 1e-9)
+            blocks = order[x : x + size]
+            blocks = blocks[upper[blocks] > cutoff]
+            if blocks.size == 0:
+                break
+
+            # Score group of blocks and get matches that beat the threshold
+            values = self.scoreblocks(blocks, postings, bounds[:, blocks] if len(postings) > 1 else None, cutoff)
+            matches = np.flatnonzero(values > threshold)
+
+            # Map to index ids and filter deletes
+            uids = blocks[matches // Terms.BLOCKSIZE] * Terms.BLOCKSIZE + matches % Terms.BLOCKSIZE
+            if self.deleted:
+                matches = matches[~np.frombuffer(self.deletes, dtype=bool)[uids]]
+                uids = blocks[matches // Terms.BLOCKSIZE] * Terms.BLOCKSIZE + matches % Terms.BLOCKSIZE
+
+            # Merge matches into topn
+            ids, scores = np.concatenate([ids, uids]), np.concatenate([scores, values[matches]])
+            if len(scores) > limit:
+                indices = np.argpartition(-scores, limit)[:limit]
+                ids, scores = ids[indices], scores[indices]
+
+        # Sort topn and combine ids with scores
+        indices = np.argsort(-scores, kind="stable")
+        return [(self.ids[x], score) for x, score in zip(ids[indices].tolist(), scores[indices].tolist())]
+
+    def scoreblocks(self, blocks, postings, bounds, cutoff):
+        """
+        Scores a group of blocks. Non-essential terms in a block are only scored for documents that match an
+        essential term in that block.
+
+        Args:
+            blocks: block ids
+            postings: list of (query term frequency, idf, uids, freqs, term block ids, term block offsets)
+            bounds: block max scores with shape (terms, blocks), None if all terms are essential
+            cutoff: minimum score a document needs to enter the topn
+
+        Returns:
+            scores array with Terms.BLOCKSIZE entries per block
+        """
+
+        lengths = np.frombuffer(self.lengths, dtype=np.int64)
+
+        # Essential terms per block. Non-essential terms are the lowest scoring terms with a combined block max
+        # score below the cutoff.
+        essential = None
+        if bounds is not None:
+            order = np.argsort(bounds, axis=0)
+            essential = np.empty(bounds.shape, dtype=bool)
+            np.put_along_axis(essential, order, np.cumsum(np.take_along_axis(bounds, order, axis=0), axis=0) > cutoff, axis=0)
+
+        # Score essential terms first, then non-essential terms
+        values = np.zeros(len(blocks) * Terms.BLOCKSIZE)
+        for required in [True, False]:
+            for x, (freq, idf, uids, freqs, termblocks, offsets) in enumerate(postings):
+                # Find group blocks with entries for this term
+                indices = np.searchsorted(termblocks, blocks)
+                indices[indices == len(termblocks)] = 0
+                mask = termblocks[indices] == blocks
+                mask &= essential[x] == required if essential is not None else required
+
+                if mask.any():
+                    # Get term entries for each block and position in the scores array
+                    starts, ends = offsets[indices[mask]], offsets[indices[mask] + 1]
+                    entries = self.ranges(starts, ends)
+                    positions = uids[entries] + np.repeat((np.flatnonzero(mask) - blocks[mask]) * Terms.BLOCKSIZE, ends - starts)
+
+                    # Non-essential terms only score documents already matched by essential terms
+                    if not required:
+                        matches = values[positions] > 0
+                        entries, positions = entries[matches], positions[matches]
+
+                    values[positions] += freq * self.score(freqs[entries], idf, lengths[uids[entries]])
+
+        return values
+
+    def ranges(self, starts, ends):
+        """
+        Builds a flat array of indices for a list of [start, end) ranges.
+
+        Args:
+            starts: range starts
+            ends: range ends
+
+        Returns:
+            array of indices
+        """
+
+        counts = ends - starts
+        return np.arange(counts.sum()) + np.repeat(starts - np.cumsum(counts) + counts, counts)
+
     def topn(self, scores, limit, hasscores, skipped):
         """
         Get topn scores from an partial scores array.
@@ -493,7 +873,8 @@ class Terms:
         """
 
         # Clear deletes
-        scores[self.deletes] = 0
+        if self.deleted:
+            scores[np.frombuffer(self.deletes, dtype=bool)] = 0
 
         # Get topn candidates
         return np.argpartition(scores, -topn)[-topn:]
@@ -46,7 +46,7 @@ class TFIDF(Scoring):
         self.tokenizer = None
 
         # Term index
-        self.terms = Terms(self.config["terms"], self.score, self.idf) if self.config.get("terms") else None
+        self.terms = Terms(self.config["terms"], self.score, self.idf, self.isbounded()) if self.config.get("terms") else None
 
         # Document data
         self.documents = {} if self.config.get("content") else None
@@ -208,7 +208,7 @@ class TFIDF(Scoring):
 
         # Load terms
         if self.config.get("terms"):
-            self.terms = Terms(self.config["terms"], self.score, self.idf)
+            self.terms = Terms(self.config["terms"], self.score, self.idf, self.isbounded())
             self.terms.load(path + ".terms")
 
     def save(self, path):
@@ -238,6 +238,19 @@ class TFIDF(Scoring):
     def isnormalized(self):
         return self.normalize
 
+    def isbounded(self):
+        """
+        Checks if token scores are non-decreasing with token frequency and non-increasing with document length. This
+        enables document-at-a-time term index searches with dynamic pruning.
+
+        Subclasses that override the score method must also override this method to opt in.
+
+        Returns:
+            True if token scores are bounded, False otherwise
+        """
+
+        return type(self).score is TFIDF.score
+
     def computefreq(self, tokens):
         """
         Computes token frequency. Used for token weighting.
@@ -2,6 +2,8 @@
 SparseArray module
 """
 
+import tempfile
+
 import numpy as np
 
 # Conditional import
@@ -18,6 +20,9 @@ class SparseArray:
     Methods to load and save sparse arrays to file.
     """
 
+    # Maximum number of stored values and columns for 32-bit index arrays
+    LIMIT = np.iinfo(np.int32).max
+
     def __init__(self):
         """
         Creates a SparseArray instance.
@@ -26,27 +31,23 @@ class SparseArray:
         if not SCIPY:
             raise ImportError("SciPy is not available - install scipy to enable")
 
-    def load(self, f):
+    def load(self, f, mmap=False):
         """
         Loads a sparse array from file.
 
         Args:
             f: input file handle
+            mmap: if True, data, indices and indptr arrays are memory mapped from file, requires a file on disk
 
         Returns:
             sparse array
         """
 
         # Load raw data
-        data, indices, indptr, shape = (
-            np.load(f, allow_pickle=False),
-            np.load(f, allow_pickle=False),
-            np.load(f, allow_pickle=False),
-            np.load(f, allow_pickle=False),
-        )
+        data, indices, indptr, shape = self.array(f, mmap), self.array(f, mmap), self.array(f, mmap), np.load(f, allow_pickle=False)
 
         # Load data into sparse array
-        return csr_matrix((data, indices, indptr), shape=shape)
+        return csr_matrix((data, indices, indptr), shape=tuple(shape), copy=False)
 
     def save(self, f, array):
         """
@@ -60,3 +61,130 @@ class SparseArray:
         # Save sparse array to file
         for x in [array.data, array.indices, array.indptr, array.shape]:
             np.save(f, x, allow_pickle=False)
+
+    def stack(self, arrays, directory=None):
+        """
+        Vertically stacks a stream of sparse arrays into a single sparse array. The data and indices arrays are spooled
+        to temporary files and memory mapped. This keeps memory usage bounded regardless of the number of rows.
+
+        Args:
+            arrays: iterable of sparse arrays
+            directory: optional directory for temporary files
+
+        Returns:
+            sparse array
+        """
+
+        rows, columns, size, dtype, indptr = 0, 0, 0, None, [np.zeros(1, dtype=np.int64)]
+
+        # Index arrays use 32-bit integers until the number of stored values or columns exceeds the 32-bit range
+        itype = np.int32
+
+        # Temporary files are deleted once closed and unmapped
+        fdata, findices = tempfile.TemporaryFile(dir=directory), tempfile.TemporaryFile(dir=directory)
+        try:
+            for array in arrays:
+                # Data type is set by the first array, all arrays must have the same data type
+                dtype = array.data.dtype if dtype is None else dtype
+                if array.data.dtype != dtype:
+                    raise ValueError(f"Sparse array data type {array.data.dtype} doesn't match {dtype}")
+
+                rows, columns = rows + array.shape[0], max(columns, array.shape[1])
+
+                # Switch to 64-bit indices, rewrites indices already spooled
+                if itype == np.int32 and (size + array.nnz > SparseArray.LIMIT or columns > SparseArray.LIMIT):
+                    findices, itype = self.widen(findices, directory), np.int64
+
+                # Append row offsets relative to the number of values already written
+                indptr.append(array.indptr[1:].astype(np.int64) + size)
+                size += array.nnz
+
+                # Spool data and column indices
+                fdata.write(np.ascontiguousarray(array.data).tobytes())
+                findices.write(np.ascontiguousarray(array.indices, dtype=itype).tobytes())
+
+            # Index arrays share a single type
+            indptr = np.concatenate(indptr).astype(itype)
+
+            # Memory map spooled arrays
+            data = self.mmap(fdata, dtype if dtype else np.float32, size)
+            indices = self.mmap(findices, itype, size)
+
+        finally:
+            fdata.close()
+            findices.close()
+
+        return csr_matrix((data, indices, indptr), shape=(rows, columns), copy=False)
+
+    def array(self, f, mmap):
+        """
+        Reads a NumPy array from file. The array is memory mapped when mmap is True.
+
+        Args:
+            f: input file handle
+            mmap: if True, memory map array
+
+        Returns:
+            array
+        """
+
+        if not mmap:
+            return np.load(f, allow_pickle=False)
+
+        # Read array header
+        version = np.lib.format.read_magic(f)
+        shape, fortran, dtype = np.lib.format.read_array_header_1_0(f) if version == (1, 0) else np.lib.format.read_array_header_2_0(f)
+
+        # Empty arrays can't be memory mapped
+        offset, size = f.tell(), int(np.prod(shape)) * dtype.itemsize
+        if not size:
+            return np.zeros(shape, dtype=dtype)
+
+        # Map array and move file position to the end of the array
+        array = np.memmap(f, dtype=dtype, mode="r", offset=offset, shape=shape, order="F" if fortran else "C")
+        f.seek(offset + size)
+
+        return array
+
+    def widen(self, f, directory, batch=1048576):
+        """
+        Rewrites a spooled 32-bit integer array as 64-bit integers to a new temporary file. The array is copied in batches
+        and the input file is closed.
+
+        Args:
+            f: input file handle
+            directory: optional directory for temporary files
+            batch: number of elements to copy at a time
+
+        Returns:
+            output file handle
+        """
+
+        f.flush()
+        f.seek(0)
+
+        output = tempfile.TemporaryFile(dir=directory)
+        for chunk in iter(lambda: f.read(batch * 4), b""):
+            output.write(np.frombuffer(chunk, dtype=np.int32).astype(np.int64).tobytes())
+
+        f.close()
+        return output
+
+    def mmap(self, f, dtype, size):
+        """
+        Memory maps a spooled array.
+
+        Args:
+            f: input file handle
+            dtype: array data type
+            size: number of elements
+
+        Returns:
+            array
+        """
+
+        # Write buffered data
+        f.flush()
+
+        # Empty arrays can't be memory mapped
+        return np.memmap(f, dtype=dtype, mode="r", shape=(size,)) if size else np.zeros(size, dtype=dtype)
@@ -3,6 +3,8 @@ Vectors imports
 """
 
 from .base import Vectors
+from .cache import Cache
 from .dense import *
 from .recovery import Recovery
+from .store import Store
 from .sparse import *
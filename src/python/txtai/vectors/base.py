@@ -4,6 +4,7 @@ Vectors module
 
 import json
 import os
+import struct
 import tempfile
 import uuid
 
@@ -11,9 +12,18 @@ import numpy as np
 
 from ..pipeline import Tokenizer
 
+from .cache import Cache
 from .recovery import Recovery
+from .stage import Stage
+from .store import Store
+from .workers import Workers
 
+# Spool file header size in bytes. The header stores a format id, the embeddings dtype and number of dimensions. It's
+# padded to keep the embeddings array that follows aligned.
+HEADER = 64
 
+
+# pylint: disable=R0904
 class Vectors:
     """
     Base class for vector models. Vector models transform input content into numeric vectors.
@@ -47,6 +57,9 @@ class Vectors:
             # Encode batch size - controls underlying model batch size when encoding vectors
             self.encodebatch = config.get("encodebatch", 32)
 
+            # Encode token budget - groups inputs by tokenized length into batches with this number of padded tokens
+            self.encodetokens = config.get("encodetokens")
+
             # Embeddings instructions
             self.instructions = config.get("instructions")
 
@@ -57,6 +70,20 @@ class Vectors:
             quantize = config.get("quantize")
             self.qbits = max(min(quantize, 8), 1) if isinstance(quantize, int) and not isinstance(quantize, bool) else None
 
+            # Keep full precision vectors when rescoring is enabled, quantization is applied when vectors are indexed
+            self.rescore = config.get("rescore")
+
+            # Query vectors cache
+            size = config.get("querycache")
+            self.cache = Cache(1024 if isinstance(size, bool) else size) if size else None
+
+            # Persistent vectors store, skips vectorizing previously indexed content
+            self.store = Store(config["vectorstore"]) if config.get("vectorstore") else None
+
+            # Number of worker processes used to encode data, the process pool is started on first use
+            workers = config.get("workers")
+            self.workers, self.processes = os.cpu_count() if isinstance(workers, bool) and workers else workers, None
+
     def loadmodel(self, path):
         """
         Loads vector model at path.
@@ -106,15 +133,16 @@ class Vectors:
 
         return model
 
-    def index(self, documents, batchsize=500, checkpoint=None):
+    def index(self, documents, batchsize=500, checkpoint=None, buffer=None):
         """
-        Converts a list of documents to a temporary file with embeddings arrays. Returns a tuple of document ids,
-        number of dimensions and temporary file with embeddings.
+        Converts a list of documents to a spool file with embeddings arrays. Returns a tuple of document ids,
+        number of dimensions and spool file with embeddings.
 
         Args:
             documents: list of (id, data, tags)
             batchsize: index batch size
             checkpoint: optional checkpoint directory, enables indexing restart
+            buffer: optional buffer file, embeddings are spooled to a temporary file if not set
 
         Returns:
             (ids, dimensions, batches, stream)
@@ -127,25 +155,38 @@ class Vectors:
         recovery = Recovery(checkpoint, vectorsid, self.loadembeddings) if checkpoint else None
 
         # Convert all documents to embedding arrays, stream embeddings to disk to control memory usage
-        with self.spool(checkpoint, vectorsid) as output:
-            stream = output.name
-            batch = []
-            for document in documents:
-                batch.append(document)
-
-                if len(batch) == batchsize:
-                    # Convert batch to embeddings
-                    uids, dimensions = self.batch(batch, output, recovery)
-                    ids.extend(uids)
+        with self.spool(checkpoint, vectorsid, buffer) as output:
+            stream = output.name if checkpoint or buffer is None else buffer
+
+            # Documents are prepared in this thread. Encoding and spooling run in background threads connected by
+            # bounded queues. Each stage runs concurrently with the other stages.
+            shapes = []
+            spool = Stage(lambda embeddings: shapes.append(self.write(output, embeddings)))
+            encode = Stage(lambda batch: self.batch(batch, recovery), spool)
+
+            try:
+                batch = []
+                for document in documents:
+                    batch.append(document)
+
+                    if len(batch) == batchsize:
+                        # Convert batch to embeddings
+                        ids.extend(self.submit(batch, encode))
+                        batches += 1
+
+                        batch = []
+
+                # Final batch
+                if batch:
+                    ids.extend(self.submit(batch, encode))
                     batches += 1
 
-                    batch = []
+            finally:
+                # Wait for all stages to complete
+                encode.close()
 
-            # Final batch
-            if batch:
-                uids, dimensions = self.batch(batch, output, recovery)
-                ids.extend(uids)
-                batches += 1
+            # Number of dimensions from the last batch
+            dimensions = next((x for x in reversed(shapes) if x), None)
 
         return (ids, dimensions, batches, stream)
 
@@ -153,11 +194,14 @@ class Vectors:
         """
         Bulk encodes documents into vectors using index(). Return the data as a mmap-ed array.
 
+        Embeddings are spooled to the buffer file, or the checkpoint file when checkpointing is enabled, and that file is
+        memory mapped directly as the embeddings array.
+
         Args:
             documents: list of (id, data, tags)
             batchsize: index batch size
             checkpoint: optional checkpoint directory, enables indexing restart
-            buffer: file path used for memmap buffer
+            buffer: file path or file used for memmap buffer
             dtype: dtype for buffer
 
         Returns:
@@ -165,22 +209,25 @@ class Vectors:
         """
 
         # Consume stream and transform documents to vectors
-        ids, dimensions, batches, stream = self.index(documents, batchsize, checkpoint)
+        ids, dimensions, _, stream = self.index(documents, batchsize, checkpoint, buffer)
 
         # Check that embeddings are available and load as a memmap
         embeddings = None
         if ids:
-            # Write batches
-            embeddings = np.memmap(buffer, dtype=dtype, shape=(len(ids), dimensions), mode="w+")
-            with open(stream, "rb") as queue:
-                x = 0
-                for _ in range(batches):
-                    batch = self.loadembeddings(queue)
-                    embeddings[x : x + batch.shape[0]] = batch
-                    x += batch.shape[0]
-
-        # Remove temporary file (if checkpointing is disabled)
-        if not checkpoint:
+            # Checkpoint files are mapped copy-on-write, changes to the embeddings array don't modify the checkpoint
+            embeddings = np.memmap(stream, dtype=np.uint8, mode="c" if checkpoint else "r+")
+
+            # Read header and view the remaining bytes as the embeddings array
+            spooltype, dimensions = self.header(embeddings[:HEADER].tobytes())
+            embeddings = embeddings[HEADER : HEADER + len(ids) * dimensions * spooltype.itemsize].view(spooltype).reshape(len(ids), dimensions)
+
+            # Convert to requested dtype, if necessary
+            if dtype and embeddings.dtype != dtype:
+                embeddings = embeddings.astype(dtype)
+
+        # Load into memory and remove temporary file (if checkpointing and buffer are disabled)
+        if not checkpoint and buffer is None:
+            embeddings = np.array(embeddings) if embeddings is not None else None
             os.remove(stream)
 
         return (ids, dimensions, embeddings)
@@ -192,6 +239,19 @@ class Vectors:
 
         self.model = None
 
+        # Clear query vectors cache
+        if self.config and self.cache is not None:
+            self.cache.clear()
+
+        # Close persistent vectors store
+        if self.config and self.store is not None:
+            self.store.close()
+
+        # Stop worker processes
+        if self.config and self.processes:
+            self.processes.close()
+            self.processes = None
+
     def transform(self, document):
         """
         Transforms document into an embeddings vector.
@@ -225,8 +285,57 @@ class Vectors:
         if documents and isinstance(documents[0], np.ndarray):
             return np.array(documents, dtype=np.float32)
 
+        # Read vectors from cache, if enabled
+        if self.cache is not None and self.iscacheable(documents):
+            return self.cached(self.cache, documents, category)
+
         return self.vectorize(documents, category)
 
+    def cached(self, cache, documents, category=None):
+        """
+        Transforms a batch of prepared documents into embeddings vectors using a vectors cache.
+        Only cache misses are vectorized.
+
+        Args:
+            cache: vectors cache
+            documents: list of prepared documents
+            category: category for instruction-based embeddings
+
+        Returns:
+            embeddings vectors
+        """
+
+        # Cache keys are the prepared text and category, vectors are bound to the vectors configuration id
+        vectorsid, category = self.vectorsid(), category if category else "query"
+        keys = [(category, document) for document in documents]
+
+        # Get cached vectors
+        vectors = cache.get(vectorsid, keys)
+
+        # Vectorize and cache misses
+        misses = [x for x, vector in enumerate(vectors) if vector is None]
+        if misses:
+            embeddings = self.vectorize([documents[x] for x in misses], category)
+            cache.put(vectorsid, [keys[x] for x in misses], embeddings)
+
+            for x, embedding in zip(misses, embeddings):
+                vectors[x] = embedding
+
+        return np.array(vectors)
+
+    def iscacheable(self, documents):
+        """
+        Checks if a batch of prepared documents can be read from a vectors cache. Only text is cached.
+
+        Args:
+            documents: list of prepared documents
+
+        Returns:
+            True if documents can be cached, False otherwise
+        """
+
+        return bool(documents) and all(isinstance(document, str) for document in documents)
+
     def dot(self, queries, data):
         """
         Calculates the dot product similarity between queries and documents. This method
@@ -251,20 +360,21 @@ class Vectors:
         """
 
         # Select config options that determine uniqueness
-        select = ["path", "method", "tokenizer", "maxlength", "tokenize", "instructions", "dimensionality", "quantize"]
+        select = ["path", "method", "tokenizer", "maxlength", "tokenize", "instructions", "dimensionality", "quantize", "rescore"]
         config = {k: v for k, v in self.config.items() if k in select}
         config.update(self.config.get("vectors", {}))
 
         # Generate a deterministic UUID
-        return str(uuid.uuid5(uuid.NAMESPACE_DNS, json.dumps(config, sort_keys=True)))
+        return str(uuid.uuid5(uuid.NAMESPACE_DNS, json.dumps(config, sort_keys=True, default=str)))
 
-    def spool(self, checkpoint, vectorsid):
+    def spool(self, checkpoint, vectorsid, buffer=None):
         """
         Opens a spool file for queuing generated vectors.
 
         Args:
             checkpoint: optional checkpoint directory, enables indexing restart
             vectorsid: vectors uid for current configuration
+            buffer: optional buffer file path or file
 
         Returns:
             vectors spool file
@@ -275,35 +385,70 @@ class Vectors:
             os.makedirs(checkpoint, exist_ok=True)
             return open(f"{checkpoint}/{vectorsid}", "wb")
 
+        # Spool to buffer file, open files are written through their file descriptor and left open
+        if buffer is not None:
+            return open(buffer, "wb") if isinstance(buffer, (str, os.PathLike)) else open(buffer.fileno(), "wb", closefd=False)
+
         # Spool to temporary file
         return tempfile.NamedTemporaryFile(mode="wb", suffix=".npy", delete=False)
 
-    def batch(self, documents, output, recovery):
+    def submit(self, documents, stage):
         """
-        Builds a batch of embeddings.
+        Prepares a batch of documents and sends it to the encoding stage.
 
         Args:
             documents: list of documents used to build embeddings
-            output: output temp file to store embeddings
-            recovery: optional recovery instance
+            stage: encoding stage
 
         Returns:
-            (ids, dimensions) list of ids and number of dimensions in embeddings
+            list of ids
         """
 
         # Extract ids and prepare input documents for vectors model
         ids = [uid for uid, _, _ in documents]
-        documents = [self.prepare(data, "data") for _, data, _ in documents]
-        dimensions = None
+        stage.put([self.prepare(data, "data") for _, data, _ in documents])
+
+        return ids
+
+    def batch(self, documents, recovery):
+        """
+        Builds a batch of embeddings.
+
+        Args:
+            documents: list of prepared documents
+            recovery: optional recovery instance
+
+        Returns:
+            embeddings
+        """
 
         # Attempt to read embeddings from a recovery file
-        embeddings = recovery() if recovery else None
-        embeddings = self.vectorize(documents, "data") if embeddings is None else embeddings
+        embeddings = recovery(len(documents)) if recovery else None
+
+        # Vectorize documents, only new or modified documents are vectorized when the vectors store is enabled
+        if embeddings is None:
+            store = self.store is not None and self.iscacheable(documents)
+            embeddings = self.cached(self.store, documents, "data") if store else self.vectorize(documents, "data")
+
+        return embeddings
+
+    def write(self, output, embeddings):
+        """
+        Writes a batch of embeddings to the spool file.
+
+        Args:
+            output: output temp file to store embeddings
+            embeddings: batch of embeddings
+
+        Returns:
+            number of dimensions in embeddings
+        """
+
         if embeddings is not None:
-            dimensions = embeddings.shape[1]
             self.saveembeddings(output, embeddings)
+            return embeddings.shape[1]
 
-        return (ids, dimensions)
+        return None
 
     def prepare(self, data, category=None):
         """
@@ -358,7 +503,9 @@ class Vectors:
           1. Encode data into vectors using underlying model
           2. Truncate vectors, if necessary
           3. Normalize vectors
-          4. Quantize vectors, if necessary
+          4. Quantize vectors, if necessary. Skipped when rescoring is enabled.
+
+        Data with more than one encoding batch is split across worker processes, when enabled.
 
         Args:
             data: input data
@@ -368,6 +515,10 @@ class Vectors:
             embeddings vectors
         """
 
+        # Encode data with worker processes
+        if self.workers and category == "data" and len(data) > self.encodebatch:
+            return self.parallel(data)
+
         # Default instruction category
         category = category if category else "query"
 
@@ -383,34 +534,86 @@ class Vectors:
             embeddings = self.normalize(embeddings)
 
             # Apply quantization, if necessary
-            if self.qbits:
+            if self.qbits and not self.rescore:
                 embeddings = self.quantize(embeddings)
 
         return embeddings
 
-    def loadembeddings(self, f):
+    def parallel(self, data):
+        """
+        Runs data vectorization with a pool of worker processes. Each worker process loads a separate model.
+
+        Args:
+            data: input data
+
+        Returns:
+            embeddings vectors
         """
-        Loads embeddings from file.
+
+        # Start worker processes
+        if not self.processes:
+            self.processes = Workers(type(self), self.config, self.workers)
+
+        return self.processes(data, self.encodebatch)
+
+    def loadembeddings(self, f, rows=None):
+        """
+        Loads embeddings from a spool file. Spool files have a header followed by a raw contiguous embeddings array.
 
         Args:
             f: file to load from
+            rows: number of rows to load, loads all remaining rows if None
 
         Returns:
             embeddings
         """
 
-        return np.load(f, allow_pickle=False)
+        # Read header and move to current position in embeddings array
+        position = f.tell()
+        f.seek(0)
+        dtype, dimensions = self.header(f.read(HEADER))
+        f.seek(max(position, HEADER))
+
+        # Read rows, partially written batches are ignored
+        size = dimensions * dtype.itemsize
+        data = f.read(rows * size if rows else -1)
+        if not data or len(data) < (rows * size if rows else size):
+            raise EOFError("No more embeddings in spool file")
+
+        return np.frombuffer(data[: len(data) - len(data) % size], dtype=dtype).reshape(-1, dimensions)
 
     def saveembeddings(self, f, embeddings):
         """
-        Saves embeddings to output.
+        Saves embeddings to output. The spool file header is written with the first batch.
 
         Args:
             f: output file
             embeddings: embeddings to save
         """
 
-        np.save(f, embeddings, allow_pickle=False)
+        if not f.tell():
+            header = struct.pack("<8s8sQ", b"TXTAIVEC", embeddings.dtype.str.encode("ascii"), embeddings.shape[1])
+            f.write(header.ljust(HEADER, b"\0"))
+
+        f.write(np.ascontiguousarray(embeddings).tobytes())
+
+    def header(self, data):
+        """
+        Parses a spool file header.
+
+        Args:
+            data: header bytes
+
+        Returns:
+            (dtype, dimensions)
+        """
+
+        # Empty spool file or an unknown format (i.e. checkpoints created with an earlier version), no embeddings to read
+        if len(data) < HEADER or not data.startswith(b"TXTAIVEC"):
+            raise EOFError("No embeddings in spool file")
+
+        _, dtype, dimensions = struct.unpack_from("<8s8sQ", data)
+        return np.dtype(dtype.rstrip(b"\0").decode("ascii")), dimensions
 
     def truncate(self, embeddings):
         """
@@ -0,0 +1,121 @@
+"""
+Cache module
+"""
+
+from collections import OrderedDict
+from threading import Lock
+
+
+class Cache:
+    """
+    Thread-safe, size-bounded least recently used (LRU) cache of embeddings vectors.
+    """
+
+    def __init__(self, size):
+        """
+        Creates a new cache.
+
+        Args:
+            size: maximum number of cached vectors
+        """
+
+        self.size = size
+
+        # Cached vectors and lock to synchronize access
+        self.data, self.lock = OrderedDict(), Lock()
+
+        # Id of the vectors configuration used to generate the cached vectors
+        self.vectorsid = None
+
+        # Cache statistics
+        self.hits, self.misses = 0, 0
+
+    def __len__(self):
+        """
+        Gets the number of cached vectors.
+
+        Returns:
+            number of cached vectors
+        """
+
+        return len(self.data)
+
+    def get(self, vectorsid, keys):
+        """
+        Gets cached vectors for a list of keys. Cached vectors are cleared when the vectors configuration changes.
+
+        Args:
+            vectorsid: vectors configuration id
+            keys: list of keys
+
+        Returns:
+            list of cached vectors, None for keys not in the cache
+        """
+
+        with self.lock:
+            # Clear cache when the vectors configuration changes
+            if vectorsid != self.vectorsid:
+                self.data.clear()
+                self.vectorsid = vectorsid
+
+            results = []
+            for key in keys:
+                vector = self.data.get(key)
+                if vector is not None:
+                    # Mark as most recently used
+                    self.data.move_to_end(key)
+                    self.hits += 1
+                else:
+                    self.misses += 1
+
+                results.append(vector)
+
+            return results
+
+    def put(self, vectorsid, keys, vectors):
+        """
+        Adds vectors to the cache. The least recently used vectors are evicted when the cache is full.
+
+        Args:
+            vectorsid: vectors configuration id
+            keys: list of keys
+            vectors: list of vectors
+        """
+
+        with self.lock:
+            # Skip vectors generated with a previous configuration
+            if vectorsid != self.vectorsid:
+                return
+
+            for key, vector in zip(keys, vectors):
+                # Store a read-only copy, callers may modify returned arrays
+                vector = vector.copy()
+                vector.flags.writeable = False
+
+                self.data[key] = vector
+                self.data.move_to_end(key)
+
+            # Evict least recently used vectors
+            while len(self.data) > self.size:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        """
+        Clears the cache and resets statistics.
+        """
+
+        with self.lock:
+            self.data.clear()
+            self.vectorsid = None
+            self.hits, self.misses = 0, 0
+
+    def stats(self):
+        """
+        Gets cache statistics.
+
+        Returns:
+            dict with cache size, hits and misses
+        """
+
+        with self.lock:
+            return {"size": len(self.data), "hits": self.hits, "misses": self.misses}
@@ -2,7 +2,16 @@
 Hugging Face module
 """
 
+import hashlib
+import json
+import os
+import tempfile
+
+from transformers.utils import cached_file
+
 from ...models import Models, PoolingFactory
+from ...pipeline import HFOnnx
+from ...pipeline.train.hfonnx import PoolingOnnx
 
 from ..base import Vectors
 
@@ -27,6 +36,11 @@ class HFVectors(Vectors):
         return method in ("transformers", "pooling", "clspooling", "meanpooling")
 
     def loadmodel(self, path):
+        # Export model to ONNX and run inference with ONNX runtime, if enabled
+        onnx = self.config.get("onnx")
+        if onnx and isinstance(path, str) and not os.path.isfile(path):
+            return self.loadonnx(path, {} if isinstance(onnx, bool) else onnx)
+
         # Build embeddings with transformers pooling
         return PoolingFactory.create(
             {
@@ -41,4 +55,97 @@ class HFVectors(Vectors):
 
     def encode(self, data, category=None):
         # Encode data using vectors model
-        return self.model.encode(data, batch=self.encodebatch, category=category)
+        return self.model.encode(data, batch=self.encodebatch, category=category, tokens=self.encodetokens)
+
+    def loadonnx(self, path, config):
+        """
+        Loads a model with ONNX runtime. The model is exported to ONNX on first use and cached.
+
+        Args:
+            path: path to model, accepts Hugging Face model hub id or local path
+            config: ONNX configuration
+
+        Returns:
+            pooling model
+        """
+
+        # Derive pooling method, exported models run pooling in the ONNX graph
+        method = self.config.get("method")
+        method = method if method in ("clspooling", "meanpooling") else PoolingFactory.method(path)
+        if method not in ("clspooling", "meanpooling"):
+            raise ValueError(f"ONNX inference isn't supported with {method} models")
+
+        # Model export parameters
+        tokenizer = self.config.get("tokenizer") if self.config.get("tokenizer") else path
+        quantize = config.get("quantize", True)
+
+        # Export model, if necessary
+        output = self.onnxpath(path, method, quantize, config.get("path"))
+        if not os.path.exists(output):
+            self.export(path, tokenizer, method, quantize, output)
+
+        # Max length is derived using the source model
+        maxlength = self.config.get("maxlength")
+        maxlength = PoolingFactory.maxlength(path) if isinstance(maxlength, bool) and maxlength else maxlength
+
+        return PoolingFactory.create(
+            {
+                "method": "pooling",
+                "path": output,
+                "device": Models.deviceid(self.config.get("gpu", True)),
+                "tokenizer": tokenizer,
+                "maxlength": maxlength,
+                "modelargs": {"intra_op_num_threads": config.get("threads"), "inter_op_num_threads": config.get("interthreads")},
+            }
+        )
+
+    def onnxpath(self, path, method, quantize, directory):
+        """
+        Gets the cache path for an exported ONNX model. Exported models are keyed by model revision and export parameters.
+
+        Args:
+            path: path to model
+            method: pooling method
+            quantize: if model is quantized
+            directory: cache directory, defaults to ~/.cache/txtai/onnx if None
+
+        Returns:
+            path to exported ONNX model
+        """
+
+        # Model revision. Hub models are stored in a directory per commit, local models also use file modification times.
+        revision = os.path.dirname(cached_file(path_or_repo_id=path, filename="config.json"))
+        files = [(name, os.path.getmtime(os.path.join(revision, name))) for name in sorted(os.listdir(revision))]
+
+        # Generate model key
+        key = hashlib.sha256(json.dumps([path, revision, files, method, quantize]).encode("utf-8")).hexdigest()[:16]
+
+        directory = directory if directory else os.path.join(os.path.expanduser("~"), ".cache", "txtai", "onnx")
+        return os.path.join(directory, f"{os.path.basename(path.rstrip('/'))}-{key}.onnx")
+
+    def export(self, path, tokenizer, method, quantize, output):
+        """
+        Exports a pooling model to ONNX and optionally applies dynamic int8 quantization.
+
+        Args:
+            path: path to model
+            tokenizer: path to tokenizer
+            method: pooling method
+            quantize: if model should be quantized
+            output: output model path
+        """
+
+        directory, name = os.path.dirname(output), os.path.basename(output)
+        os.makedirs(directory, exist_ok=True)
+
+        # Export to a temporary directory and move into place once complete
+        with tempfile.TemporaryDirectory(dir=directory) as temp:
+            model = PoolingOnnx(path, -1, method, self.config.get("vectors"))
+            HFOnnx()((model, Models.tokenizer(tokenizer)), "pooling", os.path.join(temp, name), quantize)
+
+            # Unquantized models can store weights in external data files. Quantized models are stored in a single file.
+            files = [] if quantize else [x for x in os.listdir(temp) if x != name]
+
+            # Model file is moved last
+            for x in files + [name]:
+                os.replace(os.path.join(temp, x), os.path.join(directory, x))
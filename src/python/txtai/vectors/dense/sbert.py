@@ -2,6 +2,8 @@
 Sentence Transformers module
 """
 
+import numpy as np
+
 # Conditional import
 try:
     from sentence_transformers import SentenceTransformer
@@ -65,6 +67,15 @@ class STVectors(Vectors):
         # Additional encoding arguments
         encodeargs = self.config.get("encodeargs", {})
 
+        # Group text by tokenized length into batches using a token budget
+        if self.encodetokens and not self.pool and all(isinstance(x, str) for x in data):
+            tokenizer, maxlength = self.model.tokenizer, self.model.max_seq_length
+            buckets = Models.buckets([len(x) for x in tokenizer(data, truncation=True, max_length=maxlength)["input_ids"]], self.encodetokens)
+
+            # Encode each batch and restore original order
+            embeddings = np.concatenate([encode([data[x] for x in bucket], batch_size=len(bucket), **encodeargs) for bucket in buckets])
+            return embeddings[np.argsort([x for bucket in buckets for x in bucket])]
+
         # Encode with sentence transformers encoder
         return encode(data, pool=self.pool, batch_size=self.encodebatch, **encodeargs)
 
@@ -2,6 +2,7 @@
 Word Vectors module
 """
 
+import copy
 import json
 import logging
 import os
@@ -34,39 +35,49 @@ logger = logging.getLogger(__name__)
 PARAMETERS, VECTORS = None, None
 
 
-def create(config, scoring):
+def create(config, scoring, model=None, shared=None):
     """
     Multiprocessing helper method. Creates a global embeddings object to be accessed in a new subprocess.
 
     Args:
         config: vector configuration
         scoring: scoring instance
+        model: optional word vectors model without vectors array
+        shared: optional path to shared word vectors array
     """
 
     global PARAMETERS
     global VECTORS
 
     # Store model parameters for lazy loading
-    PARAMETERS, VECTORS = (config, scoring, None), None
+    PARAMETERS, VECTORS = (config, scoring, model, shared), None
 
 
-def transform(document):
+def transform(documents):
     """
-    Multiprocessing helper method. Transforms document into an embeddings vector.
+    Multiprocessing helper method. Transforms a batch of prepared documents into embeddings vectors.
 
     Args:
-        document: (id, data, tags)
+        documents: list of prepared documents
 
     Returns:
-        (id, embedding)
+        embeddings vectors
     """
 
     # Lazy load vectors model
     global VECTORS
     if not VECTORS:
-        VECTORS = WordVectors(*PARAMETERS)
+        config, scoring, model, shared = PARAMETERS
 
-    return (document[0], VECTORS.transform(document))
+        # Attach to shared word vectors array. Memory mapped pages are shared across processes.
+        models = None
+        if model and shared:
+            model.vectors = np.load(shared, mmap_mode="r")
+            models = {config.get("path"): model}
+
+        VECTORS = WordVectors(config, scoring, models)
+
+    return VECTORS.vectorize(documents, "data")
 
 
 class WordVectors(Vectors):
@@ -152,47 +163,109 @@ class WordVectors(Vectors):
 
         return np.array(embeddings, dtype=np.float32)
 
-    def index(self, documents, batchsize=500, checkpoint=None):
+    def index(self, documents, batchsize=500, checkpoint=None, buffer=None):
         # Derive number of parallel processes
         parallel = self.config.get("parallel", True)
         parallel = os.cpu_count() if parallel and isinstance(parallel, bool) else int(parallel)
 
         # Use default single process indexing logic
         if not parallel:
-            return super().index(documents, batchsize)
+            return super().index(documents, batchsize, buffer=buffer)
 
         # Customize indexing logic with multiprocessing pool to efficiently build vectors
         ids, dimensions, batches, stream = [], None, 0, None
 
-        # Shared objects with Pool
-        args = (self.config, self.scoring)
+        # Worker processes don't use caches or nested pools
+        config = {**self.config, "workers": None, "cache": None, "querycache": None}
 
-        # Convert all documents to embedding arrays, stream embeddings to disk to control memory usage
-        with Pool(parallel, initializer=create, initargs=args) as pool:
-            with tempfile.NamedTemporaryFile(mode="wb", suffix=".npy", delete=False) as output:
-                stream = output.name
-                embeddings = []
-                for uid, embedding in pool.imap(transform, documents, self.encodebatch):
-                    if not dimensions:
+        # Share word vectors with worker processes
+        model, shared = self.share()
+
+        try:
+            # Shared objects with Pool
+            args = (config, self.scoring, model, shared)
+
+            # Convert all documents to embedding arrays, stream embeddings to disk to control memory usage
+            with Pool(parallel, initializer=create, initargs=args) as pool:
+                with self.spool(None, None, buffer) as output:
+                    stream = output.name if buffer is None else buffer
+                    embeddings, rows = [], 0
+                    for vectors in pool.imap(transform, self.batches(documents, batchsize, ids)):
                         # Set number of dimensions for embeddings
-                        dimensions = embedding.shape[0]
+                        dimensions = vectors.shape[1]
 
-                    ids.append(uid)
-                    embeddings.append(embedding)
+                        embeddings.append(vectors)
+                        rows += vectors.shape[0]
 
-                    if len(embeddings) == batchsize:
-                        np.save(output, np.array(embeddings, dtype=np.float32), allow_pickle=False)
-                        batches += 1
+                        # Batches are split on index batch boundaries
+                        if rows == batchsize:
+                            self.saveembeddings(output, np.concatenate(embeddings))
+                            batches += 1
+
+                            embeddings, rows = [], 0
 
-                        embeddings = []
+                    # Final embeddings batch
+                    if embeddings:
+                        self.saveembeddings(output, np.concatenate(embeddings))
+                        batches += 1
 
-                # Final embeddings batch
-                if embeddings:
-                    np.save(output, np.array(embeddings, dtype=np.float32), allow_pickle=False)
-                    batches += 1
+        finally:
+            # Remove shared word vectors
+            if shared:
+                os.remove(shared)
 
         return (ids, dimensions, batches, stream)
 
+    def share(self):
+        """
+        Saves word vectors to a temporary file that worker processes memory map. This enables all processes to share a
+        single copy of the word vectors. Word vectors stored in a database are opened separately in each process.
+
+        Returns:
+            (word vectors model without vectors array, path to shared word vectors array)
+        """
+
+        if not isinstance(self.model.vectors, np.ndarray):
+            return (None, None)
+
+        with tempfile.NamedTemporaryFile(suffix=".npy", delete=False) as output:
+            np.save(output, self.model.vectors, allow_pickle=False)
+
+        # Copy model without vectors array
+        model = copy.copy(self.model)
+        model.vectors = None
+
+        return (model, output.name)
+
+    def batches(self, documents, batchsize, ids):
+        """
+        Prepares and splits documents into batches for worker processes. Batches have up to encodebatch documents and
+        are split on index batch boundaries. Document ids are added to ids as documents are read.
+
+        Args:
+            documents: list of (id, data, tags)
+            batchsize: index batch size
+            ids: list to store document ids
+
+        Returns:
+            batches of prepared documents
+        """
+
+        batch, rows = [], 0
+        for uid, data, _ in documents:
+            ids.append(uid)
+            batch.append(self.prepare(data, "data"))
+            rows += 1
+
+            # Split on encodebatch and index batch boundaries
+            if len(batch) == self.encodebatch or rows == batchsize:
+                yield batch
+                batch, rows = [], rows % batchsize
+
+        # Final batch
+        if batch:
+            yield batch
+
     def lookup(self, tokens):
         """
         Queries word vectors for given list of input tokens.
@@ -36,16 +36,19 @@ class Recovery:
             # pylint: disable=R1732
             self.spool = open(self.path, "rb")
 
-    def __call__(self):
+    def __call__(self, rows=None):
         """
         Reads and returns the next batch of embeddings.
 
+        Args:
+            rows: number of rows in batch
+
         Returns
             batch of embeddings
         """
 
         try:
-            return self.load(self.spool) if self.spool else None
+            return self.load(self.spool, rows) if self.spool else None
         except EOFError:
             # End of spool file, cleanup
             self.spool.close()
@@ -2,9 +2,11 @@
 SparseVectors module
 """
 
+import os
+
 # Conditional import
 try:
-    from scipy.sparse import csr_matrix, vstack
+    from scipy.sparse import csr_matrix
     from sklearn.preprocessing import normalize
     from sklearn.utils.extmath import safe_sparse_dot
 
@@ -32,6 +34,12 @@ class SparseVectors(Vectors):
         # Get normalization setting
         self.isnormalize = self.config.get("normalize", self.defaultnormalize()) if self.config else None
 
+        # Vectors caches, worker processes and token budget batching only support dense vectors
+        if self.config and self.store is not None:
+            self.store.close()
+
+        self.cache, self.store, self.workers, self.encodetokens = None, None, None, None
+
     def encode(self, data, category=None):
         # Encode data to embeddings
         embeddings = super().encode(data, category)
@@ -48,13 +56,15 @@ class SparseVectors(Vectors):
         # Run indexing
         ids, dimensions, batches, stream = self.index(documents, batchsize, checkpoint)
 
-        # Rebuild sparse array
+        # Rebuild sparse array. Batches are spooled to disk and the stacked array is memory mapped.
         embeddings = None
-        with open(stream, "rb") as queue:
-            for _ in range(batches):
-                # Read in array batch
-                data = self.loadembeddings(queue)
-                embeddings = vstack((embeddings, data)) if embeddings is not None else data
+        if batches:
+            with open(stream, "rb") as queue:
+                embeddings = SparseArray().stack((self.loadembeddings(queue) for _ in range(batches)), checkpoint)
+
+        # Remove temporary spool file
+        if not checkpoint:
+            os.remove(stream)
 
         # Return sparse array
         return (ids, dimensions, embeddings)
@@ -62,7 +72,8 @@ class SparseVectors(Vectors):
     def dot(self, queries, data):
         return safe_sparse_dot(queries, data.T, dense_output=True).tolist()
 
-    def loadembeddings(self, f):
+    def loadembeddings(self, f, rows=None):
+        # Sparse arrays are stored one batch at a time
         return SparseArray().load(f)
 
     def saveembeddings(self, f, embeddings):
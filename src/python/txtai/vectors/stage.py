@@ -0,0 +1,90 @@
+"""
+Stage module
+"""
+
+from queue import Queue
+from threading import Thread
+
+
+class Stage:
+    """
+    Processing stage that runs a function over a stream of inputs in a background thread. Stages are connected with
+    bounded queues to form a pipeline. Each stage runs concurrently with the other stages.
+    """
+
+    # End of stream message
+    COMPLETE = 1
+
+    def __init__(self, function, output=None, size=5):
+        """
+        Creates and starts a new processing stage.
+
+        Args:
+            function: function to run for each input
+            output: next stage, receives the outputs of this stage
+            size: maximum number of queued inputs
+        """
+
+        self.function, self.output = function, output
+
+        # Input queue and first error raised while processing
+        self.queue, self.error = Queue(size), None
+
+        # Start processing thread
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def put(self, data):
+        """
+        Adds an input to this stage. Blocks when the input queue is full.
+
+        Args:
+            data: input data
+        """
+
+        # Stop sending data to a failed stage
+        if self.error:
+            raise self.error
+
+        self.queue.put(data)
+
+    def close(self):
+        """
+        Sends the end of stream message to this stage and waits for this stage and all downstream stages to complete.
+        Raises the first error from any stage.
+        """
+
+        self.queue.put(Stage.COMPLETE)
+        self.thread.join()
+
+        if self.error:
+            raise self.error
+
+    def run(self):
+        """
+        Processes inputs until the end of stream message is received. Inputs are drained after an error to
+        avoid blocking upstream stages.
+        """
+
+        data = self.queue.get()
+        while data is not Stage.COMPLETE:
+            if not self.error:
+                try:
+                    result = self.function(data)
+                    if self.output:
+                        self.output.put(result)
+
+                # Store error, raised when this stage is closed
+                except Exception as e:  # pylint: disable=W0718
+                    self.error = e
+
+            data = self.queue.get()
+
+        # Close downstream stage
+        if self.output:
+            try:
+                self.output.close()
+
+            # Keep first error
+            except Exception as e:  # pylint: disable=W0718
+                self.error = self.error if self.error else e
@@ -0,0 +1,136 @@
+"""
+Store module
+"""
+
+import hashlib
+import os
+import sqlite3
+
+from threading import Lock
+
+import numpy as np
+
+
+class Store:
+    """
+    Persistent store of embeddings vectors backed by SQLite. Vectors are keyed by a hash of the vectors configuration id
+    and input content. This enables skipping vectorization for previously seen content.
+    """
+
+    def __init__(self, path):
+        """
+        Creates a new store.
+
+        Args:
+            path: path to store database file
+        """
+
+        # Create parent directories, if necessary
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Connection can be used from multiple threads, access is synchronized with a lock
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = Lock()
+
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS vectors (id TEXT PRIMARY KEY, dtype TEXT, data BLOB)")
+        self.connection.commit()
+
+        # Store statistics
+        self.hits, self.misses = 0, 0
+
+    def __len__(self):
+        """
+        Gets the number of stored vectors.
+
+        Returns:
+            number of stored vectors
+        """
+
+        with self.lock:
+            return self.connection.execute("SELECT count(*) FROM vectors").fetchone()[0]
+
+    def get(self, vectorsid, keys, batch=500):
+        """
+        Gets stored vectors for a list of keys.
+
+        Args:
+            vectorsid: vectors configuration id
+            keys: list of keys
+            batch: maximum number of keys per query
+
+        Returns:
+            list of stored vectors, None for keys not in the store
+        """
+
+        uids = [self.hash(vectorsid, key) for key in keys]
+
+        results = {}
+        with self.lock:
+            for x in range(0, len(uids), batch):
+                chunk = uids[x : x + batch]
+                query = f"SELECT id, dtype, data FROM vectors WHERE id IN ({','.join('?' * len(chunk))})"
+                for uid, dtype, data in self.connection.execute(query, chunk):
+                    results[uid] = np.frombuffer(data, dtype=dtype)
+
+            vectors = [results.get(uid) for uid in uids]
+
+            # Update statistics
+            hits = sum(1 for vector in vectors if vector is not None)
+            self.hits += hits
+            self.misses += len(vectors) - hits
+
+        return vectors
+
+    def put(self, vectorsid, keys, vectors):
+        """
+        Adds vectors to the store.
+
+        Args:
+            vectorsid: vectors configuration id
+            keys: list of keys
+            vectors: list of vectors
+        """
+
+        rows = ((self.hash(vectorsid, key), str(vector.dtype), np.ascontiguousarray(vector).tobytes()) for key, vector in zip(keys, vectors))
+
+        with self.lock:
+            self.connection.executemany("INSERT OR REPLACE INTO vectors VALUES (?, ?, ?)", rows)
+            self.connection.commit()
+
+    def stats(self):
+        """
+        Gets store statistics.
+
+        Returns:
+            dict with store size, hits and misses
+        """
+
+        return {"size": len(self), "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        """
+        Closes this store.
+        """
+
+        with self.lock:
+            if self.connection:
+                self.connection.close()
+                self.connection = None
+
+    def hash(self, vectorsid, key):
+        """
+        Generates a content hash for a key.
+
+        Args:
+            vectorsid: vectors configuration id
+            key: (category, text)
+
+        Returns:
+            content hash
+        """
+
+        category, text = key
+        return hashlib.sha256(f"{vectorsid}\n{category}\n{text}".encode("utf-8")).hexdigest()
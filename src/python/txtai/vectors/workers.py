@@ -0,0 +1,95 @@
+"""
+Workers module
+"""
+
+import os
+
+from multiprocessing import get_context
+
+import numpy as np
+import torch
+
+# Multiprocessing helper methods
+# pylint: disable=W0603
+VECTORS = None
+
+
+def create(cls, config, threads):
+    """
+    Multiprocessing helper method. Creates a global vectors instance to be accessed in a new subprocess.
+
+    Args:
+        cls: vectors class
+        config: vector configuration
+        threads: number of threads per process
+    """
+
+    global VECTORS
+
+    # Limit the number of threads per process to prevent processes from competing for cores
+    torch.set_num_threads(threads)
+
+    VECTORS = cls(config, None, None)
+
+
+def vectorize(documents):
+    """
+    Multiprocessing helper method. Transforms a batch of prepared documents into embeddings vectors.
+
+    Args:
+        documents: list of prepared documents
+
+    Returns:
+        embeddings vectors
+    """
+
+    return VECTORS.vectorize(documents, "data")
+
+
+class Workers:
+    """
+    Process pool that encodes batches of documents. Each process loads a separate copy of the vectors model and runs
+    on CPU.
+    """
+
+    def __init__(self, cls, config, workers):
+        """
+        Creates a new worker process pool.
+
+        Args:
+            cls: vectors class
+            config: vector configuration
+            workers: number of worker processes
+        """
+
+        # Worker processes encode on CPU and don't use caches or nested pools
+        config = {**config, "gpu": False, "workers": None, "cache": None, "querycache": None}
+
+        # Split available cores between processes
+        threads = max(os.cpu_count() // workers, 1)
+
+        # Spawn new processes, forking processes with initialized torch threads isn't safe
+        self.pool = get_context("spawn").Pool(workers, initializer=create, initargs=(cls, config, threads))
+
+    def __call__(self, documents, batch):
+        """
+        Shards documents into batches, encodes the batches in parallel and reassembles embeddings in order.
+
+        Args:
+            documents: list of prepared documents
+            batch: number of documents per batch
+
+        Returns:
+            embeddings vectors
+        """
+
+        batches = [documents[x : x + batch] for x in range(0, len(documents), batch)]
+        return np.concatenate(self.pool.map(vectorize, batches))
+
+    def close(self):
+        """
+        Stops all worker processes.
+        """
+
+        self.pool.close()
+        self.pool.join()
@@ -99,6 +99,52 @@ class TestDense(unittest.TestCase):
         # Test to with mmap enabled
         self.runTests("faiss", {"faiss": {"mmap": True}}, False)
 
+    def testFilter(self):
+        """
+        Test filtered search
+        """
+
+        data = np.random.rand(1000, 240).astype(np.float32)
+        data /= np.linalg.norm(data, axis=1)[:, np.newaxis]
+
+        # Ids to search
+        ids = list(range(0, 1000, 25))
+
+        # Backends and if search is exact
+        backends = [
+            ("faiss", {}, True),
+            ("faiss", {"faiss": {"components": "IVF10,Flat"}}, False),
+            ("hnsw", {}, False),
+            ("numpy", {}, True),
+            ("torch", {}, True),
+        ]
+
+        for name, params, exact in backends:
+            model = ANNFactory.create({**{"backend": name, "dimensions": 240}, **params})
+            model.index(data.copy())
+            self.assertTrue(model.isfilter())
+
+            # Delete id, deleted ids aren't returned
+            model.delete([ids[0]])
+
+            # Exact results
+            scores = np.dot(data[ids[1:]], data[:2].T)
+            expected = [[ids[1:][x] for x in np.argsort(-scores[:, y])[:5]] for y in range(2)]
+
+            results = [[uid for uid, _ in result] for result in model.filter(data[:2], 5, ids)]
+            if exact:
+                self.assertEqual(results, expected)
+            else:
+                # Approximate backends only return allowed ids and have high recall
+                self.assertTrue(all(len(result) == 5 and set(result) <= set(ids[1:]) for result in results))
+                self.assertGreaterEqual(sum(len(set(x) & set(y)) for x, y in zip(results, expected)), 8)
+
+            # Search with no matching ids
+            self.assertEqual(model.filter(data[:1], 5, [ids[0]]), [[]])
+
+        # Backends without filter support
+        self.assertFalse(self.backend("annoy", length=100).isfilter())
+
     def testHnsw(self):
         """
         Test Hnswlib backend
@@ -114,6 +160,58 @@ class TestDense(unittest.TestCase):
         # Test with custom settings
         self.runTests("hnsw", {"hnsw": {"efconstruction": 100, "m": 4, "randomseed": 0, "efsearch": 5}})
 
+    def testIVFPQ(self):
+        """
+        Test IVFPQ backend
+        """
+
+        self.runTests("ivfpq")
+
+    def testIVFPQCustom(self):
+        """
+        Test IVFPQ backend with custom settings
+        """
+
+        # Test with custom settings
+        self.runTests("ivfpq", {"ivfpq": {"nlist": 16, "nprobe": 4, "m": 30, "sample": 0.5, "iterations": 5}})
+
+        # Test invalid number of subquantizers
+        with self.assertRaises(ValueError):
+            self.backend("ivfpq", {"ivfpq": {"m": 7}})
+
+        # Test quantization isn't supported
+        with self.assertRaises(ValueError):
+            self.backend("ivfpq", {"quantize": 8})
+
+    def testIVFPQRecall(self):
+        """
+        Test IVFPQ backend search quality against exact search
+        """
+
+        # Generate clustered data
+        generator = np.random.default_rng(0)
+        centers = generator.standard_normal((200, 64))
+        data = centers[generator.integers(0, 200, 3000)] + 0.3 * generator.standard_normal((3000, 64))
+        data = data.astype(np.float32)
+        self.normalize(data)
+
+        # Build index with multiple clusters, only a subset of clusters is searched. Append remaining data in batches.
+        model = ANNFactory.create({"backend": "ivfpq", "dimensions": 64, "ivfpq": {"nlist": 16, "nprobe": 4}})
+        model.index(data[:1000])
+        self.assertEqual(model.config["build"]["settings"]["nlist"], 16)
+
+        for x in range(1000, 3000, 500):
+            model.append(data[x : x + 500])
+
+        # Exact results
+        queries = data[:50]
+        exact = np.argsort(-np.dot(queries, data.T), axis=1)[:, :10]
+
+        # Calculate recall@10
+        results = model.search(queries, 10)
+        recall = np.mean([len(set(exact[x].tolist()) & {uid for uid, _ in result}) / 10 for x, result in enumerate(results)])
+        self.assertGreaterEqual(recall, 0.6)
+
     def testNotImplemented(self):
         """
         Test exceptions for non-implemented methods
@@ -126,6 +224,7 @@ class TestDense(unittest.TestCase):
         self.assertRaises(NotImplementedError, ann.append, None)
         self.assertRaises(NotImplementedError, ann.delete, None)
         self.assertRaises(NotImplementedError, ann.search, None, None)
+        self.assertIsNone(ann.filter(None, None, None))
         self.assertRaises(NotImplementedError, ann.count)
         self.assertRaises(NotImplementedError, ann.save, None)
 
@@ -136,6 +235,118 @@ class TestDense(unittest.TestCase):
 
         self.runTests("numpy")
 
+    def testNumPyBlocks(self):
+        """
+        Test NumPy backend with blockwise search
+        """
+
+        self.runTests("numpy", {"numpy": {"blocksize": 1000}})
+
+        # Generate test data
+        data = np.random.rand(1000, 240).astype(np.float32)
+        self.normalize(data)
+
+        # Create full and blockwise indexes
+        full = ANNFactory.create({"backend": "numpy", "dimensions": 240})
+        full.index(data)
+
+        blocks = ANNFactory.create({"backend": "numpy", "dimensions": 240, "numpy": {"blocksize": 64}})
+        blocks.index(data)
+
+        # Validate results are the same
+        queries = data[:5]
+        self.assertEqual([[i for i, _ in r] for r in full.search(queries, 10)], [[i for i, _ in r] for r in blocks.search(queries, 10)])
+
+    def testNumPyCompact(self):
+        """
+        Test NumPy backend deletes and compaction
+        """
+
+        # Generate test data
+        data = np.random.rand(105, 240).astype(np.float32)
+        self.normalize(data)
+
+        data, new = data[:100], data[100:]
+        index = os.path.join(tempfile.gettempdir(), "ann.compact")
+
+        for name in ["numpy", "torch"]:
+            for mmap in [False, True]:
+                model = ANNFactory.create({"backend": name, "dimensions": 240, name: {"mmap": mmap}})
+                model.index(data)
+
+                # Delete rows and validate they are no longer returned
+                model.delete([0, 1, 1, 500])
+                self.assertEqual(model.count(), 98)
+                self.assertNotIn(0, [uid for uid, _ in model.search(data[:1], 100)[0]])
+                self.assertEqual(len(model.search(data[:1], 1000)[0]), 98)
+
+                # Validate deletes are persisted
+                model.save(index)
+                model.load(index)
+                self.assertEqual(model.count(), 98)
+
+                # Compact and validate ids are preserved
+                self.assertEqual(model.compact(), 2)
+                self.assertEqual(model.size, 98)
+                self.assertEqual(model.search(data[50:51], 1)[0][0][0], 50)
+
+                # Delete and append after compaction
+                model.delete([50])
+                model.append(new)
+                self.assertEqual(model.count(), 102)
+                self.assertEqual(model.search(data[2:3], 1)[0][0][0], 2)
+                self.assertEqual(model.search(new[4:], 1)[0][0][0], 104)
+
+                # Validate row ids are persisted
+                model.save(index)
+                model.load(index)
+                self.assertEqual(model.count(), 102)
+                self.assertEqual(model.search(new[4:], 1)[0][0][0], 104)
+                self.assertNotIn(50, [uid for uid, _ in model.search(data[50:51], 200)[0]])
+
+        # Validate indexes saved with earlier versions detect deleted rows
+        data = np.random.rand(100, 240).astype(np.float32)
+        data[0] = 0
+        with open(index, "wb") as handle:
+            np.save(handle, data, allow_pickle=False)
+
+        model = ANNFactory.create({"backend": "numpy", "dimensions": 240})
+        model.load(index)
+        self.assertEqual(model.count(), 99)
+
+    def testNumPyGrow(self):
+        """
+        Test NumPy backend with many small appends
+        """
+
+        # Generate test data
+        data = np.random.rand(200, 240).astype(np.float32)
+        self.normalize(data)
+
+        index = os.path.join(tempfile.gettempdir(), "ann.grow")
+
+        for name in ["numpy", "torch"]:
+            for mmap in [False, True]:
+                model = ANNFactory.create({"backend": name, "dimensions": 240, name: {"mmap": mmap}})
+                model.index(data[:10])
+
+                # Append one row at a time
+                for x in range(10, 200):
+                    model.append(data[x : x + 1])
+
+                # Validate capacity is grown geometrically
+                self.assertEqual(model.count(), 200)
+                self.assertEqual(model.backend.shape[0], 320)
+
+                # Validate search results
+                self.assertEqual([result[0][0] for result in model.search(data[150:155], 1)], list(range(150, 155)))
+
+                # Validate only rows in use are saved
+                model.save(index)
+                model.load(index)
+                self.assertEqual(model.backend.shape[0], 200)
+                self.assertEqual(model.search(data[199:], 1)[0][0][0], 199)
+
     @patch.dict(os.environ, {"ALLOW_PICKLE": "True"})
     def testNumPyLegacy(self):
         """
@@ -159,6 +370,58 @@ class TestDense(unittest.TestCase):
         # Validate count
         self.assertEqual(ann.count(), 100)
 
+    def testNumPyMmap(self):
+        """
+        Test NumPy backend with mmap enabled
+        """
+
+        self.runTests("numpy", {"numpy": {"mmap": True}})
+
+        # Generate temp file path
+        index = os.path.join(tempfile.gettempdir(), "ann.mmap")
+
+        # Save and reload index
+        model = self.backend("numpy", {"numpy": {"mmap": True}})
+        model.save(index)
+        model.load(index)
+
+        # Validate array is memory mapped
+        self.assertIsInstance(model.backend, np.memmap)
+
+        # Modify and save back to same path
+        model.delete([0])
+        model.save(index)
+        model.load(index)
+
+        self.assertEqual(model.count(), 9999)
+
+    def testNumPyQuantize(self):
+        """
+        Test NumPy backend with hamming scores
+        """
+
+        # Build table of number of bits for each distinct uint8 value
+        table = np.array([bin(x).count("1") for x in range(256)])
+
+        for dimensions in [3, 6, 12, 48]:
+            # Generate test data
+            data = np.random.randint(0, 256, (1000, dimensions), dtype=np.uint8)
+            queries = data[:5]
+
+            # Calculate expected scores
+            expected = 1.0 - table[queries[:, None] ^ data].sum(axis=2) / (dimensions * 8)
+            expected = -np.sort(-expected, axis=1)[:, :10]
+
+            for name in ["numpy", "torch"]:
+                model = ANNFactory.create({"backend": name, "dimensions": dimensions, "quantize": 1, name: {"blocksize": 128}})
+                model.index(data)
+
+                # Validate vectorized and SWAR popcounts
+                for popcount in [model.popcount, model.swar]:
+                    model.popcount = popcount
+                    scores = [[score for _, score in result] for result in model.search(queries, 10)]
+                    self.assertTrue(np.allclose(scores, expected))
+
     @patch("sqlalchemy.orm.Query.limit")
     def testPGVector(self, query):
         """
@@ -246,6 +509,48 @@ class TestDense(unittest.TestCase):
 
         self.assertEqual(model.count(), expected)
 
+    @unittest.skipIf(platform.system() == "Darwin", "SQLite extensions not supported on macOS")
+    def testSQLiteThreads(self):
+        """
+        Test SQLite backend batch search with multiple threads
+        """
+
+        # Generate and save index
+        model = self.backend("sqlite", {"sqlite": {"threads": 2, "pragmas": {"cache_size": -2000}}})
+        model.save(os.path.join(tempfile.gettempdir(), "ann.threads.sqlite"))
+
+        # Batch search with read-only connections
+        queries = np.random.rand(5, 240).astype(np.float32)
+        results = model.search(queries, 3)
+
+        # Thread pool is reused across searches
+        threads = model.threads
+        self.assertEqual(results, model.search(queries, 3))
+        self.assertIs(model.threads, threads)
+
+        # Thread pool is recreated when the number of threads changes
+        model.config["sqlite"]["threads"] = 3
+        self.assertEqual(results, model.search(queries, 3))
+        self.assertIsNot(model.threads, threads)
+        self.assertEqual(model.workers, 3)
+
+        # Compare with sequential search
+        model.config["sqlite"]["threads"] = 1
+        self.assertEqual(results, model.search(queries, 3))
+
+        # Pending changes fall back to sequential search
+        model.config["sqlite"]["threads"] = 2
+        model.delete([results[0][0][0]])
+        self.assertNotEqual(model.search(queries[:1], 1)[0][0][0], results[0][0][0])
+
+        model.close()
+        self.assertIsNone(model.threads)
+
+        # Invalid pragmas
+        for pragmas in [{"cache_size=0; DROP TABLE vectors; --": 1}, {"temp_store": "MEMORY; DROP TABLE vectors"}]:
+            with self.assertRaises(ValueError):
+                self.backend("sqlite", {"sqlite": {"pragmas": pragmas}}, length=10)
+
     def testTorch(self):
         """
         Test Torch backend
@@ -253,6 +558,13 @@ class TestDense(unittest.TestCase):
 
         self.runTests("torch")
 
+    def testTorchBlocks(self):
+        """
+        Test Torch backend with blockwise search
+        """
+
+        self.runTests("torch", {"torch": {"blocksize": 1000}})
+
     def runTests(self, name, params=None, update=True):
         """
         Runs a series of standard backend tests.
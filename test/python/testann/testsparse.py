@@ -8,10 +8,13 @@ import unittest
 
 from unittest.mock import patch
 
-from scipy.sparse import random
+import numpy as np
+
+from scipy.sparse import random, vstack
 from sklearn.preprocessing import normalize
 
 from txtai.ann import SparseANNFactory
+from txtai.util import SparseArray
 
 
 class TestSparse(unittest.TestCase):
@@ -82,6 +85,78 @@ class TestSparse(unittest.TestCase):
         self.assertLess(len(ann.blocks), 15)
         ann.close()
 
+    def testIVFSparseMmap(self):
+        """
+        Test IVFSparse backend with memory mapped cluster data blocks
+        """
+
+        # Generate test records
+        insert = self.generate(500, 30522)
+        append = self.generate(100, 30522)
+
+        path = os.path.join(tempfile.gettempdir(), "ivfsparse.mmap")
+        for nlist in [1, 2]:
+            # Create ANN
+            config = {"nlist": nlist, "nprobe": 2, "sample": 1.0}
+            ann = SparseANNFactory.create({"backend": "ivfsparse", "ivfsparse": {**config, "mmap": True}})
+
+            # Test indexing and validate blocks are spooled to disk
+            ann.index(insert)
+            ann.append(append)
+            self.assertTrue(all(self.mapped(block.data) for block in ann.blocks.values()))
+
+            # Validate search results match an in-memory index
+            memory = SparseANNFactory.create({"backend": "ivfsparse", "ivfsparse": config})
+            memory.index(insert)
+            memory.append(append)
+            self.assertEqual(ann.search(append[0], 10), memory.search(append[0], 10))
+
+            # Save and reload as memory mapped index
+            ann.save(path)
+            ann = SparseANNFactory.create({"backend": "ivfsparse", "ivfsparse": {**config, "mmap": True}})
+            ann.load(path)
+
+            # Validate loaded blocks are memory mapped
+            self.assertTrue(all(self.mapped(block.data) for block in ann.blocks.values()))
+            self.assertEqual(ann.count(), insert.shape[0] + append.shape[0])
+            self.assertEqual(ann.search(append[0], 10), memory.search(append[0], 10))
+
+            # Save over the memory mapped file
+            ann.delete([0])
+            ann.save(path)
+            ann.load(path)
+            self.assertEqual(ann.count(), insert.shape[0] + append.shape[0] - 1)
+
+            ann.close()
+            memory.close()
+
+    def testStack(self):
+        """
+        Test stacking a stream of sparse arrays into a memory mapped sparse array
+        """
+
+        arrays = [self.generate(10, 1000), random(0, 1000, format="csr"), self.generate(25, 1000), self.generate(5, 1000)]
+        expected = vstack(arrays)
+
+        # Test 32-bit indices and switching to 64-bit indices once the number of stored values exceeds the limit
+        for limit in [SparseArray.LIMIT, expected.nnz // 2]:
+            with patch("txtai.util.SparseArray.LIMIT", limit):
+                array = SparseArray().stack(iter(arrays))
+
+            self.assertTrue(self.mapped(array.data))
+            self.assertEqual((array != expected).nnz, 0)
+
+        # Test rewriting spooled 32-bit indices as 64-bit indices
+        with tempfile.TemporaryFile() as f:
+            f.write(np.arange(10, dtype=np.int32).tobytes())
+            with SparseArray().widen(f, None, batch=3) as output:
+                output.seek(0)
+                self.assertEqual(np.frombuffer(output.read(), dtype=np.int64).tolist(), list(range(10)))
+
+        # Data types must match
+        with self.assertRaises(ValueError):
+            SparseArray().stack([arrays[0], arrays[2].astype(np.float32)])
+
     @patch("sqlalchemy.orm.Query.limit")
     def testPGSparse(self, query):
         """
@@ -124,6 +199,22 @@ class TestSparse(unittest.TestCase):
         # Close ANN
         ann.close()
 
+    def mapped(self, array):
+        """
+        Checks if an array is backed by a memory mapped file.
+
+        Args:
+            array: input array
+
+        Returns:
+            True if array is memory mapped, False otherwise
+        """
+
+        while array is not None and not isinstance(array, np.memmap):
+            array = array.base if isinstance(array, np.ndarray) else None
+
+        return array is not None
+
     def generate(self, m, n):
         """
         Generates random normalized sparse data.
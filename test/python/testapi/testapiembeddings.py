@@ -3,12 +3,15 @@ Embeddings API module tests
 """
 
 import os
+import struct
 import tempfile
 import unittest
 import urllib.parse
 
 from unittest.mock import patch
 
+import numpy as np
+
 from fastapi.testclient import TestClient
 
 from txtai.api import API, application
@@ -114,6 +117,7 @@ reranker:
 """
 
 
+# pylint: disable=R0904
 class TestEmbeddings(unittest.TestCase):
     """
     API tests for embeddings indices.
@@ -322,6 +326,24 @@ class TestEmbeddings(unittest.TestCase):
         self.assertEqual(len(embeddings), len(self.data))
         self.assertEqual(len(embeddings[0]), 768)
 
+    def testTransformStream(self):
+        """
+        Test streaming batch embeddings transform via API
+        """
+
+        response = self.client.post("batchtransform?stream=true&batch=4", json=self.data)
+        self.assertEqual(response.headers["content-type"], "application/octet-stream")
+
+        # Decode binary frames
+        data, blocks = response.content, []
+        while data:
+            rows, dimensions = struct.unpack("<II", data[:8])
+            blocks.append(np.frombuffer(data[8 : 8 + rows * dimensions * 4], dtype="<f4").reshape(rows, dimensions))
+            data = data[8 + rows * dimensions * 4 :]
+
+        self.assertEqual([block.shape for block in blocks], [(4, 768), (2, 768)])
+        self.assertTrue(np.allclose(np.concatenate(blocks), self.client.post("batchtransform", json=self.data).json(), atol=1e-5))
+
     def testUpsert(self):
         """
         Test upsert via API
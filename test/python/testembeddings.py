@@ -12,6 +12,7 @@ from unittest.mock import patch
 import numpy as np
 
 from txtai.embeddings import Embeddings, Reducer
+from txtai.embeddings.search import Search
 from txtai.serialize import SerializeFactory
 
 
@@ -166,6 +167,45 @@ class TestEmbeddings(unittest.TestCase):
         self.embeddings.index([(0, {"text": ""}, None)])
         self.assertTrue(self.embeddings.search("test"))
 
+    def testExpand(self):
+        """
+        Test expanding index candidates for queries with missing results
+        """
+
+        data = np.random.rand(1000, 10).astype(np.float32)
+        documents = [(uid, {"text": str(uid), "category": uid % 100}, None) for uid in range(1000)]
+
+        queries = [
+            "select id, category from txtai where similar('0') and category = 5 limit 5",
+            "select id from txtai where similar(:x) and category = :c limit 5",
+            "select count(*) from txtai where similar('0') and category = 5",
+        ]
+        parameters = [None, {"x": "1", "c": 7}, None]
+
+        results = {}
+        for config in [None, True, {"factor": 2, "candidates": 50}]:
+            embeddings = Embeddings({"method": "external", "transform": lambda x: [data[int(uid)] for uid in x], "content": True, "expand": config})
+            embeddings.index(documents)
+            results[str(config)] = embeddings.batchsearch(queries, 5, parameters=parameters)
+
+        # Expanded queries return full pages of results
+        self.assertEqual([len(x) for x in results["True"]], [5, 5, 1])
+        self.assertTrue(all(x["category"] == 5 for x in results["True"][0]))
+
+        # Maximum number of candidates is the default number of candidates, results are the same as not expanding
+        self.assertEqual(results[str({"factor": 2, "candidates": 50})], results["None"])
+
+        # Multipliers that don't grow the number of candidates are rejected
+        embeddings.config["expand"] = {"factor": 1}
+        with self.assertRaises(ValueError):
+            embeddings.batchsearch(queries, 5, parameters=parameters)
+
+        # Expansion stops when the number of candidates doesn't grow
+        embeddings.config["expand"] = True
+        search = Search(embeddings)
+        search.factor = 1
+        self.assertEqual(search(queries, 5, parameters=parameters), results["None"])
+
     def testExternal(self):
         """
         Test embeddings backed by external vectors
@@ -203,6 +243,40 @@ class TestEmbeddings(unittest.TestCase):
         uid = embeddings.search(data[4], 1)[0][0]
         self.assertEqual(uid, 4)
 
+    def testFilter(self):
+        """
+        Test filtered search
+        """
+
+        data = np.random.rand(1000, 10).astype(np.float32)
+        documents = [(uid, {"text": str(uid), "category": uid % 100, "group": uid % 2}, None) for uid in range(1000)]
+
+        for config in [True, {"threshold": 0.75}]:
+            embeddings = Embeddings({"method": "external", "transform": lambda x: [data[int(uid)] for uid in x], "content": True, "filter": config})
+            embeddings.index(documents)
+
+            # Selective filter - pre-filtered search returns a full page of results
+            result = embeddings.search("select id, category from txtai where similar('0') and category = 5 limit 5")
+            self.assertEqual(len(result), 5)
+            self.assertTrue(all(x["category"] == 5 for x in result))
+
+            # Broad filter - post-filtered search scales the number of candidates
+            result = embeddings.search("select id, group from txtai where similar('0') and group = 1 limit 5")
+            self.assertEqual(len(result), 5)
+            self.assertTrue(all(x["group"] == 1 for x in result))
+
+            # No matching rows
+            self.assertEqual(embeddings.search("select id from txtai where similar('0') and category = -1"), [])
+
+            # Filters with OR run the standard search
+            self.assertEqual(len(embeddings.search("select id from txtai where similar('0') or category = 5 limit 5")), 5)
+
+            # Operators in quoted literals don't disable filtering
+            self.assertEqual(
+                embeddings.database.filter(embeddings.database.parse("select id from txtai where similar('0') and text = 'not or'"), count=True), 0
+            )
+            self.assertIsNone(embeddings.database.filter(embeddings.database.parse("select id from txtai where similar('0') and not text = '0'")))
+
     def testHybrid(self):
         """
         Test hybrid search
@@ -424,6 +498,63 @@ class TestEmbeddings(unittest.TestCase):
         reducer(query)
         self.assertFalse(np.array_equal(query, original))
 
+    def testRescore(self):
+        """
+        Test rescoring quantized search results with full precision vectors
+        """
+
+        data = self.clusters()
+
+        for ann in ["numpy", "torch"]:
+            embeddings = Embeddings(
+                {
+                    "method": "external",
+                    "transform": lambda x: [data[int(uid)] for uid in x],
+                    "quantize": 1,
+                    "rescore": {"oversample": 4},
+                    "backend": ann,
+                }
+            )
+            embeddings.index([(uid, str(uid), None) for uid in range(1000)])
+
+            # Rescored results have high recall against exact search
+            results = embeddings.search("0", 10)
+            self.assertGreaterEqual(self.recall(data, 20, embeddings), 8)
+
+            # Save and reload index
+            index = os.path.join(tempfile.gettempdir(), f"embeddings.rescore.{ann}")
+            embeddings.save(index)
+            embeddings.load(index, config={"transform": lambda x: [data[int(uid)] for uid in x]})
+            self.assertEqual(embeddings.search("0", 10), results)
+
+            # Upsert and search for the new row
+            embeddings.upsert([(1000, "0", None)])
+            self.assertEqual({uid for uid, _ in embeddings.search("0", 2)}, {0, 1000})
+
+            # Later upserts grow the temporary vectors file in place
+            path = embeddings.rescore.path
+            embeddings.upsert([(1001, "1", None)])
+            self.assertEqual(embeddings.rescore.path, path)
+            self.assertEqual(embeddings.rescore.data.shape, (1002, 64))
+
+    def testRescoreDimensions(self):
+        """
+        Test searching truncated vectors and rescoring with full precision vectors
+        """
+
+        # Leading dimensions store more information, similar to Matryoshka Representation Learning models
+        data = self.clusters(np.exp(-np.arange(64) / 16))
+
+        # Index stores the leading 16 dimensions
+        embeddings = Embeddings(
+            {"method": "external", "transform": lambda x: [data[int(uid)] for uid in x], "rescore": {"dimensions": 16, "oversample": 4}}
+        )
+        embeddings.index([(uid, str(uid), None) for uid in range(1000)])
+
+        # Rescored results have high recall against exact full dimension search
+        self.assertEqual(embeddings.config["dimensions"], 16)
+        self.assertGreaterEqual(self.recall(data, 20, embeddings), 8)
+
     def testSave(self):
         """
         Test save
@@ -522,6 +653,18 @@ class TestEmbeddings(unittest.TestCase):
         uid = embeddings.search("feel good story", 1)[0][0]
         self.assertEqual(uid, 0)
 
+    def testStreamTransform(self):
+        """
+        Test streaming embeddings transform
+        """
+
+        # Generator input, embeddings are yielded in blocks
+        blocks = list(self.embeddings.streamtransform((text for text in self.data), batch=4))
+        self.assertEqual([block.shape for block in blocks], [(4, 768), (2, 768)])
+
+        # Blocks match batch transform
+        self.assertTrue(np.allclose(np.concatenate(blocks), self.embeddings.batchtransform(self.data), atol=1e-5))
+
     def testSubindex(self):
         """
         Test subindex
@@ -669,3 +812,39 @@ class TestEmbeddings(unittest.TestCase):
         # Test search after upsert
         uid = embeddings.search("win", 1)[0][0]
         self.assertEqual(uid, 0)
+
+    def clusters(self, scale=None):
+        """
+        Generates normalized vectors grouped into clusters.
+
+        Args:
+            scale: optional scale factor per dimension
+
+        Returns:
+            vectors
+        """
+
+        generator = np.random.default_rng(0)
+        centers = generator.standard_normal((20, 64))
+        data = centers[generator.integers(0, 20, 1000)] + 0.5 * generator.standard_normal((1000, 64))
+        data = data * scale if scale is not None else data
+
+        return (data / np.linalg.norm(data, axis=1, keepdims=True)).astype(np.float32)
+
+    def recall(self, data, queries, embeddings):
+        """
+        Calculates the mean number of exact top 10 results returned for the first queries rows in data.
+
+        Args:
+            data: vectors
+            queries: number of queries
+            embeddings: embeddings instance
+
+        Returns:
+            mean recall@10 as a number of results
+        """
+
+        results = embeddings.batchsearch([str(x) for x in range(queries)], 10)
+        exact = [set(np.argsort(-np.dot(data, data[x]))[:10].tolist()) for x in range(queries)]
+
+        return np.mean([len(exact[x] & {uid for uid, _ in result}) for x, result in enumerate(results)])
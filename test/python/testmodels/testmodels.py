@@ -16,6 +16,18 @@ class TestModels(unittest.TestCase):
     Models tests.
     """
 
+    def testBuckets(self):
+        """
+        Test grouping inputs into batches with a token budget
+        """
+
+        # Inputs sorted longest first, padded batch size fits in budget
+        self.assertEqual(Models.buckets([3, 10, 1, 10, 5], 20), [[1, 3], [4, 0, 2]])
+
+        # Inputs longer than the budget are in a single input batch
+        self.assertEqual(Models.buckets([50, 2], 20), [[0], [1]])
+        self.assertEqual(Models.buckets([], 20), [])
+
     @patch("torch.cuda.is_available")
     def testDeviceid(self, cuda):
         """
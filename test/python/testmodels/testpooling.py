@@ -4,6 +4,8 @@ Pooling module tests
 
 import unittest
 
+import numpy as np
+
 from txtai.models import Models, ClsPooling, MeanPooling, PoolingFactory
 
 
@@ -57,6 +59,17 @@ class TestPooling(unittest.TestCase):
         pooling = PoolingFactory.create({"path": "hf-internal-testing/tiny-random-gpt2", "device": self.device, "maxlength": True})
         self.assertEqual(pooling.maxlength, 1024)
 
+    def testTokens(self):
+        """
+        Test pooling with token budget batching
+        """
+
+        pooling = PoolingFactory.create({"path": "sentence-transformers/nli-mpnet-base-v2", "device": self.device})
+
+        # Skewed lengths, results are the same as fixed size batches
+        documents = ["This is a long test " * 50 if x % 8 == 0 else f"Test {x}" for x in range(32)]
+        self.assertTrue(np.allclose(pooling.encode(documents, tokens=256), pooling.encode(documents, batch=4), atol=1e-5))
+
     def testMean(self):
         """
         Test mean pooling
@@ -8,7 +8,9 @@ import unittest
 
 from unittest.mock import patch
 
-from txtai.scoring import ScoringFactory, Scoring
+import numpy as np
+
+from txtai.scoring import BM25, ScoringFactory, Postings, Scoring
 
 
 # pylint: disable=R0904
@@ -49,6 +51,38 @@ class TestKeyword(unittest.TestCase):
 
         self.runTests("txtai.scoring.BM25")
 
+    def testCustomScore(self):
+        """
+        Test custom score functions don't enable pruning unless they opt in
+        """
+
+        class Custom(BM25):
+            """
+            Custom score function that isn't bounded.
+            """
+
+            def score(self, freq, idf, length):
+                """
+                Score that isn't monotone in term frequency.
+                """
+
+                return idf * np.sin(freq) / length
+
+        class Bounded(Custom):
+            """
+            Custom score function that opts in to pruning.
+            """
+
+            def isbounded(self):
+                """
+                Enables pruning.
+                """
+
+                return True
+
+        self.assertFalse(Custom({"terms": True}).terms.pruning)
+        self.assertTrue(Bounded({"terms": True}).terms.pruning)
+
     def testCustomNotFound(self):
         """
         Test unresolvable custom method
@@ -145,6 +179,9 @@ class TestKeyword(unittest.TestCase):
         self.weights(config)
         self.search(config)
         self.delete(config)
+        self.compact(config)
+        self.pruning(config)
+        self.postings(config)
         self.normalize(config)
         self.content(config)
         self.empty(config)
@@ -305,6 +342,124 @@ class TestKeyword(unittest.TestCase):
         self.save(scoring, config, f"scoring.{config['method']}.delete")
         self.assertEqual(scoring.count(), len(self.data) - 1)
 
+    def compact(self, config):
+        """
+        Test compacting a terms index.
+
+        Args:
+            config: scoring config
+        """
+
+        # Create combined config
+        config = {**config, **{"terms": {"cachelimit": 0}}}
+
+        # Create scoring instance and delete results
+        scoring = ScoringFactory.create(config)
+        scoring.index(self.data)
+        scoring.delete([3, 4, 100])
+        self.assertEqual(scoring.count(), len(self.data) - 2)
+
+        # Compact index and validate deleted documents are removed
+        self.assertEqual(scoring.terms.compact(), 2)
+        self.assertEqual(scoring.terms.compact(), 0)
+        self.assertEqual(len(scoring.terms.ids), len(self.data) - 2)
+        self.assertIsNone(scoring.terms.lookup("bear")[0])
+
+        # Validate ids are preserved
+        self.assertFalse(scoring.search("bear", 1))
+        self.assertEqual(scoring.search("wins", 1)[0][0], 5)
+        self.assertEqual(scoring.search("profits", 1)[0][0], 6)
+
+        # Save/load and validate search results
+        scoring = self.save(scoring, config, f"scoring.{config['method']}.compact")
+        self.assertEqual(scoring.count(), len(self.data) - 2)
+        self.assertEqual(scoring.search("wins", 1)[0][0], 5)
+
+        # Delete after compaction
+        scoring.delete([5])
+        self.assertEqual(scoring.count(), len(self.data) - 3)
+        self.assertFalse(scoring.search("wins", 1))
+
+    @patch("txtai.scoring.terms.Terms.BLOCKSIZE", 2)
+    def pruning(self, config):
+        """
+        Test document-at-a-time search with dynamic pruning.
+
+        Args:
+            config: scoring config
+        """
+
+        # Create scoring instance with a cutoff that scores all terms for term-at-a-time searches
+        config = {**config, **{"terms": {"cutoff": 1.0}}}
+        scoring = ScoringFactory.create(config)
+        scoring.index(self.data)
+        scoring.delete([4])
+
+        # Pruning is only supported for bounded scoring methods
+        self.assertEqual(scoring.terms.pruning, config["method"] != "sif")
+
+        queries = ["bear", "wins lottery", "wins wins ticket", "confirmed virus ice shelf", "Taiwan coast", "notfound"]
+        for limit in [1, 3, 10]:
+            # Validate results match an exhaustive term-at-a-time search
+            results = [scoring.search(query, limit) for query in queries]
+            scoring.terms.pruning = False
+            self.assertEqual(
+                [[uid for uid, _ in result] for result in results], [[uid for uid, _ in scoring.search(query, limit)] for query in queries]
+            )
+            scoring.terms.pruning = config["method"] != "sif"
+
+        # Validate block statistics are calculated when they aren't stored
+        scoring = self.save(scoring, config, f"scoring.{config['method']}.pruning")
+        scoring.terms.connection.execute("DROP TABLE blocks")
+        scoring.terms.hasblocks = False
+        self.assertEqual(scoring.search("bear", 1)[0][0], 3)
+
+    def postings(self, config):
+        """
+        Test compressed term frequency sparse arrays.
+
+        Args:
+            config: scoring config
+        """
+
+        # Validate encoding round trips small and large values
+        uids, freqs = np.array([0, 1, 127, 128, 16384, 2**31, 2**62]), np.array([1, 2, 127, 128, 300, 2**20, 2**40])
+        for x, y in zip(Postings().decode(*Postings().encode(uids, freqs)), [uids, freqs]):
+            self.assertEqual(x.tolist(), y.tolist())
+
+        # Create scoring instance
+        config = {**config, **{"terms": True}}
+        scoring = ScoringFactory.create(config)
+        scoring.index([(uid, text, None) for uid, (_, text, _) in enumerate(self.data * 10)])
+
+        # Validate postings are smaller than raw 64-bit integers
+        terms = scoring.terms
+        uids, freqs = terms.connection.execute(terms.SELECT_TERMS, ["bear"]).fetchone()
+        self.assertEqual(len(terms.lookup("bear")[0]), 10)
+        self.assertLess(len(uids) + len(freqs), 10 * 4)
+
+        # Rewrite index using the raw storage format of earlier versions, which don't store block statistics
+        scoring = self.save(scoring, config, f"scoring.{config['method']}.postings")
+        results = scoring.search("bear wins", 10)
+
+        terms = scoring.terms
+        for term, uids, freqs in terms.connection.execute("SELECT term, ids, freqs FROM terms").fetchall():
+            uids, freqs = terms.lookup(term)
+            terms.connection.execute(terms.UPDATE_TERM, [uids.astype("<i8").tobytes(), freqs.astype("<i8").tobytes(), term])
+        terms.connection.execute("PRAGMA user_version = 0")
+        terms.connection.execute("DROP TABLE blocks")
+        terms.connection.commit()
+
+        # Validate raw storage format is loaded and preserved after indexing
+        scoring = self.save(scoring, config, f"scoring.{config['method']}.postings")
+        self.assertEqual(scoring.terms.format, 0)
+        self.assertEqual(scoring.search("bear wins", 10), results)
+
+        scoring.upsert([(100, "bear", None)])
+        scoring = self.save(scoring, config, f"scoring.{config['method']}.postings")
+        self.assertEqual(scoring.terms.format, 0)
+        self.assertIn(100, [uid for uid, _ in scoring.search("bear", 20)])
+
     def normalize(self, config):
         """
         Test scoring search with normalized scores.
@@ -5,8 +5,6 @@ Custom module tests
 import os
 import unittest
 
-import numpy as np
-
 from txtai.vectors import VectorsFactory
 
 
@@ -40,7 +38,7 @@ class TestCustom(unittest.TestCase):
 
         # Test shape of serialized embeddings
         with open(stream, "rb") as queue:
-            self.assertEqual(np.load(queue).shape, (500, 768))
+            self.assertEqual(self.model.loadembeddings(queue, 500).shape, (500, 768))
 
     def testNotFound(self):
         """
@@ -43,7 +43,7 @@ class TestExternal(unittest.TestCase):
 
         # Test shape of serialized embeddings
         with open(stream, "rb") as queue:
-            self.assertEqual(np.load(queue).shape, (500, 768))
+            self.assertEqual(self.model.loadembeddings(queue, 500).shape, (500, 768))
 
     def testMethod(self):
         """
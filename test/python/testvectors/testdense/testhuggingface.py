@@ -3,6 +3,8 @@ Huggingface module tests
 """
 
 import os
+import shutil
+import tempfile
 import unittest
 
 import numpy as np
@@ -40,7 +42,31 @@ class TestHFVectors(unittest.TestCase):
 
         # Test shape of serialized embeddings
         with open(stream, "rb") as queue:
-            self.assertEqual(np.load(queue).shape, (500, 768))
+            self.assertEqual(self.model.loadembeddings(queue, 500).shape, (500, 768))
+
+    def testOnnx(self):
+        """
+        Test encoding with an exported and quantized ONNX model
+        """
+
+        path = os.path.join(tempfile.gettempdir(), "vectors.onnx")
+        shutil.rmtree(path, ignore_errors=True)
+
+        config = {"path": "sentence-transformers/nli-mpnet-base-v2", "onnx": {"path": path, "threads": 1, "interthreads": 1}}
+        model = VectorsFactory.create(config, None)
+
+        # Exported model is cached and reused
+        files = os.listdir(path)
+        self.assertEqual(len(files), 1)
+        self.assertEqual(model.model.model.model.get_session_options().intra_op_num_threads, 1)
+
+        model = VectorsFactory.create(config, None)
+        self.assertEqual(os.listdir(path), files)
+
+        # Quantized embeddings are close to the full precision embeddings
+        documents = [(0, "This is a test", None), (1, "Another test of ONNX quantized embeddings", None)]
+        similarity = (model.batchtransform(documents) * self.model.batchtransform(documents)).sum(axis=1)
+        self.assertTrue(all(x > 0.95 for x in similarity))
 
     def testText(self):
         """
@@ -97,3 +123,18 @@ class TestHFVectors(unittest.TestCase):
         # Run transform and ensure it completes without errors
         embeddings = [self.model.transform(d) for d in documents]
         self.assertIsNotNone(embeddings)
+
+    def testWorkers(self):
+        """
+        Test encoding with worker processes
+        """
+
+        model = VectorsFactory.create({"path": "sentence-transformers/nli-mpnet-base-v2", "workers": 2, "encodebatch": 8}, None)
+
+        # Embeddings are reassembled in order
+        documents = [(x, f"This is test {x}", None) for x in range(50)]
+        _, _, _, stream = model.index(documents)
+        with open(stream, "rb") as queue:
+            self.assertTrue(np.allclose(model.loadembeddings(queue), self.model.batchtransform(documents), atol=1e-5))
+
+        model.close()
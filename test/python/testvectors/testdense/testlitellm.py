@@ -9,8 +9,6 @@ import unittest
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from threading import Thread
 
-import numpy as np
-
 from txtai.vectors import VectorsFactory
 
 
@@ -80,4 +78,4 @@ class TestLiteLLM(unittest.TestCase):
 
         # Test shape of serialized embeddings
         with open(stream, "rb") as queue:
-            self.assertEqual(np.load(queue).shape, (1, 768))
+            self.assertEqual(model.loadembeddings(queue).shape, (1, 768))
@@ -5,8 +5,6 @@ Llama module tests
 import os
 import unittest
 
-import numpy as np
-
 from txtai.vectors import VectorsFactory
 
 
@@ -37,4 +35,4 @@ class TestLlamaCpp(unittest.TestCase):
 
         # Test shape of serialized embeddings
         with open(stream, "rb") as queue:
-            self.assertEqual(np.load(queue).shape, (1, 768))
+            self.assertEqual(self.model.loadembeddings(queue).shape, (1, 768))
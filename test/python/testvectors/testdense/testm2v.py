@@ -5,8 +5,6 @@ Model2Vec module tests
 import os
 import unittest
 
-import numpy as np
-
 from txtai.vectors import VectorsFactory
 
 
@@ -37,4 +35,4 @@ class TestModel2Vec(unittest.TestCase):
 
         # Test shape of serialized embeddings
         with open(stream, "rb") as queue:
-            self.assertEqual(np.load(queue).shape, (1, 256))
+            self.assertEqual(self.model.loadembeddings(queue).shape, (1, 256))
@@ -7,8 +7,6 @@ import unittest
 
 from unittest.mock import patch
 
-import numpy as np
-
 from txtai.vectors import VectorsFactory
 
 
@@ -32,7 +30,7 @@ class TestSTVectors(unittest.TestCase):
 
         # Test shape of serialized embeddings
         with open(stream, "rb") as queue:
-            self.assertEqual(np.load(queue).shape, (1, 384))
+            self.assertEqual(model.loadembeddings(queue).shape, (1, 384))
 
     @patch("torch.cuda.device_count")
     def testMultiGPU(self, count):
@@ -53,7 +51,7 @@ class TestSTVectors(unittest.TestCase):
 
         # Test shape of serialized embeddings
         with open(stream, "rb") as queue:
-            self.assertEqual(np.load(queue).shape, (1, 384))
+            self.assertEqual(model.loadembeddings(queue).shape, (1, 384))
 
         # Close the multiprocessing pool
         model.close()
@@ -3,12 +3,13 @@ Vectors module tests
 """
 
 import os
+import shutil
 import tempfile
 import unittest
 
 import numpy as np
 
-from txtai.vectors import Vectors, Recovery
+from txtai.vectors import Cache, Recovery, Vectors, VectorsFactory
 
 
 class TestVectors(unittest.TestCase):
@@ -16,6 +17,46 @@ class TestVectors(unittest.TestCase):
     Vectors tests.
     """
 
+    def testCache(self):
+        """
+        Test query vectors cache
+        """
+
+        calls = []
+
+        def transform(data):
+            calls.append(data)
+            return np.array([[float(len(x)), 1.0] for x in data], dtype=np.float32)
+
+        model = VectorsFactory.create({"method": "external", "transform": transform, "querycache": 2}, None)
+
+        # Only cache misses are vectorized
+        first = model.batchtransform([(None, "a", None), (None, "bb", None)])
+        second = model.batchtransform([(None, "bb", None), (None, "ccc", None)])
+        self.assertEqual(calls, [["a", "bb"], ["ccc"]])
+        self.assertTrue(np.array_equal(first[1], second[0]))
+
+        # Least recently used vectors are evicted
+        model.batchtransform([(None, "a", None)])
+        self.assertEqual(calls[-1], ["a"])
+        self.assertEqual(model.cache.stats(), {"size": 2, "hits": 1, "misses": 4})
+
+        # Modifying returned vectors doesn't change the cache
+        model.batchtransform([(None, "a", None)])[0] *= 0
+        self.assertEqual(model.batchtransform([(None, "a", None)])[0].tolist(), model.normalize(np.array([1.0, 1.0], dtype=np.float32)).tolist())
+
+        # Cache is cleared when the vectors configuration changes
+        model.config["dimensionality"] = 1
+        model.batchtransform([(None, "a", None)])
+        self.assertEqual(calls[-1], ["a"])
+        self.assertEqual(len(model.cache), 1)
+
+        # Cache clear
+        cache = Cache(10)
+        cache.get("id", ["a"])
+        cache.clear()
+        self.assertEqual(cache.stats(), {"size": 0, "hits": 0, "misses": 0})
+
     def testNotImplemented(self):
         """
         Test exceptions for non-implemented methods
@@ -49,6 +90,64 @@ class TestVectors(unittest.TestCase):
         self.assertTrue(np.allclose(data1, data2))
         self.assertFalse(np.allclose(data1, original))
 
+    def testStore(self):
+        """
+        Test persistent vectors store
+        """
+
+        calls = []
+
+        def transform(data):
+            calls.extend(data)
+            return np.array([[float(len(x)), 1.0] for x in data], dtype=np.float32)
+
+        path = os.path.join(tempfile.gettempdir(), "vectors.store", "vectors.sqlite")
+        if os.path.exists(path):
+            os.remove(path)
+
+        # Index documents
+        model = VectorsFactory.create({"method": "external", "transform": transform, "vectorstore": path}, None)
+        ids, _, _, stream = model.index([(x, "a" * (x + 1), None) for x in range(10)], batchsize=4)
+        self.assertEqual(len(ids), 10)
+        self.assertEqual(len(calls), 10)
+        model.close()
+
+        # Reindex with a new store instance, only new and modified documents are vectorized
+        calls.clear()
+        model = VectorsFactory.create({"method": "external", "transform": transform, "vectorstore": path}, None)
+        ids, _, _, cached = model.index([(x, "b" if x == 0 else "a" * (x + 1), None) for x in range(12)], batchsize=4)
+        self.assertEqual(calls, ["b", "a" * 11, "a" * 12])
+        self.assertEqual(model.store.stats(), {"size": 13, "hits": 9, "misses": 3})
+
+        # Vectors are the same as vectorized vectors
+        with open(stream, "rb") as first, open(cached, "rb") as second:
+            self.assertTrue(np.array_equal(model.loadembeddings(first, 4)[1:], model.loadembeddings(second, 4)[1:]))
+
+        model.close()
+
+    def testPipeline(self):
+        """
+        Test pipelined indexing preserves order and raises errors
+        """
+
+        data = np.random.rand(100, 8).astype(np.float32)
+
+        # Embeddings are spooled in order
+        model = VectorsFactory.create({"method": "external", "transform": lambda x: data[[int(uid) for uid in x]]}, None)
+        with tempfile.NamedTemporaryFile(suffix=".npy") as buffer:
+            ids, dimensions, embeddings = model.vectors([(x, str(x), None) for x in range(100)], 7, None, buffer.name, np.float32)
+            self.assertEqual(ids, list(range(100)))
+            self.assertEqual(dimensions, 8)
+            self.assertTrue(np.allclose(embeddings, data / np.linalg.norm(data, axis=1, keepdims=True)))
+
+        # Encoding errors are raised
+        def transform(x):
+            raise ValueError("encoding error")
+
+        model = VectorsFactory.create({"method": "external", "transform": transform}, None)
+        with self.assertRaises(ValueError):
+            model.index([(x, str(x), None) for x in range(100)], batchsize=7)
+
     def testRecovery(self):
         """
         Test vectors recovery failure
@@ -64,5 +163,51 @@ class TestVectors(unittest.TestCase):
         f.close()
 
         # Create the recovery instance with an empty checkpoint file
-        recovery = Recovery(checkpoint, "id", np.load)
+        recovery = Recovery(checkpoint, "id", Vectors(None, None, None).loadembeddings)
         self.assertIsNone(recovery())
+
+    def testSpool(self):
+        """
+        Test embeddings are memory mapped directly from the spool file
+        """
+
+        data = np.random.rand(100, 8).astype(np.float32)
+        normalized = data / np.linalg.norm(data, axis=1, keepdims=True)
+
+        calls = []
+
+        def transform(x):
+            calls.extend(x)
+            return data[[int(uid) for uid in x]]
+
+        model = VectorsFactory.create({"method": "external", "transform": transform}, None)
+
+        # Buffer file is the spool file
+        with tempfile.NamedTemporaryFile(suffix=".npy") as buffer:
+            ids, dimensions, embeddings = model.vectors([(x, str(x), None) for x in range(100)], 7, None, buffer, np.float32)
+            self.assertEqual((len(ids), dimensions), (100, 8))
+            self.assertIsInstance(embeddings, np.memmap)
+            self.assertEqual(os.path.getsize(buffer.name), 64 + data.nbytes)
+            self.assertTrue(np.allclose(embeddings, normalized))
+
+        # Checkpoint file is mapped copy-on-write
+        checkpoint = os.path.join(tempfile.gettempdir(), "vectors.spool")
+        shutil.rmtree(checkpoint, ignore_errors=True)
+
+        _, _, embeddings = model.vectors([(x, str(x), None) for x in range(100)], 7, checkpoint)
+        embeddings[:] = 0
+
+        # Recover all batches from the unmodified checkpoint
+        calls.clear()
+        _, _, embeddings = model.vectors([(x, str(x), None) for x in range(100)], 7, checkpoint)
+        self.assertFalse(calls)
+        self.assertTrue(np.allclose(embeddings, normalized))
+
+        # Partially written batches are vectorized again
+        path = os.path.join(checkpoint, model.vectorsid())
+        with open(path, "r+b") as f:
+            f.truncate(64 + 10 * 8 * 4)
+
+        _, _, embeddings = model.vectors([(x, str(x), None) for x in range(100)], 7, checkpoint)
+        self.assertEqual(len(calls), 93)
+        self.assertTrue(np.allclose(embeddings, normalized))
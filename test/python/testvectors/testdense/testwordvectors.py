@@ -52,7 +52,7 @@ class TestWordVectors(unittest.TestCase):
 
         # Test shape of serialized embeddings
         with open(stream, "rb") as queue:
-            self.assertEqual(np.load(queue).shape, (1, 300))
+            self.assertEqual(model.loadembeddings(queue, 1).shape, (1, 300))
 
     @patch("os.cpu_count")
     def testIndexBatch(self, cpucount):
@@ -77,8 +77,8 @@ class TestWordVectors(unittest.TestCase):
 
         # Test shape of serialized embeddings
         with open(stream, "rb") as queue:
-            self.assertEqual(np.load(queue).shape, (512, 300))
-            self.assertEqual(np.load(queue).shape, (488, 300))
+            self.assertEqual(model.loadembeddings(queue, 512).shape, (512, 300))
+            self.assertEqual(model.loadembeddings(queue).shape, (488, 300))
 
     def testIndexSerial(self):
         """
@@ -99,7 +99,7 @@ class TestWordVectors(unittest.TestCase):
 
         # Test shape of serialized embeddings
         with open(stream, "rb") as queue:
-            self.assertEqual(np.load(queue).shape, (1, 300))
+            self.assertEqual(model.loadembeddings(queue, 1).shape, (1, 300))
 
     def testIndexSerialBatch(self):
         """
@@ -120,8 +120,8 @@ class TestWordVectors(unittest.TestCase):
 
         # Test shape of serialized embeddings
         with open(stream, "rb") as queue:
-            self.assertEqual(np.load(queue).shape, (512, 300))
-            self.assertEqual(np.load(queue).shape, (488, 300))
+            self.assertEqual(model.loadembeddings(queue, 512).shape, (512, 300))
+            self.assertEqual(model.loadembeddings(queue).shape, (488, 300))
 
     def testLookup(self):
         """
@@ -138,9 +138,8 @@ class TestWordVectors(unittest.TestCase):
 
         create({"path": self.path}, None)
 
-        uid, vector = transform((0, "test", None))
-        self.assertEqual(uid, 0)
-        self.assertEqual(vector.shape, (300,))
+        vectors = transform(["test", "txtai"])
+        self.assertEqual(vectors.shape, (2, 300))
 
     def testNoExist(self):
         """
@@ -151,6 +150,34 @@ class TestWordVectors(unittest.TestCase):
         with self.assertRaises((IOError, HFValidationError)):
             VectorsFactory.create({"method": "words", "path": os.path.join(tempfile.gettempdir(), "noexist")}, None)
 
+    @patch("os.cpu_count")
+    def testShared(self, cpucount):
+        """
+        Test word vectors indexing with worker processes sharing word vectors
+        """
+
+        # Mock CPU count
+        cpucount.return_value = 2
+
+        # Generate data
+        documents = [(x, f"This is test {x}", None) for x in range(100)]
+
+        model = VectorsFactory.create({"path": self.path, "parallel": True, "encodebatch": 8}, None)
+
+        # Word vectors are shared through a memory mapped file
+        copy, shared = model.share()
+        self.assertIsNone(copy.vectors)
+        self.assertTrue(np.array_equal(np.load(shared, mmap_mode="r"), model.model.vectors))
+        os.remove(shared)
+
+        ids, _, batches, stream = model.index(documents, 30)
+        self.assertEqual(ids, list(range(100)))
+        self.assertEqual(batches, 4)
+
+        # Embeddings are the same as single process embeddings
+        with open(stream, "rb") as queue:
+            self.assertTrue(np.allclose(model.loadembeddings(queue), model.batchtransform(documents, "data"), atol=1e-6))
+
     def testTransform(self):
         """
         Test word vector transform